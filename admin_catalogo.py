@@ -0,0 +1,182 @@
+"""Administración del catálogo: productos, categorías y subida de imágenes
+
+Las rutas se registran en app.py con VistaDiferida, así que este módulo (y lo
+que importa) se carga con la primera petición de un administrador y no al
+arrancar la app. El control de acceso (admin_required) lo aplica app.py.
+"""
+from flask import render_template, request, jsonify, redirect
+from database import get_db_connection
+from categorias import Categorias
+from catalogo import Catalogo
+from estadisticas import Estadisticas, es_stock_bajo
+from imagenes import Imagenes
+from paginacion import leer_parametros, consulta_keyset, resultado_keyset
+
+# Configuración para subida de archivos
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+# Gestión de productos
+def admin_productos():
+    orden, cursor_pagina, direccion, limite = leer_parametros(request.args)
+    conn = get_db_connection()
+    pagina = resultado_keyset([], orden, cursor_pagina, direccion, limite)
+    
+    if conn:
+        cursor = conn.cursor(dictionary=True)
+        sql, params = consulta_keyset(orden, cursor_pagina, direccion, limite, '''
+            p.id, p.nombre, p.descripcion, p.precio, p.categoria, p.stock, p.imagen, p.created_at
+        ''')
+        cursor.execute(sql, params)
+        pagina = resultado_keyset(cursor.fetchall(), orden, cursor_pagina, direccion, limite)
+        conn.close()
+    
+    return render_template('admin/productos.html', productos=pagina['productos'], pagina=pagina)
+
+# Agregar nuevo producto
+def admin_nuevo_producto():
+    if request.method == 'POST':
+        nombre = request.form['nombre']
+        descripcion = request.form['descripcion']
+        precio = float(request.form['precio'])
+        categoria = request.form['categoria']
+        stock = int(request.form['stock'])
+        
+        # Manejar la imagen
+        imagen = 'default.png'  # Valor por defecto
+        
+        # Verificar si se subió un archivo
+        if 'archivo_imagen' in request.files:
+            file = request.files['archivo_imagen']
+            if file and file.filename != '' and allowed_file(file.filename):
+                # Guardar con nombre por contenido; las versiones reducidas se generan aparte
+                imagen = Imagenes.guardar_subida(file, file.filename.rsplit('.', 1)[1])
+            else:
+                # Si no se subió archivo, usar el nombre manual
+                imagen = request.form.get('imagen', 'default.png')
+        
+        conn = get_db_connection()
+        if conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO productos (nombre, descripcion, precio, categoria, stock, imagen)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            ''', (nombre, descripcion, precio, categoria, stock, imagen))
+            producto_id = cursor.lastrowid
+            Estadisticas.incrementar(cursor, {'total_productos': 1, 'stock_bajo': int(es_stock_bajo(stock))})
+            Catalogo.registrar_cambio(cursor)
+            
+            conn.commit()
+            conn.close()
+            Catalogo.invalidar(producto_id)
+            return redirect('/admin/productos')
+    
+    categorias = Categorias.obtener_todas()
+    return render_template('admin/nuevo_producto.html', categorias=categorias)
+
+# Editar producto
+def admin_editar_producto(producto_id):
+    conn = get_db_connection()
+    
+    if request.method == 'POST':
+        nombre = request.form['nombre']
+        descripcion = request.form['descripcion']
+        precio = float(request.form['precio'])
+        categoria = request.form['categoria']
+        stock = int(request.form['stock'])
+        
+        # Manejar la imagen
+        nueva_imagen = request.form.get('imagen', '')
+        
+        # Verificar si se subió un archivo nuevo
+        if 'archivo_imagen' in request.files:
+            file = request.files['archivo_imagen']
+            if file and file.filename != '' and allowed_file(file.filename):
+                # Guardar el nuevo archivo (si ya existía una imagen igual se reutiliza)
+                nueva_imagen = Imagenes.guardar_subida(file, file.filename.rsplit('.', 1)[1])
+        
+        if conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT stock FROM productos WHERE id = %s FOR UPDATE', (producto_id,))
+            anterior = cursor.fetchone()
+            # Siempre actualizar la imagen (puede ser la misma o una nueva)
+            cursor.execute('''
+                UPDATE productos 
+                SET nombre=%s, descripcion=%s, precio=%s, categoria=%s, stock=%s, imagen=%s
+                WHERE id=%s
+            ''', (nombre, descripcion, precio, categoria, stock, nueva_imagen, producto_id))
+            if anterior:
+                Estadisticas.incrementar(cursor, {'stock_bajo': es_stock_bajo(stock) - es_stock_bajo(anterior[0])})
+            Catalogo.registrar_cambio(cursor)
+            
+            conn.commit()
+            conn.close()
+            Catalogo.invalidar(producto_id)
+            return redirect('/admin/productos')
+    
+    # Obtener datos del producto para editar
+    producto = None
+    if conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute('SELECT * FROM productos WHERE id = %s', (producto_id,))
+        producto = cursor.fetchone()
+        conn.close()
+    
+    if not producto:
+        return "Producto no encontrado", 404
+    
+    categorias = Categorias.obtener_todas()
+    return render_template('admin/editar_producto.html', producto=producto, categorias=categorias)
+
+# Eliminar producto
+def admin_eliminar_producto(producto_id):
+    conn = get_db_connection()
+    if conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT stock FROM productos WHERE id = %s FOR UPDATE', (producto_id,))
+        producto = cursor.fetchone()
+        cursor.execute('DELETE FROM productos WHERE id = %s', (producto_id,))
+        if producto:
+            Estadisticas.incrementar(cursor, {'total_productos': -1, 'stock_bajo': -int(es_stock_bajo(producto[0]))})
+        Catalogo.registrar_cambio(cursor)
+        conn.commit()
+        conn.close()
+        Catalogo.invalidar(producto_id)
+    
+    return redirect('/admin/productos')
+
+
+# Gestión de categorías
+def admin_categorias():
+    """Gestión de categorías"""
+    categorias = Categorias.obtener_todas()
+    return render_template('admin/categorias.html', categorias=categorias)
+
+def admin_agregar_categoria():
+    """Agregar nueva categoría desde el modal"""
+    nombre = request.form.get('nombre')
+    descripcion = request.form.get('descripcion', '')
+    
+    if not nombre:
+        return jsonify({'success': False, 'error': 'El nombre de la categoría es requerido'})
+    
+    success, message = Categorias.agregar(nombre, descripcion)
+    
+    if success:
+        return jsonify({'success': True, 'message': message})
+    else:
+        return jsonify({'success': False, 'error': message})
+
+def api_categorias():
+    """API para obtener todas las categorías"""
+    categorias = Categorias.obtener_todas()
+    return jsonify(categorias)
+
+def admin_eliminar_categoria(categoria_id):
+    """Eliminar categoría"""
+    success, message = Categorias.eliminar(categoria_id)
+    return redirect('/admin/categorias')
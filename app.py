@@ -1,31 +1,47 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for
 from functools import wraps
-from database import get_db_connection
+import database
+import assets
+import imagenes
+import metricas
+import perfilado
+import calentamiento
+from database import get_db_connection, estadisticas_pool
 from auth import Auth
 import os
 import time
-import threading
-import requests
-from werkzeug.utils import secure_filename
-from carrito_db import CarritoDB
-from pedidos import Pedidos
-from categorias import Categorias
+from datetime import datetime
+from importlib import import_module
+from carrito_db import CarritoDB, ResumenCarrito
+from pedidos import Pedidos, ESTADOS_PEDIDO
+from catalogo import Catalogo
+from cache_http import condicional
+from calentamiento import Calentamiento
+from estadisticas import Estadisticas, es_stock_bajo
+from paginacion import ORDENES, leer_parametros, leer_cursor, leer_limite
 
 app = Flask(__name__)
 app.secret_key = 'techstore_secret_key_2024'  # Clave para las sesiones
 
-# Configuración para subida de archivos
-app.config['UPLOAD_FOLDER'] = 'static/images/productos'
+# Una sola conexión a la BD por petición, compartida por Auth, CarritoDB, Pedidos...
+database.init_app(app)
+# Latencia por endpoint, consultas por petición y /metrics para Prometheus
+metricas.init_app(app)
+# Consultas lentas, N+1 y presupuestos de consultas por endpoint (estrictos en tests)
+perfilado.init_app(app)
+# Estáticos con hash y caché inmutable: asset_url() en las plantillas
+assets.init_app(app)
+# Imágenes de productos por contenido, con versiones reducidas y srcset
+imagenes.init_app(app)
+# Bytecode de las plantillas en disco para el calentamiento y los procesos siguientes
+calentamiento.init_app(app)
+
+# Tamaño máximo de las subidas (las gestiona admin_catalogo.py)
 app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024  # 2MB máximo
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-           
 
 # =============================================
-# KEEP ALIVE SYSTEM
+# SALUD Y MONITOREO
 # =============================================
 
 @app.route('/health')
@@ -60,8 +76,10 @@ def status_check():
             'database': {
                 'status': db_status,
                 'message': db_message,
-                'product_count': product_count
+                'product_count': product_count,
+                'pool': estadisticas_pool()
             },
+            'calentamiento': Calentamiento.informe,
             'timestamp': time.time(),
             'service': 'TechStore Flask App',
             'version': '1.0.0'
@@ -73,79 +91,46 @@ def status_check():
             'timestamp': time.time()
         }), 500
 
-def start_keep_alive():
-    """Inicia el thread de keep-alive en segundo plano"""
-    def ping_self():
-        # Obtener la URL dinámicamente o usar una por defecto
-        app_url = os.environ.get('RENDER_EXTERNAL_URL', 'https://tu-app.onrender.com')
-        
-        while True:
-            try:
-                response = requests.get(f"{app_url}/health", timeout=10)
-                print(f"✅ Auto-ping exitoso ({response.status_code}): {time.strftime('%Y-%m-%d %H:%M:%S')}")
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Error en auto-ping: {e}")
-            except Exception as e:
-                print(f"⚠️  Error inesperado en keep-alive: {e}")
-            
-            # Esperar 8 minutos (menos de 15 para evitar que se duerma)
-            time.sleep(480)  # 8 minutos
-    
-    # Solo activar en producción (Render)
-    if os.environ.get("RENDER") == "True":
-        thread = threading.Thread(target=ping_self)
-        thread.daemon = True  # Esto hace que el thread se cierre cuando la app principal se cierre
-        thread.start()
-        print("🟢 Keep-alive system activated")
-
-
+@app.route('/api/pool')
+def pool_status():
+    """Métricas del pool de conexiones a MySQL"""
+    return jsonify(estadisticas_pool())
 
 @app.route('/')
 def index():
-    conn = get_db_connection()
-    productos_destacados = []
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM productos LIMIT 4')  # Solo 4 productos en inicio
-        productos_destacados = cursor.fetchall()
-        conn.close()
-    
+    productos_destacados = Catalogo.destacados(4)  # Solo 4 productos en inicio
     return render_template('home.html', productos=productos_destacados)
 
+def leer_filtros(args):
+    """Filtros del catálogo desde request.args (búsqueda, categoría, rango de precio, stock)"""
+    return {
+        'q': args.get('q', ''),
+        'categoria': args.get('categoria', ''),
+        'precio': args.get('precio', ''),
+        'en_stock': args.get('en_stock') in ('1', 'true', 'on')
+    }
+
 @app.route('/productos')
 def productos():
-    conn = get_db_connection()
-    todos_productos = []
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM productos')
-        todos_productos = cursor.fetchall()
-        conn.close()
-    
-    return render_template('productos.html', productos=todos_productos)
+    orden, cursor, direccion, limite = leer_parametros(request.args)
+    filtros = leer_filtros(request.args)
+    pagina = Catalogo.pagina(orden, cursor, direccion, limite, filtros)
+    return render_template('productos.html', productos=pagina['productos'], pagina=pagina, filtros=filtros)
 
 @app.route('/api/productos')
+@condicional()
 def api_productos():
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM productos')
-        productos = cursor.fetchall()
-        conn.close()
-        return jsonify(productos)
-    return jsonify([])
+    """Catálogo paginado: ?orden=recientes|precio_asc|...&limite=N&despues=<cursor>|antes=<cursor>"""
+    orden, cursor, direccion, limite = leer_parametros(request.args)
+    return jsonify(Catalogo.pagina(orden, cursor, direccion, limite))
 
 
 @app.route('/api/productos/<int:producto_id>')
+@condicional()
 def api_producto_individual(producto_id):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM productos WHERE id = %s', (producto_id,))
-        producto = cursor.fetchone()
-        conn.close()
-        if producto:
-            return jsonify(producto)
+    producto = Catalogo.obtener_producto(producto_id)
+    if producto:
+        return jsonify(producto)
     return jsonify({'error': 'Producto no encontrado'}), 404
 
 
@@ -156,31 +141,19 @@ def carrito():
 
 # Ruta para buscar productos (API)
 @app.route('/api/buscar-productos')
+@condicional()
 def api_buscar_productos():
-    query = request.args.get('q', '')
-    categoria = request.args.get('categoria', '')
-    
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        
-        sql = "SELECT * FROM productos WHERE 1=1"
-        params = []
-        
-        if query:
-            sql += " AND (nombre LIKE %s OR descripcion LIKE %s)"
-            params.extend([f'%{query}%', f'%{query}%'])
-        
-        if categoria:
-            sql += " AND categoria = %s"
-            params.append(categoria)
-        
-        cursor.execute(sql, params)
-        productos = cursor.fetchall()
-        conn.close()
-        return jsonify(productos)
+    """Búsqueda con facetas: ?q=&categoria=&precio=0-100|100-300|300-500|500+&en_stock=1&orden=
+
+    Devuelve los ids que coinciden (por relevancia si no se pide orden) y
+    cuántos productos hay en cada categoría, rango de precio y con stock.
+    """
+    orden = request.args.get('orden')
+    if orden not in ORDENES:
+        orden = None
     
-    return jsonify([])
+    ids, conteos = Catalogo.filtrar(orden=orden, **leer_filtros(request.args))
+    return jsonify({'ids': ids, 'total': len(ids), 'facetas': conteos})
 
 # Ruta para agregar datos de prueba (si necesitas más productos)
 @app.route('/agregar-mas-datos')
@@ -200,14 +173,37 @@ def agregar_mas_datos():
             INSERT INTO productos (nombre, descripcion, precio, categoria, stock, imagen) 
             VALUES (%s, %s, %s, %s, %s, %s)
         ''', productos_extra)
+        Estadisticas.incrementar(cursor, {
+            'total_productos': len(productos_extra),
+            'stock_bajo': sum(1 for producto in productos_extra if es_stock_bajo(producto[4]))
+        })
+        Catalogo.registrar_cambio(cursor)
         
         conn.commit()
         conn.close()
+        Catalogo.invalidar()
         return 'Datos extra agregados correctamente'
     
     return 'Error al agregar datos'
 
 
+@app.context_processor
+def inyectar_resumen_carrito():
+    """Resumen del carrito en todas las páginas, para no pedir el contador por AJAX"""
+    if 'user_id' not in session:
+        return {'resumen_carrito': None}
+    return {'resumen_carrito': ResumenCarrito.obtener(session['user_id'])}
+
+@app.template_global()
+def url_pagina(**cambios):
+    """URL de la página actual cambiando algunos parámetros (p. ej. el cursor)"""
+    args = request.args.to_dict()
+    args.pop('antes', None)
+    args.pop('despues', None)
+    args.update({k: v for k, v in cambios.items() if v is not None})
+    return url_for(request.endpoint, **request.view_args, **args)
+
+
 # Rutas de autenticación
 @app.route('/registro', methods=['GET', 'POST'])
 def registro():
@@ -290,33 +286,42 @@ def admin_required(f):
 @app.route('/admin')
 @admin_required
 def admin_dashboard():
-    conn = get_db_connection()
-    stats = {}
-    
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        
-        # Estadísticas generales
-        cursor.execute('SELECT COUNT(*) as total FROM usuarios')
-        stats['total_usuarios'] = cursor.fetchone()['total']
-        
-        cursor.execute('SELECT COUNT(*) as total FROM productos')
-        stats['total_productos'] = cursor.fetchone()['total']
-        
-        cursor.execute('SELECT COUNT(*) as total FROM usuarios WHERE rol = "admin"')
-        stats['total_admins'] = cursor.fetchone()['total']
-        
-        cursor.execute('SELECT COUNT(*) as total FROM usuarios WHERE created_at >= CURDATE()')
-        stats['usuarios_hoy'] = cursor.fetchone()['total']
-        
-        # Productos con stock bajo
-        cursor.execute('SELECT COUNT(*) as total FROM productos WHERE stock < 10')
-        stats['stock_bajo'] = cursor.fetchone()['total']
-        
-        conn.close()
-    
+    # Contadores mantenidos al escribir: una sola lectura en lugar de un COUNT(*) por tarjeta
+    stats = Estadisticas.obtener()
     return render_template('admin/dashboard.html', stats=stats)
 
+class VistaDiferida:
+    """Vista que importa su módulo la primera vez que se la llama
+
+    Las rutas quedan registradas al arrancar, pero el código de la vista (y
+    lo que importa) se carga con la primera petición que la usa.
+    """
+
+    def __init__(self, nombre):
+        self.__module__, self.__name__ = nombre.rsplit('.', 1)
+        self.nombre = nombre
+        self._vista = None
+
+    def __call__(self, *args, **kwargs):
+        if self._vista is None:
+            modulo, funcion = self.nombre.rsplit('.', 1)
+            self._vista = getattr(import_module(modulo), funcion)
+        return self._vista(*args, **kwargs)
+
+
+# Productos, categorías y subida de imágenes: solo los usa el admin
+for regla, vista, metodos in (
+    ('/admin/productos', 'admin_productos', ['GET']),
+    ('/admin/productos/nuevo', 'admin_nuevo_producto', ['GET', 'POST']),
+    ('/admin/productos/editar/<int:producto_id>', 'admin_editar_producto', ['GET', 'POST']),
+    ('/admin/productos/eliminar/<int:producto_id>', 'admin_eliminar_producto', ['GET']),
+    ('/admin/categorias', 'admin_categorias', ['GET']),
+    ('/admin/categorias/agregar', 'admin_agregar_categoria', ['POST']),
+    ('/api/categorias', 'api_categorias', ['GET']),
+    ('/admin/categorias/eliminar/<int:categoria_id>', 'admin_eliminar_categoria', ['GET']),
+):
+    app.add_url_rule(regla, vista, admin_required(VistaDiferida(f'admin_catalogo.{vista}')), methods=metodos)
+
 # Gestión de usuarios
 @app.route('/admin/usuarios')
 @admin_required
@@ -324,132 +329,6 @@ def admin_usuarios():
     users = Auth.get_all_users()
     return render_template('admin/usuarios.html', users=users)
 
-# Gestión de productos
-@app.route('/admin/productos')
-@admin_required
-def admin_productos():
-    conn = get_db_connection()
-    productos = []
-    
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('''
-            SELECT id, nombre, descripcion, precio, categoria, stock, imagen, created_at 
-            FROM productos ORDER BY created_at DESC
-        ''')
-        productos = cursor.fetchall()
-        conn.close()
-    
-    return render_template('admin/productos.html', productos=productos)
-
-# Agregar nuevo producto
-@app.route('/admin/productos/nuevo', methods=['GET', 'POST'])
-@admin_required
-def admin_nuevo_producto():
-    if request.method == 'POST':
-        nombre = request.form['nombre']
-        descripcion = request.form['descripcion']
-        precio = float(request.form['precio'])
-        categoria = request.form['categoria']
-        stock = int(request.form['stock'])
-        
-        # Manejar la imagen
-        imagen = 'default.png'  # Valor por defecto
-        
-        # Verificar si se subió un archivo
-        if 'archivo_imagen' in request.files:
-            file = request.files['archivo_imagen']
-            if file and file.filename != '' and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Guardar el archivo
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                imagen = filename
-            else:
-                # Si no se subió archivo, usar el nombre manual
-                imagen = request.form.get('imagen', 'default.png')
-        
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO productos (nombre, descripcion, precio, categoria, stock, imagen)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            ''', (nombre, descripcion, precio, categoria, stock, imagen))
-            
-            conn.commit()
-            conn.close()
-            return redirect('/admin/productos')
-    
-    categorias = Categorias.obtener_todas()
-    return render_template('admin/nuevo_producto.html', categorias=categorias)
-
-# Editar producto
-@app.route('/admin/productos/editar/<int:producto_id>', methods=['GET', 'POST'])
-@admin_required
-def admin_editar_producto(producto_id):
-    conn = get_db_connection()
-    
-    if request.method == 'POST':
-        nombre = request.form['nombre']
-        descripcion = request.form['descripcion']
-        precio = float(request.form['precio'])
-        categoria = request.form['categoria']
-        stock = int(request.form['stock'])
-        
-        # Manejar la imagen
-        nueva_imagen = request.form.get('imagen', '')
-        
-        # Verificar si se subió un archivo nuevo
-        if 'archivo_imagen' in request.files:
-            file = request.files['archivo_imagen']
-            if file and file.filename != '' and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Guardar el nuevo archivo
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                nueva_imagen = filename
-        
-        if conn:
-            cursor = conn.cursor()
-            # Siempre actualizar la imagen (puede ser la misma o una nueva)
-            cursor.execute('''
-                UPDATE productos 
-                SET nombre=%s, descripcion=%s, precio=%s, categoria=%s, stock=%s, imagen=%s
-                WHERE id=%s
-            ''', (nombre, descripcion, precio, categoria, stock, nueva_imagen, producto_id))
-            
-            conn.commit()
-            conn.close()
-            return redirect('/admin/productos')
-    
-    # Obtener datos del producto para editar
-    producto = None
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM productos WHERE id = %s', (producto_id,))
-        producto = cursor.fetchone()
-        conn.close()
-    
-    if not producto:
-        return "Producto no encontrado", 404
-    
-    categorias = Categorias.obtener_todas()
-    return render_template('admin/editar_producto.html', producto=producto, categorias=categorias)
-
-# Eliminar producto
-@app.route('/admin/productos/eliminar/<int:producto_id>')
-@admin_required
-def admin_eliminar_producto(producto_id):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM productos WHERE id = %s', (producto_id,))
-        conn.commit()
-        conn.close()
-    
-    return redirect('/admin/productos')
-
-
-
 # Cambiar rol de usuario
 @app.route('/admin/usuarios/cambiar_rol/<int:user_id>')
 @admin_required
@@ -465,6 +344,7 @@ def admin_cambiar_rol(user_id):
         if usuario:
             nuevo_rol = 'admin' if usuario['rol'] == 'cliente' else 'cliente'
             cursor.execute('UPDATE usuarios SET rol = %s WHERE id = %s', (nuevo_rol, user_id))
+            Estadisticas.incrementar(cursor, {'total_admins': 1 if nuevo_rol == 'admin' else -1})
             conn.commit()
         
         conn.close()
@@ -632,12 +512,42 @@ def api_eliminar_carrito_db(producto_id):
     else:
         return jsonify({'success': False, 'error': message}), 400
 
+@app.route('/api/carrito/batch', methods=['POST'])
+@login_required
+def api_batch_carrito_db():
+    """API para aplicar varias operaciones al carrito en una sola petición
+
+    Body JSON: {"operaciones": [{"op": "agregar"|"fijar"|"eliminar"|"vaciar", "producto_id": 1, "cantidad": 2}, ...]}
+    """
+    datos = request.get_json(silent=True) or {}
+    operaciones = datos.get('operaciones')
+    if not isinstance(operaciones, list) or not operaciones:
+        return jsonify({'success': False, 'error': 'No se recibieron operaciones'}), 400
+    
+    success, message, carrito = CarritoDB.aplicar_operaciones(session['user_id'], operaciones)
+    if success:
+        return jsonify({
+            'success': True,
+            'message': message,
+            'carrito': carrito,
+            'contador': sum(item['cantidad'] for item in carrito)
+        })
+    else:
+        return jsonify({'success': False, 'error': message}), 400
+
 @app.route('/api/carrito/contador')
 @login_required
 def api_contador_carrito_db():
-    """API para obtener contador del carrito desde BD"""
-    contador = CarritoDB.obtener_contador_carrito(session['user_id'])
-    return jsonify({'contador': contador})
+    """API para obtener contador del carrito (con ETag: si no cambió responde 304)"""
+    resumen = ResumenCarrito.obtener(session['user_id'])
+    respuesta = jsonify({
+        'contador': resumen['contador'],
+        'subtotal': float(resumen['subtotal']),
+        'version': resumen['version']
+    })
+    respuesta.set_etag(resumen['version'])
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta.make_conditional(request)
 
 # =============================================
 # RUTAS DE PEDIDOS
@@ -698,7 +608,7 @@ def procesar_pedido():
     else:
         return render_template('checkout.html', 
                              carrito=carrito, 
-                             direcciones=Auth.get_user_addresses(session['user_id']),
+                             direcciones=direcciones,
                              subtotal=subtotal,
                              envio=envio,
                              total=total,
@@ -714,8 +624,9 @@ def pedido_confirmado(numero_pedido):
 @login_required
 def mis_pedidos():
     """Página de historial de pedidos del usuario"""
-    pedidos = Pedidos.obtener_pedidos_usuario(session['user_id'])
-    return render_template('mis_pedidos.html', pedidos=pedidos)
+    cursor, direccion = leer_cursor(request.args, 'created_at')
+    pagina = Pedidos.obtener_pedidos_usuario(session['user_id'], cursor, direccion, leer_limite(request.args))
+    return render_template('mis_pedidos.html', pedidos=pagina['pedidos'], pagina=pagina)
 
 @app.route('/pedido/<int:pedido_id>')
 @login_required
@@ -744,32 +655,16 @@ def detalle_pedido(pedido_id):
     return render_template('detalle_pedido.html', pedido=pedido_data)
 
 @app.route('/producto/<int:producto_id>')
+@condicional(por_usuario=True)
 def detalle_producto(producto_id):
     """Página de detalle individual de producto"""
-    conn = get_db_connection()
-    producto = None
-    
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM productos WHERE id = %s', (producto_id,))
-        producto = cursor.fetchone()
-        conn.close()
+    producto = Catalogo.obtener_producto(producto_id)
     
     if not producto:
         return "Producto no encontrado", 404
     
     # Obtener productos relacionados (misma categoría)
-    conn = get_db_connection()
-    productos_relacionados = []
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('''
-            SELECT * FROM productos 
-            WHERE categoria = %s AND id != %s 
-            LIMIT 4
-        ''', (producto['categoria'], producto_id))
-        productos_relacionados = cursor.fetchall()
-        conn.close()
+    productos_relacionados = Catalogo.relacionados(producto, 4)
     
     return render_template('detalle_producto.html', 
                          producto=producto, 
@@ -779,12 +674,25 @@ def detalle_producto(producto_id):
 # RUTAS DE ADMIN PARA PEDIDOS
 # =============================================
 
+def leer_filtros_pedidos(args):
+    """Filtros del listado de pedidos del admin (estado, rango de fechas, email)"""
+    filtros = {'estado': args.get('estado', ''), 'email': args.get('email', '').strip()}
+    for nombre in ('desde', 'hasta'):
+        try:
+            filtros[nombre] = datetime.strptime(args.get(nombre, ''), '%Y-%m-%d').date()
+        except ValueError:
+            filtros[nombre] = None
+    return filtros
+
 @app.route('/admin/pedidos')
 @admin_required
 def admin_pedidos():
     """Panel de administración de pedidos"""
-    pedidos = Pedidos.obtener_todos_pedidos()
-    return render_template('admin/pedidos.html', pedidos=pedidos)
+    filtros = leer_filtros_pedidos(request.args)
+    cursor, direccion = leer_cursor(request.args, 'created_at')
+    pagina = Pedidos.obtener_todos_pedidos(filtros, cursor, direccion, leer_limite(request.args))
+    return render_template('admin/pedidos.html', pedidos=pagina['pedidos'], pagina=pagina,
+                           filtros=filtros, estados=ESTADOS_PEDIDO, stats=Estadisticas.obtener())
 
 @app.route('/admin/pedidos/<int:pedido_id>')
 @admin_required
@@ -806,45 +714,6 @@ def admin_actualizar_estado_pedido(pedido_id, nuevo_estado):
         return f"Error: {message}", 400
     
 
-@app.route('/admin/categorias')
-@admin_required
-def admin_categorias():
-    """Gestión de categorías"""
-    categorias = Categorias.obtener_todas()
-    return render_template('admin/categorias.html', categorias=categorias)
-
-@app.route('/admin/categorias/agregar', methods=['POST'])
-@admin_required
-def admin_agregar_categoria():
-    """Agregar nueva categoría desde el modal"""
-    nombre = request.form.get('nombre')
-    descripcion = request.form.get('descripcion', '')
-    
-    if not nombre:
-        return jsonify({'success': False, 'error': 'El nombre de la categoría es requerido'})
-    
-    success, message = Categorias.agregar(nombre, descripcion)
-    
-    if success:
-        return jsonify({'success': True, 'message': message})
-    else:
-        return jsonify({'success': False, 'error': message})
-
-@app.route('/api/categorias')
-@admin_required
-def api_categorias():
-    """API para obtener todas las categorías"""
-    categorias = Categorias.obtener_todas()
-    return jsonify(categorias)
-
-@app.route('/admin/categorias/eliminar/<int:categoria_id>')
-@admin_required
-def admin_eliminar_categoria(categoria_id):
-    """Eliminar categoría"""
-    success, message = Categorias.eliminar(categoria_id)
-    return redirect('/admin/categorias')
-
-
 @app.route('/api/carrito/detalle')
 @login_required
 def api_detalle_carrito_db():
@@ -857,15 +726,8 @@ def api_detalle_carrito_db():
 # INICIALIZACIÓN
 # =============================================
 
-# Crear carpeta de uploads si no existe
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
-    print(f"✅ Carpeta creada: {app.config['UPLOAD_FOLDER']}")
-
 if __name__ == "__main__":
-    # Iniciar sistema de keep-alive
-    start_keep_alive()
-    
+    # Servidor de desarrollo. En producción: gunicorn -c gunicorn.conf.py wsgi:app (ver wsgi.py)
     # Detectar si se está ejecutando en Render o localmente
     en_render = os.environ.get("RENDER", "False") == "True"
 
@@ -878,11 +740,16 @@ if __name__ == "__main__":
     # Mensaje informativo
     if en_render:
         print("🌐 Iniciando aplicación Flask en Render (modo producción)")
-        print("🔧 Keep-alive system: ACTIVADO")
     else:
         print("🟢 Iniciando aplicación Flask en modo local (debug activado)")
-        print("🔧 Keep-alive system: DESACTIVADO (modo local)")
+
+    # Hilos de fondo y calentamiento antes de aceptar tráfico (con el recargador de
+    # debug, solo en el proceso que sirve). Con gunicorn los arranca cada worker (wsgi.py)
+    if not debug_mode or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        # Corregir periódicamente los contadores del dashboard
+        Estadisticas.iniciar_reconciliacion()
+        Catalogo.iniciar_refresco_stock()
+        Calentamiento.iniciar(app)
 
     # Ejecutar la app
     app.run(host="0.0.0.0", port=port, debug=debug_mode)
-
@@ -0,0 +1,117 @@
+"""Informe del arranque en frío de la app
+
+Lanza un intérprete nuevo (sin nada importado ni en caché de memoria) que
+importa app.py con -X importtime y atiende una primera petición a /health con
+el cliente de pruebas de Flask. Muestra:
+
+- cuánto tarda el proceso en tener la app importada y en dar la primera
+  respuesta (contando desde que se lanza el intérprete)
+- los módulos que más tardan en importarse, separando los de la tienda
+
+Uso:
+    python arranque.py [--modulos 15] [--json]
+
+test_arranque.py usa medir() para fallar si el arranque supera un presupuesto
+o si se vuelve a cargar al arrancar algo de MODULOS_DIFERIDOS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos que no deben importarse al arrancar: se cargan al usarlos por primera vez
+MODULOS_DIFERIDOS = (
+    'admin_catalogo',              # gestión de productos y categorías del admin
+    'categorias',
+    'multiprocessing',             # pool de procesos de las imágenes subidas
+    'concurrent.futures.process',
+    'PIL',
+    'requests',                    # el antiguo keep-alive por HTTP
+)
+
+MARCA = 'ARRANQUE '
+_SCRIPT = f'''
+import json, sys, time
+inicio = time.time()
+import app
+importada = time.time()
+respuesta = app.app.test_client().get('/health')
+print({MARCA!r} + json.dumps({{
+    'inicio': inicio, 'importada': importada, 'respondida': time.time(),
+    'estado': respuesta.status_code, 'modulos': sorted(sys.modules)
+}}), flush=True)
+'''
+
+
+def _leer_importtime(texto):
+    """Líneas de -X importtime -> {modulo: (propio_ms, acumulado_ms)}"""
+    tiempos = {}
+    for linea in texto.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        tiempos[nombre.strip()] = (int(propio) / 1000, int(acumulado) / 1000)
+    return tiempos
+
+
+def medir():
+    """Arrancar la app en un proceso nuevo y devolver los tiempos medidos"""
+    lanzado = time.time()
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _SCRIPT],
+        cwd=CARPETA, capture_output=True, text=True, timeout=120
+    )
+    datos = next((json.loads(linea[len(MARCA):]) for linea in proceso.stdout.splitlines()
+                  if linea.startswith(MARCA)), None)
+    if datos is None:
+        raise RuntimeError(f"La app no llegó a responder:\n{proceso.stdout}\n{proceso.stderr[-3000:]}")
+
+    propios = {os.path.splitext(nombre)[0] for nombre in os.listdir(CARPETA) if nombre.endswith('.py')}
+    return {
+        'interprete_ms': round((datos['inicio'] - lanzado) * 1000, 1),
+        'importacion_ms': round((datos['importada'] - datos['inicio']) * 1000, 1),
+        'primera_respuesta_ms': round((datos['respondida'] - lanzado) * 1000, 1),
+        'estado': datos['estado'],
+        'modulos': datos['modulos'],
+        'propios': propios,
+        'tiempos': _leer_importtime(proceso.stderr),
+    }
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Tiempo de arranque en frío de la app')
+    parser.add_argument('--modulos', type=int, default=15, help='cuántos módulos mostrar')
+    parser.add_argument('--json', action='store_true', help='salida en JSON')
+    args = parser.parse_args(argumentos)
+
+    informe = medir()
+    tiempos = informe['tiempos']
+    if args.json:
+        print(json.dumps({clave: valor for clave, valor in informe.items() if clave not in ('modulos', 'propios')},
+                         indent=2, ensure_ascii=False))
+        return 0
+
+    print(f"⏱️  Intérprete: {informe['interprete_ms']:.0f} ms | importar app: {informe['importacion_ms']:.0f} ms | "
+          f"primera respuesta: {informe['primera_respuesta_ms']:.0f} ms desde el lanzamiento")
+
+    print("\nMódulos de la tienda (propio / acumulado, ms):")
+    for nombre, (propio, acumulado) in sorted(
+            ((n, t) for n, t in tiempos.items() if n in informe['propios']), key=lambda item: -item[1][1]):
+        print(f"  {nombre:<28} {propio:>8.1f} {acumulado:>8.1f}")
+
+    print("\nMódulos más lentos (acumulado, ms):")
+    for nombre, (_, acumulado) in sorted(tiempos.items(), key=lambda item: -item[1][1])[:args.modulos]:
+        print(f"  {nombre:<40} {acumulado:>8.1f}")
+
+    cargados = [m for m in MODULOS_DIFERIDOS if m in informe['modulos']]
+    if cargados:
+        print(f"\n⚠️  Se cargan al arrancar módulos que deberían ser diferidos: {', '.join(cargados)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
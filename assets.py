@@ -0,0 +1,71 @@
+"""Archivos estáticos con hash en el nombre, gzip y caché inmutable
+
+Las plantillas usan asset_url('css/style.css') en lugar de
+url_for('static', filename='css/style.css'). Si el archivo está en el
+manifiesto de construir_assets.py se enlaza la copia con hash bajo
+/assets/, que se sirve con Cache-Control immutable (el navegador no vuelve a
+pedirla) y comprimida si el cliente acepta gzip. Si no está (por ejemplo una
+imagen subida después del build, o sin build en desarrollo) se enlaza el
+archivo original de /static/.
+
+Detrás de nginx se puede servir /assets/ sin pasar por Python:
+    location /assets/ { alias .../static/dist/; gzip_static on;
+                        add_header Cache-Control "public, max-age=31536000, immutable"; }
+"""
+import json
+import mimetypes
+from flask import request, send_from_directory, url_for
+from construir_assets import CARPETA_DIST, MANIFIESTO
+
+# Un año: el nombre cambia con el contenido, así que la copia nunca vence
+ASSETS_MAX_AGE = 365 * 24 * 3600
+
+_manifiesto = None
+_comprimidos = set()  # archivos de dist que tienen copia .gz
+
+
+def manifiesto():
+    """Manifiesto del último build (vacío si no se construyó)"""
+    global _manifiesto, _comprimidos
+    if _manifiesto is None:
+        try:
+            with open(MANIFIESTO, encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+            _comprimidos = {entrada['archivo'] for entrada in datos.values() if entrada.get('gzip')}
+            _manifiesto = datos
+        except FileNotFoundError:
+            print("⚠️  Sin static/dist/manifest.json: se sirven los estáticos sin hash "
+                  "(ejecutar python construir_assets.py)")
+            _manifiesto = {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Error al leer el manifiesto de estáticos: {e}")
+            _manifiesto = {}
+    return _manifiesto
+
+
+def asset_url(filename, **valores):
+    """Como url_for('static', filename=...), pero con la copia con hash si existe"""
+    entrada = manifiesto().get(filename)
+    if entrada is None:
+        return url_for('static', filename=filename, **valores)
+    return url_for('assets', filename=entrada['archivo'], **valores)
+
+
+def servir_asset(filename):
+    """Servir un archivo de static/dist con caché inmutable y gzip si se puede"""
+    manifiesto()
+    if filename in _comprimidos and 'gzip' in request.accept_encodings:
+        tipo = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        respuesta = send_from_directory(CARPETA_DIST, filename + '.gz', mimetype=tipo, max_age=ASSETS_MAX_AGE)
+        respuesta.headers['Content-Encoding'] = 'gzip'
+    else:
+        respuesta = send_from_directory(CARPETA_DIST, filename, max_age=ASSETS_MAX_AGE)
+    respuesta.headers['Cache-Control'] = f'public, max-age={ASSETS_MAX_AGE}, immutable'
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
+
+def init_app(app):
+    """Registrar la ruta /assets/ y asset_url() en las plantillas"""
+    app.add_url_rule('/assets/<path:filename>', 'assets', servir_asset)
+    app.add_template_global(asset_url)
@@ -1,6 +1,20 @@
-from database import get_db_connection
+from database import ahora_bd, get_db_connection
+from escrituras_diferidas import EscriturasDiferidas
+from estadisticas import Estadisticas, clave_dia
 import hashlib
 
+# Consultas frecuentes de usuarios (migrar.py verificar hace EXPLAIN de estas mismas)
+SQL_LOGIN = '''
+    SELECT id, email, password, nombre, apellido, rol
+    FROM usuarios
+    WHERE email = %s AND activo = TRUE
+'''
+SQL_DIRECCIONES_USUARIO = '''
+    SELECT * FROM direcciones
+    WHERE usuario_id = %s
+    ORDER BY es_principal DESC, created_at DESC
+'''
+
 class Auth:
     @staticmethod
     def hash_password(password):
@@ -33,12 +47,14 @@ class Auth:
                     INSERT INTO usuarios (email, password, nombre, apellido, telefono, rol)
                     VALUES (%s, %s, %s, %s, %s, 'cliente')
                 ''', (email, hashed_password, nombre, apellido, telefono))
+                Estadisticas.incrementar(cursor, {'total_usuarios': 1, clave_dia('usuarios'): 1})
                 
                 conn.commit()
                 conn.close()
                 return True, "Usuario registrado exitosamente"
                 
             except Exception as e:
+                conn.rollback()
                 conn.close()
                 return False, f"Error al registrar usuario: {e}"
         return False, "Error de conexión a la base de datos"
@@ -52,17 +68,12 @@ class Auth:
                 cursor = conn.cursor(dictionary=True)
                 
                 # Buscar usuario
-                cursor.execute('''
-                    SELECT id, email, password, nombre, apellido, rol 
-                    FROM usuarios 
-                    WHERE email = %s AND activo = TRUE
-                ''', (email,))
+                cursor.execute(SQL_LOGIN, (email,))
                 
                 user = cursor.fetchone()
                 if user and Auth.verify_password(password, user['password']):
-                    # Actualizar último login
-                    cursor.execute('UPDATE usuarios SET ultimo_login = NOW() WHERE id = %s', (user['id'],))
-                    conn.commit()
+                    # Último login: se escribe en segundo plano, el login solo lee credenciales
+                    EscriturasDiferidas.registrar('usuarios', 'ultimo_login', user['id'], ahora_bd())
                     conn.close()
                     return True, user
                 else:
@@ -70,6 +81,7 @@ class Auth:
                     return False, "Email o contraseña incorrectos"
                     
             except Exception as e:
+                conn.rollback()
                 conn.close()
                 return False, f"Error al iniciar sesión: {e}"
         return False, "Error de conexión a la base de datos"
@@ -121,6 +133,7 @@ class Auth:
                 conn.close()
                 return True, "Perfil actualizado exitosamente"
             except Exception as e:
+                conn.rollback()
                 conn.close()
                 return False, f"Error al actualizar perfil: {e}"
         return False, "Error de conexión a la base de datos"
@@ -150,6 +163,7 @@ class Auth:
                     return False, "La contraseña actual es incorrecta"
                     
             except Exception as e:
+                conn.rollback()
                 conn.close()
                 return False, f"Error al cambiar contraseña: {e}"
         return False, "Error de conexión a la base de datos"
@@ -160,11 +174,7 @@ class Auth:
         conn = get_db_connection()
         if conn:
             cursor = conn.cursor(dictionary=True)
-            cursor.execute('''
-                SELECT * FROM direcciones 
-                WHERE usuario_id = %s 
-                ORDER BY es_principal DESC, created_at DESC
-            ''', (user_id,))
+            cursor.execute(SQL_DIRECCIONES_USUARIO, (user_id,))
             addresses = cursor.fetchall()
             conn.close()
             return addresses
@@ -191,6 +201,7 @@ class Auth:
                 conn.close()
                 return True, "Dirección agregada exitosamente"
             except Exception as e:
+                conn.rollback()
                 conn.close()
                 return False, f"Error al agregar dirección: {e}"
         return False, "Error de conexión a la base de datos"
@@ -207,6 +218,7 @@ class Auth:
                 conn.close()
                 return True, "Dirección eliminada exitosamente"
             except Exception as e:
+                conn.rollback()
                 conn.close()
                 return False, f"Error al eliminar dirección: {e}"
         return False, "Error de conexión a la base de datos"
@@ -230,6 +242,7 @@ class Auth:
                 conn.close()
                 return True, "Dirección principal actualizada"
             except Exception as e:
+                conn.rollback()
                 conn.close()
                 return False, f"Error al actualizar dirección principal: {e}"
         return False, "Error de conexión a la base de datos"
\ No newline at end of file
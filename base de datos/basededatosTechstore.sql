@@ -175,16 +175,6 @@ SELECT * FROM pedido_items;
 
 
 
--- Función para generar número de pedido único
-DELIMITER //
-CREATE FUNCTION generar_numero_pedido() RETURNS VARCHAR(20) READS SQL DATA
-BEGIN
-    DECLARE nuevo_numero VARCHAR(20);
-    DECLARE contador INT;
-    
-    SET contador = (SELECT COUNT(*) + 1 FROM pedidos WHERE DATE(created_at) = CURDATE());
-    SET nuevo_numero = CONCAT('PED', DATE_FORMAT(NOW(), '%Y%m%d'), LPAD(contador, 4, '0'));
-    
-    RETURN nuevo_numero;
-END//
-DELIMITER ;
\ No newline at end of file
+-- Índices, tablas nuevas y demás cambios posteriores a este script se
+-- aplican con las migraciones de la carpeta "migraciones":
+--     python migrar.py subir
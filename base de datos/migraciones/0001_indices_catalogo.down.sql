@@ -0,0 +1,3 @@
+DROP INDEX idx_productos_created_id ON productos;
+DROP INDEX idx_productos_precio_id ON productos;
+DROP INDEX idx_productos_nombre_id ON productos;
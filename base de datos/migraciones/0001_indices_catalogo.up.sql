@@ -0,0 +1,4 @@
+-- Índices para ordenar y paginar el catálogo por cursor (valor, id)
+CREATE INDEX idx_productos_created_id ON productos (created_at, id);
+CREATE INDEX idx_productos_precio_id ON productos (precio, id);
+CREATE INDEX idx_productos_nombre_id ON productos (nombre, id);
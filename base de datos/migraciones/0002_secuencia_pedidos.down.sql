@@ -0,0 +1 @@
+DROP TABLE secuencia_pedidos;
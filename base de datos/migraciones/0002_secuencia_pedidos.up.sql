@@ -0,0 +1,7 @@
+-- Secuencia diaria de números de pedido (la usa numeracion.py).
+-- Reemplaza a la función generar_numero_pedido(), que contaba los pedidos del día en cada compra
+DROP FUNCTION IF EXISTS generar_numero_pedido;
+CREATE TABLE secuencia_pedidos (
+    fecha DATE PRIMARY KEY,
+    ultimo INT UNSIGNED NOT NULL DEFAULT 0
+);
@@ -0,0 +1,15 @@
+DROP INDEX idx_productos_categoria ON productos;
+DROP INDEX idx_productos_stock ON productos;
+DROP INDEX idx_usuarios_created ON usuarios;
+DROP INDEX idx_usuarios_rol ON usuarios;
+DROP INDEX idx_pedidos_created ON pedidos;
+
+-- Al crear los índices compuestos MySQL quitó el índice automático de la
+-- clave foránea usuario_id: hay que volver a crearlo antes de borrarlos
+CREATE INDEX usuario_id ON pedidos (usuario_id);
+DROP INDEX idx_pedidos_usuario_created ON pedidos;
+CREATE INDEX usuario_id ON direcciones (usuario_id);
+DROP INDEX idx_direcciones_usuario_principal ON direcciones;
+
+-- En carritos la clave única (usuario_id, producto_id) ya cubre la clave foránea
+DROP INDEX idx_carritos_usuario_created ON carritos;
@@ -0,0 +1,17 @@
+-- Productos: conteo por categoría (categorias.py) y stock bajo (dashboard)
+CREATE INDEX idx_productos_categoria ON productos (categoria);
+CREATE INDEX idx_productos_stock ON productos (stock);
+
+-- Usuarios: listado del admin ordenado por fecha, altas de hoy y conteo por rol
+CREATE INDEX idx_usuarios_created ON usuarios (created_at);
+CREATE INDEX idx_usuarios_rol ON usuarios (rol);
+
+-- Pedidos: historial de un usuario y listado del admin, ambos por fecha
+CREATE INDEX idx_pedidos_usuario_created ON pedidos (usuario_id, created_at);
+CREATE INDEX idx_pedidos_created ON pedidos (created_at);
+
+-- Direcciones de un usuario, la principal primero y luego las más nuevas
+CREATE INDEX idx_direcciones_usuario_principal ON direcciones (usuario_id, es_principal, created_at);
+
+-- Carrito de un usuario ordenado por fecha
+CREATE INDEX idx_carritos_usuario_created ON carritos (usuario_id, created_at);
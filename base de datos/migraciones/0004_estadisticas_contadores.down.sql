@@ -0,0 +1 @@
+DROP TABLE estadisticas_contadores;
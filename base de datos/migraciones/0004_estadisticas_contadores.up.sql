@@ -0,0 +1,7 @@
+-- Contadores del dashboard que se actualizan al escribir (estadisticas.py).
+-- Los diarios usan claves con la fecha, por ejemplo 'pedidos:2024-01-31'
+CREATE TABLE estadisticas_contadores (
+    clave VARCHAR(50) PRIMARY KEY,
+    valor DECIMAL(14,2) NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,2 @@
+DROP INDEX idx_pedidos_estado_created ON pedidos;
+ALTER TABLE pedidos DROP COLUMN total_items;
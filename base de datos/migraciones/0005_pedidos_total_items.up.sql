@@ -0,0 +1,14 @@
+-- Cantidad de productos distintos del pedido, guardada al crearlo para que
+-- los listados no tengan que agrupar pedido_items
+ALTER TABLE pedidos ADD COLUMN total_items INT NOT NULL DEFAULT 0;
+
+UPDATE pedidos p
+JOIN (
+    SELECT pedido_id, COUNT(*) AS total
+    FROM pedido_items
+    GROUP BY pedido_id
+) items ON items.pedido_id = p.id
+SET p.total_items = items.total;
+
+-- Listado del admin filtrado por estado y ordenado por fecha
+CREATE INDEX idx_pedidos_estado_created ON pedidos (estado, created_at);
@@ -0,0 +1,2 @@
+DROP TABLE catalogo_version;
+ALTER TABLE productos DROP COLUMN updated_at;
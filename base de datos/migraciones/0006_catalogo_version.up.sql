@@ -0,0 +1,13 @@
+-- Fecha de la última modificación de cada producto (cambia también con el stock)
+ALTER TABLE productos
+    ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP;
+UPDATE productos SET updated_at = created_at;
+
+-- Versión del catálogo: la suben las escrituras del admin y cada proceso la
+-- consulta cada pocos segundos para saber si tiene que recargar su caché
+CREATE TABLE catalogo_version (
+    id TINYINT PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+INSERT INTO catalogo_version (id, version) VALUES (1, 1);
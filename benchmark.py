@@ -0,0 +1,400 @@
+"""Benchmark de carga de la tienda con usuarios simulados
+
+Levanta la app (en este proceso, con el servidor de werkzeug en un hilo) contra
+una base de datos MySQL local y la recorre con varios usuarios concurrentes
+que siguen escenarios realistas:
+
+    navegar  anónimo (otra sesión HTTP, sin la cookie del login): /, /productos,
+             /producto/<id> (con productos más populares que otros)
+    buscar   /api/buscar-productos y /api/productos con filtros y órdenes
+    carrito  agregar, contador, detalle, cambios de cantidad en lote
+             (/api/carrito/batch, como el carrito de main.js) y eliminar
+    compra   agregar productos, ajustar cantidades en lote, /checkout y /procesar-pedido
+
+Al terminar muestra, por endpoint, peticiones por segundo y latencias p50,
+p95 y p99, y puede guardar el resultado como base y compararlo con otra.
+
+Uso (las variables DB_* deben apuntar a un MySQL local, nunca al de producción):
+    DB_HOST=127.0.0.1 DB_NAME=tienda_bench python benchmark.py --preparar
+    DB_HOST=127.0.0.1 DB_NAME=tienda_bench python benchmark.py --usuarios 50 --duracion 60 --guardar base.json
+    DB_HOST=127.0.0.1 DB_NAME=tienda_bench python benchmark.py --comparar base.json
+
+Para medir con volúmenes grandes, después de --preparar se pueden cargar más
+datos con generar_datos.py.
+
+Con --url se prueba un servidor ya levantado (por ejemplo con gunicorn) en
+lugar de la app en este proceso.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+import mysql.connector
+import requests
+
+from generar_datos import comprobar_bd_local, generar_productos
+
+CARPETA_BD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base de datos')
+ESQUEMA_BASE = os.path.join(CARPETA_BD, 'basededatosTechstore.sql')
+
+PREFIJO_USUARIOS = 'bench'
+PASSWORD_USUARIOS = 'bench123'
+STOCK_BENCHMARK = 1_000_000  # las compras no deben quedarse sin stock durante la prueba
+
+BUSQUEDAS = ('ssd', 'ryzen', 'monitor', 'ddr4', 'rtx', 'gaming', 'intel', 'corsair', 'samsung', '1tb')
+CATEGORIAS = ('Procesadores', 'Tarjetas Gráficas', 'Memoria RAM', 'Almacenamiento', 'Monitores', 'Periféricos')
+ORDENES = ('recientes', 'precio_asc', 'precio_desc', 'nombre')
+PRECIOS = ('0-100', '100-300', '300-500', '500+')
+MEZCLA_POR_DEFECTO = 'navegar=50,buscar=25,carrito=15,compra=10'
+
+
+def _config_bd():
+    from database import DB_CONFIG
+    return dict(DB_CONFIG)
+
+
+# =============================================
+# PREPARACIÓN DE LA BASE DE DATOS
+# =============================================
+
+def preparar(usuarios, productos_extra, semilla):
+    """Crear la base desde cero: esquema, migraciones y datos de la prueba"""
+    import migrar
+
+    config = _config_bd()
+    nombre_bd = config.pop('database')
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f'DROP DATABASE IF EXISTS `{nombre_bd}`')
+    cursor.execute(f'CREATE DATABASE `{nombre_bd}` CHARACTER SET utf8mb4')
+    cursor.execute(f'USE `{nombre_bd}`')
+    for sentencia in migrar.leer_sentencias(ESQUEMA_BASE):
+        # El archivo base crea y usa su propia base: aquí ya estamos en la de la prueba
+        if sentencia.upper().startswith(('CREATE DATABASE', 'USE ')):
+            continue
+        cursor.execute(sentencia)
+    conn.commit()
+    cursor.close()
+    if migrar.main(['subir']) != 0:
+        conn.close()
+        sys.exit(1)
+
+    cursor = conn.cursor()
+    generar_productos(conn, productos_extra, random.Random(semilla), 1000, stock=STOCK_BENCHMARK)
+    cursor.execute('UPDATE productos SET stock = %s', (STOCK_BENCHMARK,))
+
+    from auth import Auth
+    hashed = Auth.hash_password(PASSWORD_USUARIOS)
+    cursor.executemany('''
+        INSERT INTO usuarios (email, password, nombre, apellido) VALUES (%s, %s, %s, %s)
+    ''', [(f"{PREFIJO_USUARIOS}{i}@bench.local", hashed, f"Usuario{i}", 'Benchmark') for i in range(usuarios)])
+    cursor.execute('''
+        INSERT INTO direcciones (usuario_id, nombre, direccion, ciudad, codigo_postal, telefono_contacto, es_principal)
+        SELECT id, 'Casa', 'Calle Falsa 123', 'Bogotá', '110111', '3000000000', TRUE
+        FROM usuarios WHERE email LIKE %s
+    ''', (f"{PREFIJO_USUARIOS}%",))
+    conn.commit()
+    conn.close()
+    print(f"✅ Base {nombre_bd} preparada: {usuarios} usuarios y {productos_extra} productos extra")
+
+
+def leer_datos():
+    """Ids de productos y usuarios de la prueba (con su dirección) desde la base"""
+    conn = mysql.connector.connect(**_config_bd())
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id FROM productos WHERE stock > 0 ORDER BY id')
+        productos = [fila[0] for fila in cursor.fetchall()]
+        cursor.execute('''
+            SELECT u.email, MIN(d.id) FROM usuarios u
+            JOIN direcciones d ON d.usuario_id = u.id
+            WHERE u.email LIKE %s
+            GROUP BY u.id, u.email ORDER BY u.id
+        ''', (f"{PREFIJO_USUARIOS}%",))
+        usuarios = cursor.fetchall()
+    finally:
+        conn.close()
+    if not productos or not usuarios:
+        print("❌ La base no tiene datos de benchmark: ejecutar primero con --preparar")
+        sys.exit(2)
+    return productos, usuarios
+
+
+# =============================================
+# USUARIOS SIMULADOS
+# =============================================
+
+class Registro:
+    """Latencias por endpoint de todos los usuarios (solo después del calentamiento)"""
+
+    def __init__(self, desde):
+        self.desde = desde
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.errores = {}
+
+    def anotar(self, endpoint, segundos, error):
+        if time.monotonic() < self.desde:
+            return
+        with self._lock:
+            self.latencias.setdefault(endpoint, []).append(segundos)
+            if error:
+                self.errores[endpoint] = self.errores.get(endpoint, 0) + 1
+
+
+class UsuarioSimulado:
+    def __init__(self, base_url, registro, rng, productos, pesos_productos, cuenta=None):
+        self.base_url = base_url
+        self.registro = registro
+        self.rng = rng
+        self.productos = productos
+        self.pesos_productos = pesos_productos
+        self.cuenta = cuenta  # (email, direccion_id) o None para anónimo
+        self.sesion = requests.Session()
+        # Visitas sin cuenta: otra sesión que nunca inicia sesión
+        self.anonima = requests.Session()
+        self.conectado = False
+
+    def pedir(self, metodo, ruta, endpoint=None, sesion=None, **kwargs):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            respuesta = (sesion or self.sesion).request(metodo, self.base_url + ruta, allow_redirects=False, timeout=30, **kwargs)
+            error = respuesta.status_code >= 400
+        except requests.RequestException:
+            respuesta = None
+            error = True
+        self.registro.anotar(f"{metodo} {endpoint or ruta}", time.perf_counter() - inicio, error)
+        return respuesta
+
+    def producto(self):
+        # Popularidad sesgada: unos pocos productos reciben la mayoría de las visitas
+        return self.rng.choices(self.productos, cum_weights=self.pesos_productos)[0]
+
+    def iniciar_sesion(self):
+        if not self.conectado and self.cuenta:
+            self.pedir('POST', '/login', data={'email': self.cuenta[0], 'password': PASSWORD_USUARIOS})
+            self.conectado = True
+
+    def navegar(self):
+        self.pedir('GET', '/', sesion=self.anonima)
+        self.pedir('GET', f"/productos?orden={self.rng.choice(ORDENES)}", '/productos', sesion=self.anonima)
+        for _ in range(self.rng.randint(1, 4)):
+            self.pedir('GET', f"/producto/{self.producto()}", '/producto/<id>', sesion=self.anonima)
+
+    def _lote(self, operaciones):
+        self.pedir('POST', '/api/carrito/batch', json={'operaciones': operaciones})
+
+    def buscar(self):
+        parametros = {'q': self.rng.choice(BUSQUEDAS)}
+        if self.rng.random() < 0.4:
+            parametros['categoria'] = self.rng.choice(CATEGORIAS)
+        if self.rng.random() < 0.3:
+            parametros['precio'] = self.rng.choice(PRECIOS)
+        self.pedir('GET', '/api/buscar-productos', params=parametros)
+        self.pedir('GET', '/api/productos', params={'orden': self.rng.choice(ORDENES), 'limite': 24})
+        self.pedir('GET', f"/api/productos/{self.producto()}", '/api/productos/<id>')
+
+    def carrito(self):
+        self.iniciar_sesion()
+        producto_id = self.producto()
+        self.pedir('GET', f"/api/carrito/agregar/{producto_id}", '/api/carrito/agregar/<id>')
+        self.pedir('GET', '/api/carrito/contador')
+        self.pedir('GET', '/api/carrito/detalle')
+        # Cambios de cantidad acumulados por main.js y enviados juntos
+        otro_id = self.producto()
+        self._lote([
+            {'op': 'agregar', 'producto_id': otro_id, 'cantidad': 1},
+            {'op': 'fijar', 'producto_id': producto_id, 'cantidad': self.rng.randint(1, 3)},
+        ])
+        self._lote([{'op': 'eliminar', 'producto_id': otro_id}])
+        self.pedir('GET', f"/api/carrito/eliminar/{producto_id}", '/api/carrito/eliminar/<id>')
+
+    def compra(self):
+        self.iniciar_sesion()
+        elegidos = [self.producto() for _ in range(self.rng.randint(1, 3))]
+        for producto_id in elegidos:
+            self.pedir('GET', f"/api/carrito/agregar/{producto_id}", '/api/carrito/agregar/<id>')
+        self._lote([{'op': 'fijar', 'producto_id': self.rng.choice(elegidos), 'cantidad': self.rng.randint(1, 2)}])
+        self.pedir('GET', '/checkout')
+        self.pedir('POST', '/procesar-pedido',
+                   data={'direccion_id': self.cuenta[1], 'metodo_pago': 'tarjeta_credito'})
+
+
+def leer_mezcla(texto):
+    """'navegar=50,buscar=25' -> [('navegar', 50), ('buscar', 25)]"""
+    mezcla = []
+    for parte in texto.split(','):
+        nombre, _, peso = parte.partition('=')
+        nombre = nombre.strip()
+        if not hasattr(UsuarioSimulado, nombre) or nombre.startswith('_'):
+            raise argparse.ArgumentTypeError(f"escenario desconocido: {nombre}")
+        mezcla.append((nombre, float(peso or 1)))
+    return mezcla
+
+
+def ejecutar(base_url, args, productos, cuentas):
+    registro = Registro(time.monotonic() + args.calentamiento)
+    fin = time.monotonic() + args.calentamiento + args.duracion
+    # Pesos tipo Zipf: el producto en la posición k se visita ~1/k^1.1 veces
+    orden_popularidad = random.Random(args.semilla).sample(productos, len(productos))
+    acumulado, pesos = 0.0, []
+    for posicion in range(1, len(orden_popularidad) + 1):
+        acumulado += 1 / posicion ** 1.1
+        pesos.append(acumulado)
+    escenarios = [nombre for nombre, _ in args.mezcla]
+    pesos_escenarios = [peso for _, peso in args.mezcla]
+
+    def usuario(numero):
+        rng = random.Random(args.semilla + numero)
+        simulado = UsuarioSimulado(base_url, registro, rng, orden_popularidad, pesos, cuentas[numero % len(cuentas)])
+        while time.monotonic() < fin:
+            getattr(simulado, rng.choices(escenarios, weights=pesos_escenarios)[0])()
+            if args.pausa:
+                time.sleep(rng.expovariate(1 / args.pausa))
+
+    hilos = [threading.Thread(target=usuario, args=(i,), daemon=True) for i in range(args.usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return registro
+
+
+# =============================================
+# RESULTADOS
+# =============================================
+
+def percentil(ordenadas, p):
+    """Percentil p (0-100) por rango más cercano de una lista ordenada"""
+    if not ordenadas:
+        return 0.0
+    indice = max(0, min(len(ordenadas) - 1, int(round(p / 100 * len(ordenadas) + 0.5)) - 1))
+    return ordenadas[indice]
+
+
+def resumir(registro, duracion):
+    endpoints = {}
+    todas = []
+    for endpoint, latencias in sorted(registro.latencias.items()):
+        ordenadas = sorted(latencias)
+        todas.extend(ordenadas)
+        endpoints[endpoint] = {
+            'peticiones': len(ordenadas),
+            'errores': registro.errores.get(endpoint, 0),
+            'rps': round(len(ordenadas) / duracion, 2),
+            'p50_ms': round(percentil(ordenadas, 50) * 1000, 2),
+            'p95_ms': round(percentil(ordenadas, 95) * 1000, 2),
+            'p99_ms': round(percentil(ordenadas, 99) * 1000, 2),
+            'max_ms': round(ordenadas[-1] * 1000, 2),
+        }
+    todas.sort()
+    total = {
+        'peticiones': len(todas),
+        'errores': sum(registro.errores.values()),
+        'rps': round(len(todas) / duracion, 2),
+        'p50_ms': round(percentil(todas, 50) * 1000, 2),
+        'p95_ms': round(percentil(todas, 95) * 1000, 2),
+        'p99_ms': round(percentil(todas, 99) * 1000, 2),
+    }
+    return endpoints, total
+
+
+def imprimir(endpoints, total):
+    print(f"\n{'endpoint':<42} {'pet':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, datos in list(endpoints.items()) + [('TOTAL', total)]:
+        print(f"{endpoint:<42} {datos['peticiones']:>7} {datos['errores']:>5} {datos['rps']:>8.1f} "
+              f"{datos['p50_ms']:>8.1f} {datos['p95_ms']:>8.1f} {datos['p99_ms']:>8.1f}")
+
+
+def comparar(actual, base, tolerancia):
+    """Comparar con un resultado guardado; devuelve True si no hay regresiones"""
+    print(f"\nComparación con la base del {base.get('fecha', '?')} (tolerancia {tolerancia:.0%})")
+    regresiones = 0
+    for endpoint, datos in list(actual['endpoints'].items()) + [('TOTAL', actual['total'])]:
+        anterior = base['total'] if endpoint == 'TOTAL' else base.get('endpoints', {}).get(endpoint)
+        if not anterior or not anterior['p95_ms'] or not anterior['rps']:
+            continue
+        cambio_p95 = datos['p95_ms'] / anterior['p95_ms'] - 1
+        cambio_rps = datos['rps'] / anterior['rps'] - 1
+        peor = cambio_p95 > tolerancia or cambio_rps < -tolerancia
+        regresiones += peor
+        print(f"{'❌' if peor else '✅'} {endpoint:<42} p95 {anterior['p95_ms']:.1f} -> {datos['p95_ms']:.1f} ms "
+              f"({cambio_p95:+.0%}), rps {anterior['rps']:.1f} -> {datos['rps']:.1f} ({cambio_rps:+.0%})")
+    return regresiones == 0
+
+
+def iniciar_servidor(puerto):
+    """Servir la app en este proceso en un hilo; devuelve la URL base"""
+    import logging
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Sin una línea de log por petición: escribir en la consola también cuesta
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    servidor = make_server('127.0.0.1', puerto, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_port}"
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Benchmark de carga de la tienda')
+    parser.add_argument('--preparar', action='store_true', help='recrear la base con esquema y datos de prueba y salir')
+    parser.add_argument('--usuarios-bd', type=int, default=200, help='usuarios a crear con --preparar')
+    parser.add_argument('--productos-bd', type=int, default=2000, help='productos extra a crear con --preparar')
+    parser.add_argument('--usuarios', type=int, default=20, help='usuarios simulados concurrentes')
+    parser.add_argument('--duracion', type=float, default=30, help='segundos medidos')
+    parser.add_argument('--calentamiento', type=float, default=5, help='segundos iniciales que no se miden')
+    parser.add_argument('--pausa', type=float, default=0, help='pausa media entre escenarios de un usuario (s)')
+    parser.add_argument('--mezcla', type=leer_mezcla, default=leer_mezcla(MEZCLA_POR_DEFECTO),
+                        help=f'peso de cada escenario (por defecto {MEZCLA_POR_DEFECTO})')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--url', help='probar un servidor ya levantado en lugar de la app en este proceso')
+    parser.add_argument('--puerto', type=int, default=0, help='puerto del servidor en este proceso (0: libre)')
+    parser.add_argument('--guardar', help='guardar el resultado en este JSON (base para comparar)')
+    parser.add_argument('--comparar', help='comparar con un resultado guardado; sale con 1 si hay regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.15, help='empeoramiento admitido al comparar (0.15 = 15%%)')
+    parser.add_argument('--permitir-remota', action='store_true')
+    args = parser.parse_args(argumentos)
+
+    comprobar_bd_local(args.permitir_remota)
+    if args.preparar:
+        preparar(args.usuarios_bd, args.productos_bd, args.semilla)
+        return 0
+
+    productos, cuentas = leer_datos()
+    base_url = args.url.rstrip('/') if args.url else iniciar_servidor(args.puerto)
+    print(f"🏁 {args.usuarios} usuarios durante {args.duracion:.0f}s (+{args.calentamiento:.0f}s de calentamiento) "
+          f"contra {base_url}")
+    registro = ejecutar(base_url, args, productos, cuentas)
+    endpoints, total = resumir(registro, args.duracion)
+    imprimir(endpoints, total)
+
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'configuracion': {
+            'usuarios': args.usuarios, 'duracion': args.duracion, 'calentamiento': args.calentamiento,
+            'pausa': args.pausa, 'mezcla': dict(args.mezcla), 'semilla': args.semilla,
+            'productos': len(productos), 'url': args.url or 'en proceso'
+        },
+        'endpoints': endpoints,
+        'total': total
+    }
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado guardado en {args.guardar}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+        return 0 if comparar(resultado, base, args.tolerancia) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
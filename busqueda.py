@@ -0,0 +1,161 @@
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+# Peso de cada campo al contar apariciones de un término
+PESOS_CAMPOS = {'nombre': 3, 'categoria': 2, 'descripcion': 1}
+# Parámetros de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Máximo de términos del vocabulario en los que se expande un prefijo
+MAX_EXPANSION_PREFIJO = 50
+
+_PATRON_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalizar(texto):
+    """Pasar a minúsculas y quitar tildes (ñ -> n, á -> a...)"""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', str(texto).casefold())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """Lista de términos normalizados de un texto"""
+    return _PATRON_TOKEN.findall(normalizar(texto))
+
+
+class IndiceBusqueda:
+    """Índice invertido del catálogo con ranking BM25 y búsqueda por prefijo
+
+    Guarda para cada término la lista de productos que lo contienen (con su
+    frecuencia ponderada por campo), así una búsqueda solo recorre los
+    productos que coinciden y no todo el catálogo.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}       # termino -> {producto_id: frecuencia ponderada}
+        self._vocabulario = []    # términos ordenados, para expandir prefijos
+        self._terminos_doc = {}   # producto_id -> {termino: frecuencia}
+        self._longitud_doc = {}   # producto_id -> longitud ponderada
+        self._longitud_total = 0
+        self._por_categoria = {}  # categoria -> set de producto_id
+        self._categoria_doc = {}  # producto_id -> categoria
+
+    def _terminos_producto(self, producto):
+        frecuencias = {}
+        for campo, peso in PESOS_CAMPOS.items():
+            for termino in tokenizar(producto.get(campo)):
+                frecuencias[termino] = frecuencias.get(termino, 0) + peso
+        return frecuencias
+
+    def agregar(self, producto):
+        """Indexar (o reindexar) un producto"""
+        with self._lock:
+            producto_id = producto['id']
+            if producto_id in self._terminos_doc:
+                self.eliminar(producto_id)
+
+            frecuencias = self._terminos_producto(producto)
+            for termino, frecuencia in frecuencias.items():
+                posting = self._postings.get(termino)
+                if posting is None:
+                    posting = self._postings[termino] = {}
+                    insort(self._vocabulario, termino)
+                posting[producto_id] = frecuencia
+
+            longitud = sum(frecuencias.values())
+            self._terminos_doc[producto_id] = frecuencias
+            self._longitud_doc[producto_id] = longitud
+            self._longitud_total += longitud
+
+            categoria = producto.get('categoria')
+            self._categoria_doc[producto_id] = categoria
+            self._por_categoria.setdefault(categoria, set()).add(producto_id)
+
+    def eliminar(self, producto_id):
+        """Quitar un producto del índice"""
+        with self._lock:
+            frecuencias = self._terminos_doc.pop(producto_id, None)
+            if frecuencias is None:
+                return
+            for termino in frecuencias:
+                posting = self._postings[termino]
+                posting.pop(producto_id, None)
+                if not posting:
+                    del self._postings[termino]
+                    del self._vocabulario[bisect_left(self._vocabulario, termino)]
+            self._longitud_total -= self._longitud_doc.pop(producto_id)
+
+            categoria = self._categoria_doc.pop(producto_id)
+            ids = self._por_categoria.get(categoria)
+            if ids is not None:
+                ids.discard(producto_id)
+                if not ids:
+                    del self._por_categoria[categoria]
+
+    def _expandir_prefijo(self, prefijo):
+        inicio = bisect_left(self._vocabulario, prefijo)
+        terminos = []
+        for termino in self._vocabulario[inicio:inicio + MAX_EXPANSION_PREFIJO]:
+            if not termino.startswith(prefijo):
+                break
+            terminos.append(termino)
+        return terminos
+
+    def _idf(self, termino):
+        total = len(self._terminos_doc)
+        df = len(self._postings.get(termino, ()))
+        return math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+    def buscar(self, consulta, categoria=None):
+        """Ids de productos que contienen todos los términos, ordenados por relevancia
+
+        El último término se trata como prefijo (búsqueda mientras se escribe).
+        Con categoria, se intersecta con la lista de productos de esa categoría.
+        """
+        terminos = tokenizar(consulta)
+        with self._lock:
+            if categoria:
+                candidatos = self._por_categoria.get(categoria)
+                if not candidatos:
+                    return []
+            else:
+                candidatos = None
+
+            if not terminos:
+                return sorted(candidatos) if candidatos is not None else []
+
+            longitud_media = self._longitud_total / max(len(self._terminos_doc), 1)
+            puntajes = None
+            for posicion, termino in enumerate(terminos):
+                if posicion == len(terminos) - 1:
+                    expansion = self._expandir_prefijo(termino)
+                else:
+                    expansion = [termino] if termino in self._postings else []
+
+                # Puntaje de este término de la consulta en cada producto
+                parciales = {}
+                for variante in expansion:
+                    idf = self._idf(variante)
+                    for producto_id, frecuencia in self._postings[variante].items():
+                        if candidatos is not None and producto_id not in candidatos:
+                            continue
+                        if puntajes is not None and producto_id not in puntajes:
+                            continue
+                        normalizacion = 1 - BM25_B + BM25_B * self._longitud_doc[producto_id] / longitud_media
+                        puntaje = idf * frecuencia * (BM25_K1 + 1) / (frecuencia + BM25_K1 * normalizacion)
+                        parciales[producto_id] = max(parciales.get(producto_id, 0), puntaje)
+
+                if puntajes is None:
+                    puntajes = parciales
+                else:
+                    puntajes = {i: puntajes[i] + p for i, p in parciales.items()}
+                if not puntajes:
+                    return []
+
+            return sorted(puntajes, key=lambda i: (-puntajes[i], i))
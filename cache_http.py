@@ -0,0 +1,115 @@
+import glob
+import hashlib
+import os
+from datetime import timezone
+from functools import wraps
+from flask import request, session, make_response
+from werkzeug.http import is_resource_modified
+from catalogo import Catalogo
+from database import ZONA_BD
+from carrito_db import ResumenCarrito
+from metricas import Metricas
+
+# Segundos que el navegador (o un proxy) puede reutilizar el JSON del catálogo sin revalidar
+CACHE_CATALOGO_MAX_AGE = int(os.environ.get('CACHE_CATALOGO_MAX_AGE', 30))
+# Margen extra en el que puede servir la copia vencida mientras revalida
+CACHE_CATALOGO_STALE = int(os.environ.get('CACHE_CATALOGO_STALE', 60))
+
+_RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+
+_version = None
+
+
+def version_despliegue():
+    """Identificador del código desplegado (APP_VERSION, o fechas de plantillas, módulos y estáticos)
+
+    Entra en los etags para que un despliegue que cambia el HTML o el JSON
+    no deje a los clientes con la copia anterior. Se calcula en la primera
+    petición y no al importar, así incluye el manifiesto aunque los estáticos
+    se construyan después de importar la app.
+    """
+    global _version
+    if _version is None:
+        _version = _calcular_version()
+    return _version
+
+
+def _calcular_version():
+    if os.environ.get('APP_VERSION'):
+        return os.environ['APP_VERSION']
+    resumen = hashlib.sha1()
+    archivos = glob.glob(os.path.join(_RAIZ, '*.py')) + glob.glob(os.path.join(_RAIZ, 'templates', '**', '*.html'), recursive=True)
+    # El HTML enlaza los estáticos por su hash: un build nuevo también cambia la versión
+    archivos += glob.glob(os.path.join(_RAIZ, 'static', 'dist', 'manifest.json'))
+    for archivo in sorted(archivos):
+        resumen.update(f"{os.path.relpath(archivo, _RAIZ)}:{os.path.getmtime(archivo)};".encode())
+    return resumen.hexdigest()[:12]
+
+
+def _a_utc(fecha):
+    if fecha is None:
+        return None
+    if fecha.tzinfo is None:
+        # Los TIMESTAMP llegan sin zona, en la de la sesión de MySQL (no en la de la app)
+        fecha = fecha.replace(tzinfo=ZONA_BD)
+    return fecha.astimezone(timezone.utc)
+
+
+def version_catalogo(por_usuario=False):
+    """(etag, última modificación) de una respuesta que depende del catálogo
+
+    Con por_usuario el etag incluye también lo que el HTML muestra de la
+    sesión (nombre, rol y resumen del carrito) y no se da fecha, porque esos
+    cambios no la mueven. No consulta la base de datos salvo cuando el
+    catálogo en memoria tiene que refrescarse.
+    """
+    etag, modificado = Catalogo.version()
+    if etag is None:
+        return None, None
+    partes = [version_despliegue(), etag]
+    if por_usuario:
+        modificado = None
+        if 'user_id' in session:
+            resumen = ResumenCarrito.obtener(session['user_id'])
+            partes += [str(session['user_id']), session.get('user_nombre', ''), session.get('user_rol', ''), resumen['version']]
+    return hashlib.sha1(':'.join(partes).encode()).hexdigest()[:20], _a_utc(modificado)
+
+
+def condicional(por_usuario=False):
+    """Decorador para vistas de solo lectura del catálogo con ETag y Last-Modified
+
+    Si If-None-Match (o If-Modified-Since) coincide con la versión actual
+    responde 304 sin ejecutar la vista. El JSON es igual para todos y se
+    marca como público; las páginas HTML (por_usuario=True) llevan datos de
+    la sesión y son privadas, y el navegador las revalida siempre.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            etag, modificado = version_catalogo(por_usuario)
+            if etag is None:
+                return vista(*args, **kwargs)
+
+            no_modificado = not is_resource_modified(request.environ, etag=etag, last_modified=modificado)
+            Metricas.contar_cache('http_condicional', no_modificado)
+            if no_modificado:
+                respuesta = make_response('', 304)
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+                if modificado is not None:
+                    respuesta.last_modified = modificado
+
+            respuesta.set_etag(etag)
+            if por_usuario:
+                respuesta.headers['Cache-Control'] = 'private, no-cache'
+                respuesta.vary.add('Cookie')
+            else:
+                respuesta.headers['Cache-Control'] = (
+                    f'public, max-age={CACHE_CATALOGO_MAX_AGE}, stale-while-revalidate={CACHE_CATALOGO_STALE}'
+                )
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,116 @@
+"""Calentamiento del proceso antes de recibir tráfico y de forma periódica
+
+Reemplaza al antiguo keep-alive (un hilo que se hacía ping a sí mismo por
+internet cada 8 minutos). Todo ocurre dentro del proceso:
+
+- pool: abrir las conexiones mínimas del pool de MySQL
+- plantillas: compilar todas las plantillas de templates/ y guardar el
+  bytecode en disco (los procesos siguientes lo leen en lugar de compilar)
+- catalogo: cargar el catálogo en memoria, con su índice de búsqueda y las
+  facetas por categoría
+
+Cada ejecución informa cuánto tardó cada fase; la última queda en
+Calentamiento.informe (se muestra en /api/status).
+"""
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from jinja2 import FileSystemBytecodeCache
+import database
+from catalogo import Catalogo
+
+# Cada cuántos segundos se repite el calentamiento (0: solo al arrancar)
+CALENTAMIENTO_INTERVALO = float(os.environ.get('CALENTAMIENTO_INTERVALO', 480))
+# Carpeta del bytecode de las plantillas (compartida por todos los procesos)
+CARPETA_BYTECODE = os.environ.get('PLANTILLAS_BYTECODE',
+                                  os.path.join(tempfile.gettempdir(), 'techstore-jinja'))
+
+
+def _fase_pool(app):
+    database.get_pool().llenar()
+    libres = database.estadisticas_pool().get('libres')
+    return f"{libres} conexiones libres"
+
+
+def _fase_plantillas(app):
+    nombres = app.jinja_env.list_templates(filter_func=lambda nombre: nombre.endswith('.html'))
+    for nombre in nombres:
+        app.jinja_env.get_template(nombre)
+    return f"{len(nombres)} plantillas"
+
+
+def _fase_catalogo(app):
+    return f"{Catalogo.precargar()} productos"
+
+
+FASES = (
+    ('pool', _fase_pool),
+    ('plantillas', _fase_plantillas),
+    ('catalogo', _fase_catalogo),
+)
+
+
+class Calentamiento:
+    """Ejecuta las fases de calentamiento y guarda el último informe"""
+    informe = None
+    _hilo = None
+    _hilo_lock = threading.Lock()
+
+    @staticmethod
+    def ejecutar(app):
+        """Ejecutar todas las fases; un error en una no impide las demás"""
+        fases = {}
+        inicio = time.perf_counter()
+        for nombre, fase in FASES:
+            inicio_fase = time.perf_counter()
+            try:
+                detalle, ok = fase(app), True
+            except Exception as e:
+                detalle, ok = str(e), False
+            fases[nombre] = {'ms': round((time.perf_counter() - inicio_fase) * 1000, 1), 'ok': ok, 'detalle': detalle}
+
+        informe = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'total_ms': round((time.perf_counter() - inicio) * 1000, 1),
+            'fases': fases
+        }
+        Calentamiento.informe = informe
+        resumen = ', '.join(
+            f"{nombre} {datos['ms']:.0f} ms ({datos['detalle']})" if datos['ok']
+            else f"{nombre} ❌ {datos['detalle']}"
+            for nombre, datos in fases.items()
+        )
+        print(f"🔥 Calentamiento en {informe['total_ms']:.0f} ms: {resumen}")
+        return informe
+
+    @staticmethod
+    def iniciar(app):
+        """Calentar ahora (antes de aceptar tráfico) y luego cada CALENTAMIENTO_INTERVALO"""
+        Calentamiento.ejecutar(app)
+        if CALENTAMIENTO_INTERVALO <= 0:
+            return
+        with Calentamiento._hilo_lock:
+            if Calentamiento._hilo is not None and Calentamiento._hilo.is_alive():
+                return
+
+            def calentar_periodicamente():
+                while True:
+                    time.sleep(CALENTAMIENTO_INTERVALO)
+                    try:
+                        Calentamiento.ejecutar(app)
+                    except Exception as e:
+                        print(f"⚠️  Error inesperado en el calentamiento: {e}")
+
+            Calentamiento._hilo = threading.Thread(target=calentar_periodicamente, daemon=True)
+            Calentamiento._hilo.start()
+
+
+def init_app(app):
+    """Guardar el bytecode de las plantillas en disco (antes de compilar ninguna)"""
+    try:
+        os.makedirs(CARPETA_BYTECODE, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(CARPETA_BYTECODE)
+    except OSError as e:
+        print(f"⚠️  Sin caché de bytecode de plantillas: {e}")
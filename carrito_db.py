@@ -1,4 +1,127 @@
-from database import get_db_connection
+import hashlib
+import os
+import secrets
+import threading
+import time
+from decimal import Decimal
+from flask import has_request_context, session
+from database import get_db_connection, transaccion
+from metricas import Metricas
+
+# Segundos que vale el resumen guardado (acota el desfase con otras sesiones del mismo usuario)
+CARRITO_RESUMEN_TTL = float(os.environ.get('CARRITO_RESUMEN_TTL', 30))
+# Máximo de usuarios con resumen en memoria
+CARRITO_RESUMEN_MAXIMO = 10000
+
+# Consultas frecuentes del carrito (migrar.py verificar hace EXPLAIN de estas mismas)
+SQL_CARRITO_USUARIO = '''
+    SELECT c.*, p.nombre, p.precio, p.imagen, p.categoria, p.stock
+    FROM carritos c
+    JOIN productos p ON c.producto_id = p.id
+    WHERE c.usuario_id = %s
+    ORDER BY c.created_at DESC
+'''
+SQL_RESUMEN_CARRITO = '''
+    SELECT SUM(c.cantidad), SUM(c.cantidad * p.precio)
+    FROM carritos c
+    JOIN productos p ON c.producto_id = p.id
+    WHERE c.usuario_id = %s
+'''
+SQL_AGREGAR_AL_CARRITO = '''
+    INSERT INTO carritos (usuario_id, producto_id, cantidad)
+    SELECT %s, productos.id, %s FROM productos
+    WHERE productos.id = %s AND productos.stock >= %s
+    ON DUPLICATE KEY UPDATE cantidad = IF(
+        carritos.cantidad + %s <= productos.stock,
+        carritos.cantidad + %s,
+        carritos.cantidad
+    )
+'''
+
+
+class ResumenCarrito:
+    """Caché por usuario del resumen del carrito: items, subtotal y versión
+
+    Se usa en cada página (contador del navbar), así que se guarda en memoria
+    y cada modificación del carrito lo invalida o lo reemplaza. La caché es
+    de cada proceso: para que los demás workers no sirvan un resumen viejo,
+    cada modificación anota una marca nueva en la sesión (la cookie llega a
+    cualquier worker) y un resumen guardado con otra marca no se usa. Los
+    cambios hechos desde otra sesión del mismo usuario se ven al vencer
+    CARRITO_RESUMEN_TTL.
+    """
+    _lock = threading.Lock()
+    _resumenes = {}  # usuario_id -> (resumen, guardado_en, marca de la sesión)
+
+    @staticmethod
+    def _marca():
+        """Marca del último cambio del carrito guardada en la sesión (None fuera de una petición)"""
+        return session.get('carrito_marca') if has_request_context() else None
+
+    @staticmethod
+    def _marcar_cambio():
+        if has_request_context():
+            session['carrito_marca'] = secrets.token_hex(4)
+
+    @staticmethod
+    def _crear(contador, subtotal):
+        contador = int(contador or 0)
+        subtotal = Decimal(subtotal or 0).quantize(Decimal('0.01'))
+        # La versión depende solo del contenido: sirve de ETag en cualquier proceso
+        version = hashlib.sha1(f"{contador}:{subtotal}".encode()).hexdigest()[:16]
+        return {'contador': contador, 'subtotal': subtotal, 'version': version}
+
+    @staticmethod
+    def _guardar(usuario_id, resumen):
+        with ResumenCarrito._lock:
+            ResumenCarrito._resumenes.pop(usuario_id, None)
+            if len(ResumenCarrito._resumenes) >= CARRITO_RESUMEN_MAXIMO:
+                # Descartar el más antiguo (los dict mantienen el orden de inserción)
+                ResumenCarrito._resumenes.pop(next(iter(ResumenCarrito._resumenes)))
+            ResumenCarrito._resumenes[usuario_id] = (resumen, time.monotonic(), ResumenCarrito._marca())
+
+    @staticmethod
+    def obtener(usuario_id):
+        """Resumen del carrito del usuario (consulta la base de datos solo si no está en caché)"""
+        entrada = ResumenCarrito._resumenes.get(usuario_id)
+        if entrada and time.monotonic() - entrada[1] < CARRITO_RESUMEN_TTL and entrada[2] == ResumenCarrito._marca():
+            Metricas.contar_cache('resumen_carrito', True)
+            return entrada[0]
+        Metricas.contar_cache('resumen_carrito', False)
+
+        conn = get_db_connection()
+        if not conn:
+            return ResumenCarrito._crear(0, 0)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(SQL_RESUMEN_CARRITO, (usuario_id,))
+            contador, subtotal = cursor.fetchone()
+        except Exception as e:
+            print(f"Error al obtener resumen del carrito: {e}")
+            return ResumenCarrito._crear(0, 0)
+        finally:
+            conn.close()
+        resumen = ResumenCarrito._crear(contador, subtotal)
+        ResumenCarrito._guardar(usuario_id, resumen)
+        return resumen
+
+    @staticmethod
+    def actualizar(usuario_id, carrito):
+        """Reemplazar el resumen a partir del carrito completo recién leído (tras modificarlo)"""
+        ResumenCarrito._marcar_cambio()
+        resumen = ResumenCarrito._crear(
+            sum(item['cantidad'] for item in carrito),
+            sum(item['precio'] * item['cantidad'] for item in carrito)
+        )
+        ResumenCarrito._guardar(usuario_id, resumen)
+        return resumen
+
+    @staticmethod
+    def invalidar(usuario_id):
+        ResumenCarrito._marcar_cambio()
+        with ResumenCarrito._lock:
+            ResumenCarrito._resumenes.pop(usuario_id, None)
+
 
 class CarritoDB:
     @staticmethod
@@ -9,13 +132,7 @@ class CarritoDB:
         if conn:
             try:
                 cursor = conn.cursor(dictionary=True)
-                cursor.execute('''
-                    SELECT c.*, p.nombre, p.precio, p.imagen, p.categoria, p.stock
-                    FROM carritos c
-                    JOIN productos p ON c.producto_id = p.id
-                    WHERE c.usuario_id = %s
-                    ORDER BY c.created_at DESC
-                ''', (usuario_id,))
+                cursor.execute(SQL_CARRITO_USUARIO, (usuario_id,))
                 carrito = cursor.fetchall()
             except Exception as e:
                 print(f"Error al obtener carrito: {e}")
@@ -23,57 +140,49 @@ class CarritoDB:
                 conn.close()
         return carrito
 
+    @staticmethod
+    def _motivo_stock(cursor, producto_id, cantidad):
+        """Explicar por qué no se pudo guardar una cantidad (solo en el camino de error)"""
+        cursor.execute('SELECT stock FROM productos WHERE id = %s', (producto_id,))
+        producto = cursor.fetchone()
+        if not producto:
+            return "Producto no encontrado"
+        if producto['stock'] <= 0:
+            return "Producto sin stock disponible"
+        if cantidad > producto['stock']:
+            return f"Stock insuficiente. Solo quedan {producto['stock']} unidades"
+        return None
+
     @staticmethod
     def agregar_al_carrito(usuario_id, producto_id, cantidad=1):
-        """Agregar producto al carrito en la base de datos CON VALIDACIÓN DE STOCK"""
+        """Agregar producto al carrito en la base de datos CON VALIDACIÓN DE STOCK
+
+        Una sola sentencia atómica: el SELECT solo devuelve el producto si hay
+        stock para la cantidad pedida, y si el item ya existe la suma se aplica
+        únicamente cuando no supera el stock (el ON DUPLICATE KEY UPDATE compara
+        con productos.stock de la fila del SELECT). Filas afectadas: 1 = insertado,
+        2 = sumado, 0 = rechazado (se consulta el motivo).
+        """
         conn = get_db_connection()
         if conn:
             try:
                 cursor = conn.cursor(dictionary=True)
-                
-                # VERIFICAR STOCK DISPONIBLE
-                cursor.execute('SELECT stock FROM productos WHERE id = %s', (producto_id,))
-                producto = cursor.fetchone()
-                
-                if not producto:
-                    return False, "Producto no encontrado"
-                
-                if producto['stock'] <= 0:
-                    return False, "Producto sin stock disponible"
-                
-                # Verificar si ya existe en el carrito
-                cursor.execute('''
-                    SELECT id, cantidad FROM carritos 
-                    WHERE usuario_id = %s AND producto_id = %s
-                ''', (usuario_id, producto_id))
-                
-                item_existente = cursor.fetchone()
-                
-                if item_existente:
-                    # Validar que no exceda el stock disponible
-                    cantidad_total = item_existente[1] + cantidad
-                    if cantidad_total > producto['stock']:
-                        return False, f"Stock insuficiente. Solo quedan {producto['stock']} unidades"
-                    
-                    # Actualizar cantidad
+                cursor.execute(SQL_AGREGAR_AL_CARRITO, (usuario_id, cantidad, producto_id, cantidad, cantidad, cantidad))
+
+                if cursor.rowcount == 0:
                     cursor.execute('''
-                        UPDATE carritos SET cantidad = %s 
+                        SELECT cantidad FROM carritos
                         WHERE usuario_id = %s AND producto_id = %s
-                    ''', (cantidad_total, usuario_id, producto_id))
-                else:
-                    # Validar que la cantidad no exceda el stock
-                    if cantidad > producto['stock']:
-                        return False, f"Stock insuficiente. Solo quedan {producto['stock']} unidades"
-                    
-                    # Insertar nuevo item
-                    cursor.execute('''
-                        INSERT INTO carritos (usuario_id, producto_id, cantidad)
-                        VALUES (%s, %s, %s)
-                    ''', (usuario_id, producto_id, cantidad))
-                
+                    ''', (usuario_id, producto_id))
+                    item = cursor.fetchone()
+                    en_carrito = item['cantidad'] if item else 0
+                    motivo = CarritoDB._motivo_stock(cursor, producto_id, en_carrito + cantidad)
+                    return False, motivo or "No se pudo agregar el producto"
+
                 conn.commit()
+                ResumenCarrito.invalidar(usuario_id)
                 return True, "Producto agregado al carrito"
-                
+
             except Exception as e:
                 conn.rollback()
                 return False, f"Error al agregar al carrito: {e}"
@@ -83,30 +192,36 @@ class CarritoDB:
 
     @staticmethod
     def actualizar_cantidad(usuario_id, producto_id, nueva_cantidad):
-        """Actualizar cantidad de producto en el carrito CON VALIDACIÓN DE STOCK"""
+        """Actualizar cantidad de producto en el carrito CON VALIDACIÓN DE STOCK
+
+        El stock se comprueba en el mismo UPDATE. Con 0 filas afectadas se
+        consulta el motivo: poner la misma cantidad que ya había también da 0
+        y no es un error.
+        """
         if nueva_cantidad <= 0:
             return CarritoDB.eliminar_del_carrito(usuario_id, producto_id)
-        
+
         conn = get_db_connection()
         if conn:
             try:
                 cursor = conn.cursor(dictionary=True)
-                
-                # VERIFICAR STOCK ANTES DE ACTUALIZAR
-                cursor.execute('SELECT stock FROM productos WHERE id = %s', (producto_id,))
-                producto = cursor.fetchone()
-                
-                if not producto:
-                    return False, "Producto no encontrado"
-                
-                if nueva_cantidad > producto['stock']:
-                    return False, f"Stock insuficiente. Máximo {producto['stock']} unidades disponibles"
-                
                 cursor.execute('''
-                    UPDATE carritos SET cantidad = %s 
-                    WHERE usuario_id = %s AND producto_id = %s
-                ''', (nueva_cantidad, usuario_id, producto_id))
+                    UPDATE carritos c
+                    JOIN productos p ON p.id = c.producto_id
+                    SET c.cantidad = %s
+                    WHERE c.usuario_id = %s AND c.producto_id = %s AND p.stock >= %s
+                ''', (nueva_cantidad, usuario_id, producto_id, nueva_cantidad))
+
+                if cursor.rowcount == 0:
+                    cursor.execute('SELECT stock FROM productos WHERE id = %s', (producto_id,))
+                    producto = cursor.fetchone()
+                    if not producto:
+                        return False, "Producto no encontrado"
+                    if nueva_cantidad > producto['stock']:
+                        return False, f"Stock insuficiente. Máximo {producto['stock']} unidades disponibles"
+
                 conn.commit()
+                ResumenCarrito.invalidar(usuario_id)
                 return True, "Cantidad actualizada"
             except Exception as e:
                 conn.rollback()
@@ -114,6 +229,7 @@ class CarritoDB:
             finally:
                 conn.close()
         return False, "Error de conexión a la base de datos"
+
     @staticmethod
     def eliminar_del_carrito(usuario_id, producto_id):
         """Eliminar producto del carrito"""
@@ -126,6 +242,7 @@ class CarritoDB:
                     WHERE usuario_id = %s AND producto_id = %s
                 ''', (usuario_id, producto_id))
                 conn.commit()
+                ResumenCarrito.invalidar(usuario_id)
                 return True, "Producto eliminado del carrito"
             except Exception as e:
                 conn.rollback()
@@ -143,6 +260,7 @@ class CarritoDB:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM carritos WHERE usuario_id = %s', (usuario_id,))
                 conn.commit()
+                ResumenCarrito.invalidar(usuario_id)
                 return True, "Carrito vaciado"
             except Exception as e:
                 conn.rollback()
@@ -152,22 +270,101 @@ class CarritoDB:
         return False, "Error de conexión a la base de datos"
 
     @staticmethod
-    def obtener_contador_carrito(usuario_id):
-        """Obtener cantidad total de items en el carrito"""
+    def aplicar_operaciones(usuario_id, operaciones):
+        """Aplicar varias operaciones sobre el carrito en una sola transacción
+
+        Cada operación es un dict con 'op' ('agregar', 'fijar', 'eliminar' o
+        'vaciar'), 'producto_id' y 'cantidad'. Las filas del carrito se leen con
+        FOR UPDATE, así un agregar_al_carrito simultáneo espera en lugar de
+        quedar pisado por las cantidades que se escriben aquí. El stock de todos
+        los productos se consulta de una vez; si alguna operación no se puede
+        aplicar no se aplica ninguna. Devuelve (éxito, mensaje, carrito actualizado).
+        """
         conn = get_db_connection()
         if conn:
             try:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT SUM(cantidad) as total 
-                    FROM carritos 
-                    WHERE usuario_id = %s
-                ''', (usuario_id,))
-                resultado = cursor.fetchone()
-                return resultado[0] or 0
+                with transaccion(conn):
+                    cursor = conn.cursor(dictionary=True)
+                    
+                    # Estado actual del carrito, bloqueado hasta el final de la transacción
+                    cursor.execute('''
+                        SELECT producto_id, cantidad FROM carritos
+                        WHERE usuario_id = %s
+                        FOR UPDATE
+                    ''', (usuario_id,))
+                    actual = {fila['producto_id']: fila['cantidad'] for fila in cursor.fetchall()}
+                    
+                    # Stock de todos los productos involucrados en una sola consulta
+                    ids = {int(op['producto_id']) for op in operaciones if op.get('op') != 'vaciar'}
+                    stock = {}
+                    if ids:
+                        marcadores = ', '.join(['%s'] * len(ids))
+                        cursor.execute(f'SELECT id, stock FROM productos WHERE id IN ({marcadores})', tuple(ids))
+                        stock = {fila['id']: fila['stock'] for fila in cursor.fetchall()}
+                    
+                    # Aplicar las operaciones en memoria, en orden
+                    nuevo = dict(actual)
+                    for op in operaciones:
+                        tipo = op.get('op')
+                        if tipo == 'vaciar':
+                            nuevo.clear()
+                            continue
+                        
+                        producto_id = int(op['producto_id'])
+                        cantidad = int(op.get('cantidad', 1))
+                        if tipo == 'eliminar' or (tipo == 'fijar' and cantidad <= 0):
+                            nuevo.pop(producto_id, None)
+                            continue
+                        if tipo not in ('agregar', 'fijar'):
+                            return False, f"Operación no válida: {tipo}", None
+                        if tipo == 'agregar' and cantidad < 1:
+                            return False, "La cantidad a agregar debe ser al menos 1", None
+                        if producto_id not in stock:
+                            return False, "Producto no encontrado", None
+                        
+                        cantidad_total = nuevo.get(producto_id, 0) + cantidad if tipo == 'agregar' else cantidad
+                        if cantidad_total <= 0:
+                            nuevo.pop(producto_id, None)
+                            continue
+                        if stock[producto_id] <= 0:
+                            return False, "Producto sin stock disponible", None
+                        if cantidad_total > stock[producto_id]:
+                            return False, f"Stock insuficiente. Solo quedan {stock[producto_id]} unidades", None
+                        nuevo[producto_id] = cantidad_total
+                    
+                    # Escribir solo las diferencias
+                    eliminados = [producto_id for producto_id in actual if producto_id not in nuevo]
+                    cambiados = [(usuario_id, producto_id, cantidad) for producto_id, cantidad in nuevo.items()
+                                 if actual.get(producto_id) != cantidad]
+                    
+                    if eliminados:
+                        marcadores = ', '.join(['%s'] * len(eliminados))
+                        cursor.execute(f'''
+                            DELETE FROM carritos 
+                            WHERE usuario_id = %s AND producto_id IN ({marcadores})
+                        ''', (usuario_id, *eliminados))
+                    if cambiados:
+                        cursor.executemany('''
+                            INSERT INTO carritos (usuario_id, producto_id, cantidad)
+                            VALUES (%s, %s, %s)
+                            ON DUPLICATE KEY UPDATE cantidad = VALUES(cantidad)
+                        ''', cambiados)
+                
+                carrito = CarritoDB.obtener_carrito_usuario(usuario_id)
+                ResumenCarrito.actualizar(usuario_id, carrito)
+                return True, "Carrito actualizado", carrito
+                
+            except (KeyError, ValueError, TypeError, AttributeError):
+                conn.rollback()
+                return False, "Operaciones mal formadas", None
             except Exception as e:
-                print(f"Error al obtener contador: {e}")
-                return 0
+                conn.rollback()
+                return False, f"Error al actualizar carrito: {e}", None
             finally:
                 conn.close()
-        return 0
\ No newline at end of file
+        return False, "Error de conexión a la base de datos", None
+
+    @staticmethod
+    def obtener_contador_carrito(usuario_id):
+        """Obtener cantidad total de items en el carrito (desde el resumen en caché)"""
+        return ResumenCarrito.obtener(usuario_id)['contador']
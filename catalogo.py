@@ -0,0 +1,394 @@
+import hashlib
+import os
+import time
+import threading
+from database import get_db_connection
+from paginacion import ORDENES, ordenar_claves, paginar_en_memoria
+from busqueda import IndiceBusqueda
+import facetas
+from metricas import Metricas
+
+# Segundos que se sirve el catálogo de memoria antes de reconstruirlo (por si otro proceso lo cambió)
+CATALOGO_TTL = float(os.environ.get('CATALOGO_TTL', 300))
+# El stock cambia con cada pedido: un hilo de fondo lo refresca cada tantos segundos (0: no)
+CATALOGO_STOCK_TTL = float(os.environ.get('CATALOGO_STOCK_TTL', 60))
+# Cada cuántos segundos se consulta catalogo_version para enterarse de cambios hechos por otros procesos
+CATALOGO_VERSION_TTL = float(os.environ.get('CATALOGO_VERSION_TTL', 5))
+
+
+def _huella(producto):
+    """Huella de 64 bits del contenido de un producto"""
+    contenido = repr(sorted(producto.items())).encode()
+    return int.from_bytes(hashlib.sha1(contenido).digest()[:8], 'big')
+
+
+class Catalogo:
+    """Caché en memoria del catálogo de productos (por id y por categoría)
+
+    Se construye de forma perezosa en la primera lectura y se invalida desde
+    las rutas que modifican productos. El stock se refresca aparte, en un hilo
+    de fondo (iniciar_refresco_stock), para que no quede desactualizado tras
+    los pedidos de otros procesos sin que ninguna petición pague la consulta.
+
+    Cada snapshot lleva un etag calculado con el contenido de los productos
+    (el XOR de la huella de cada uno, que se actualiza por producto), así
+    que dos procesos con los mismos datos dan el mismo etag. Las escrituras
+    del admin suben catalogo_version y los demás procesos, al verla cambiar,
+    recargan sin esperar a CATALOGO_TTL.
+    """
+    _lock = threading.Lock()
+    _snapshot = None
+    _hilo = None
+    _hilo_lock = threading.Lock()
+
+    @staticmethod
+    def _construir(productos, indice=None, version=(None, None)):
+        por_id = {}
+        por_categoria = {}
+        huellas = {}
+        etag = 0
+        for producto in productos:
+            por_id[producto['id']] = producto
+            por_categoria.setdefault(producto['categoria'], []).append(producto['id'])
+            huellas[producto['id']] = _huella(producto)
+            etag ^= huellas[producto['id']]
+        if indice is None:
+            indice = IndiceBusqueda()
+            for producto in productos:
+                indice.agregar(producto)
+        # Al eliminar un producto solo cambia la fecha de catalogo_version
+        fechas = [p['updated_at'] for p in productos if p.get('updated_at')]
+        if version[1]:
+            fechas.append(version[1])
+        ahora = time.monotonic()
+        return {
+            'por_id': por_id,
+            'ids': [p['id'] for p in productos],
+            'por_categoria': por_categoria,
+            'indice': indice,
+            'facetas': facetas.construir_facetas(productos),
+            'claves': {},  # orden -> claves (valor, id) ordenadas, se calculan al pedirlas
+            'huellas': huellas,
+            'etag': etag,
+            'version': version[0],
+            'modificado': max(fechas, default=None),
+            'cargado_en': ahora,
+            'version_en': ahora
+        }
+
+    @staticmethod
+    def _leer_version(cursor):
+        """(version, actualizado_en) de catalogo_version, o (None, None) si no existe"""
+        try:
+            cursor.execute('SELECT version, actualizado_en FROM catalogo_version WHERE id = 1')
+            fila = cursor.fetchone()
+        except Exception as e:
+            print(f"⚠️  Error al leer la versión del catálogo: {e}")
+            return None, None
+        if not fila:
+            return None, None
+        return fila['version'], fila['actualizado_en']
+
+    @staticmethod
+    def registrar_cambio(cursor):
+        """Subir la versión del catálogo con el cursor de la escritura (antes del commit)
+
+        Como en los contadores, un error aquí no tumba la escritura: los
+        demás procesos verán el cambio al vencer CATALOGO_TTL.
+        """
+        try:
+            cursor.execute('UPDATE catalogo_version SET version = version + 1 WHERE id = 1')
+        except Exception as e:
+            print(f"⚠️  Error al actualizar la versión del catálogo: {e}")
+
+    @staticmethod
+    def version():
+        """(etag, fecha de última modificación) del catálogo en memoria
+
+        Sirve para responder peticiones condicionales sin consultar la base de
+        datos; (None, None) si el catálogo no se pudo cargar.
+        """
+        snapshot = Catalogo._obtener_snapshot()
+        if not snapshot:
+            return None, None
+        return f"{snapshot['etag']:016x}", snapshot['modificado']
+
+    @staticmethod
+    def _cargar():
+        """Leer todo el catálogo de la base de datos"""
+        conn = get_db_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor(dictionary=True)
+            # La versión se lee antes que los productos y en la misma transacción
+            version = Catalogo._leer_version(cursor)
+            cursor.execute('SELECT * FROM productos ORDER BY id')
+            return Catalogo._construir(cursor.fetchall(), version=version)
+        except Exception as e:
+            print(f"Error al cargar catálogo: {e}")
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _obtener_snapshot():
+        snapshot = Catalogo._snapshot
+        ahora = time.monotonic()
+        if snapshot is None or ahora - snapshot['cargado_en'] > CATALOGO_TTL:
+            Metricas.contar_cache('catalogo', False)
+            return Catalogo._recargar(snapshot)
+        if ahora - snapshot['version_en'] > CATALOGO_VERSION_TTL and Catalogo._version_cambiada(snapshot):
+            Metricas.contar_cache('catalogo', False)
+            return Catalogo._recargar(snapshot)
+        Metricas.contar_cache('catalogo', True)
+        return snapshot
+
+    @staticmethod
+    def _recargar(vencido):
+        """Reconstruir el snapshot vencido (solo un hilo; los demás esperan y usan el nuevo)"""
+        with Catalogo._lock:
+            snapshot = Catalogo._snapshot
+            if snapshot is not vencido:
+                return snapshot
+            nuevo = Catalogo._cargar()
+            if nuevo is None:
+                # Sin base de datos: servir lo que haya (aunque esté vencido)
+                return snapshot
+            Catalogo._snapshot = nuevo
+            return nuevo
+
+    @staticmethod
+    def _version_cambiada(snapshot):
+        """Consultar catalogo_version y decir si otro proceso cambió el catálogo"""
+        # Marcar antes de consultar para que otras peticiones no repitan la consulta
+        snapshot['version_en'] = time.monotonic()
+        conn = get_db_connection()
+        if not conn:
+            return False
+        try:
+            version, _ = Catalogo._leer_version(conn.cursor(dictionary=True))
+        finally:
+            conn.close()
+        return version is not None and version != snapshot['version']
+
+    @staticmethod
+    def obtener_todos():
+        """Todos los productos en orden de id (no modificar los diccionarios)"""
+        snapshot = Catalogo._obtener_snapshot()
+        if not snapshot:
+            return []
+        return [snapshot['por_id'][i] for i in snapshot['ids']]
+
+    @staticmethod
+    def obtener_producto(producto_id):
+        """Un producto por id, o None"""
+        snapshot = Catalogo._obtener_snapshot()
+        if not snapshot:
+            return None
+        return snapshot['por_id'].get(producto_id)
+
+    @staticmethod
+    def por_categoria(categoria):
+        """Productos de una categoría"""
+        snapshot = Catalogo._obtener_snapshot()
+        if not snapshot:
+            return []
+        return [snapshot['por_id'][i] for i in snapshot['por_categoria'].get(categoria, [])]
+
+    @staticmethod
+    def pagina(orden, cursor, direccion, limite, filtros=None):
+        """Una página del catálogo ordenada y paginada por cursor
+
+        filtros admite q, categoria, precio y en_stock; la página incluye
+        los conteos de cada faceta en 'facetas'.
+        """
+        snapshot = Catalogo._obtener_snapshot()
+        if not snapshot:
+            return paginar_en_memoria([], {}, orden, cursor, direccion, limite)
+
+        filtros = {k: v for k, v in (filtros or {}).items() if v}
+        _, ids, conteos = Catalogo._filtrar(snapshot, **filtros)
+        if ids is not None:
+            claves = ordenar_claves((snapshot['por_id'][i] for i in ids), orden)
+        else:
+            claves = snapshot['claves'].get(orden)
+            if claves is None:
+                claves = ordenar_claves(snapshot['por_id'].values(), orden)
+                snapshot['claves'][orden] = claves
+        pagina = paginar_en_memoria(claves, snapshot['por_id'], orden, cursor, direccion, limite)
+        pagina['facetas'] = conteos
+        return pagina
+
+    @staticmethod
+    def _filtrar(snapshot, q='', categoria=None, precio=None, en_stock=False):
+        """Devuelve (ranking de la búsqueda o None, ids filtrados o None, conteos)"""
+        ranking = None
+        base = None
+        if q.strip():
+            ranking = snapshot['indice'].buscar(q)
+            base = set(ranking)
+        ids, conteos = facetas.filtrar(snapshot['facetas'], snapshot['por_id'], base, categoria, precio, en_stock)
+        return ranking, ids, conteos
+
+    @staticmethod
+    def filtrar(q='', categoria=None, precio=None, en_stock=False, orden=None):
+        """Ids que cumplen la búsqueda y los filtros, más los conteos por faceta
+
+        Sin orden explícito se ordena por relevancia si hay búsqueda, o por id.
+        """
+        snapshot = Catalogo._obtener_snapshot()
+        if not snapshot:
+            return [], {'categoria': {}, 'precio': {}, 'en_stock': 0, 'total': 0}
+        ranking, ids, conteos = Catalogo._filtrar(snapshot, q, categoria, precio, en_stock)
+        if ids is None:
+            ids = snapshot['por_id'].keys()
+        if orden:
+            claves = ordenar_claves((snapshot['por_id'][i] for i in ids), orden)
+            ordenados = [producto_id for _, producto_id in claves]
+            if ORDENES[orden][1]:
+                ordenados.reverse()
+        elif ranking is not None:
+            ordenados = [i for i in ranking if i in ids]
+        else:
+            ordenados = sorted(ids)
+        return ordenados, conteos
+
+    @staticmethod
+    def precargar():
+        """Cargar el catálogo (o renovarlo si venció) antes de que lo pida una petición
+
+        Devuelve cuántos productos quedaron en memoria.
+        """
+        snapshot = Catalogo._obtener_snapshot()
+        return len(snapshot['ids']) if snapshot else 0
+
+    @staticmethod
+    def destacados(limite=4):
+        """Productos para la página de inicio"""
+        return Catalogo.obtener_todos()[:limite]
+
+    @staticmethod
+    def relacionados(producto, limite=4):
+        """Productos de la misma categoría, sin incluir el propio producto"""
+        relacionados = [p for p in Catalogo.por_categoria(producto['categoria']) if p['id'] != producto['id']]
+        return relacionados[:limite]
+
+    @staticmethod
+    def invalidar(producto_id=None):
+        """Invalidar el catálogo tras una escritura
+
+        Con producto_id se relee solo ese producto (o se quita si se eliminó);
+        sin él se descarta todo y se reconstruye en la siguiente lectura.
+        """
+        if producto_id is None or Catalogo._snapshot is None:
+            with Catalogo._lock:
+                Catalogo._snapshot = None
+            return
+
+        conn = get_db_connection()
+        if not conn:
+            with Catalogo._lock:
+                Catalogo._snapshot = None
+            return
+        try:
+            cursor = conn.cursor(dictionary=True)
+            version = Catalogo._leer_version(cursor)
+            cursor.execute('SELECT * FROM productos WHERE id = %s', (producto_id,))
+            producto = cursor.fetchone()
+        except Exception as e:
+            print(f"Error al invalidar producto {producto_id}: {e}")
+            with Catalogo._lock:
+                Catalogo._snapshot = None
+            return
+        finally:
+            conn.close()
+
+        with Catalogo._lock:
+            snapshot = Catalogo._snapshot
+            if snapshot is None:
+                return
+            # Copia con el producto actualizado; los lectores siguen usando la anterior
+            productos = [p for i, p in snapshot['por_id'].items() if i != producto_id]
+            if producto:
+                productos.append(producto)
+            productos.sort(key=lambda p: p['id'])
+
+            # El índice de búsqueda se actualiza solo para este producto
+            indice = snapshot['indice']
+            if producto:
+                indice.agregar(producto)
+            else:
+                indice.eliminar(producto_id)
+
+            nuevo = Catalogo._construir(productos, indice, version)
+            nuevo['cargado_en'] = snapshot['cargado_en']
+            Catalogo._snapshot = nuevo
+
+    @staticmethod
+    def iniciar_refresco_stock():
+        """Iniciar (una vez por proceso) el hilo que refresca el stock cada CATALOGO_STOCK_TTL"""
+        if CATALOGO_STOCK_TTL <= 0:
+            return
+        with Catalogo._hilo_lock:
+            if Catalogo._hilo is not None and Catalogo._hilo.is_alive():
+                return
+
+            def refrescar_periodicamente():
+                while True:
+                    time.sleep(CATALOGO_STOCK_TTL)
+                    try:
+                        Catalogo.refrescar_stock()
+                    except Exception as e:
+                        print(f"⚠️  Error inesperado al refrescar el stock: {e}")
+
+            Catalogo._hilo = threading.Thread(target=refrescar_periodicamente, daemon=True)
+            Catalogo._hilo.start()
+
+    @staticmethod
+    def refrescar_stock(producto_ids=None):
+        """Releer solo el stock (de unos productos o de todo el catálogo)"""
+        snapshot = Catalogo._snapshot
+        if snapshot is None:
+            return
+        if producto_ids is not None:
+            producto_ids = [i for i in producto_ids if i in snapshot['por_id']]
+            if not producto_ids:
+                return
+
+        conn = get_db_connection()
+        if not conn:
+            return
+        try:
+            cursor = conn.cursor(dictionary=True)
+            if producto_ids is None:
+                cursor.execute('SELECT id, stock, updated_at FROM productos')
+            else:
+                marcadores = ', '.join(['%s'] * len(producto_ids))
+                cursor.execute(f'SELECT id, stock, updated_at FROM productos WHERE id IN ({marcadores})', producto_ids)
+            filas = cursor.fetchall()
+        except Exception as e:
+            print(f"Error al refrescar stock: {e}")
+            return
+        finally:
+            conn.close()
+
+        with Catalogo._lock:
+            # Si otro hilo reemplazó el snapshot durante la consulta (invalidar, recarga) no se
+            # toca: sus diccionarios pueden ser compartidos con el nuevo, que tiene su propio etag
+            # y puede tener datos más nuevos que estas filas. El próximo refresco lo pone al día
+            if Catalogo._snapshot is not snapshot:
+                return
+            for fila in filas:
+                producto = snapshot['por_id'].get(fila['id'])
+                if producto is None or (producto['stock'], producto.get('updated_at')) == (fila['stock'], fila['updated_at']):
+                    continue
+                producto['stock'] = fila['stock']
+                producto['updated_at'] = fila['updated_at']
+                facetas.actualizar_stock(snapshot['facetas'], fila['id'], fila['stock'])
+                # El etag se cambia después del stock: quien lo lea nunca ve datos más viejos que él
+                huella = _huella(producto)
+                snapshot['etag'] ^= snapshot['huellas'][fila['id']] ^ huella
+                snapshot['huellas'][fila['id']] = huella
+                if fila['updated_at'] and (not snapshot['modificado'] or fila['updated_at'] > snapshot['modificado']):
+                    snapshot['modificado'] = fila['updated_at']
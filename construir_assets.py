@@ -0,0 +1,96 @@
+"""Construcción de los archivos estáticos para producción
+
+Copia cada archivo de static/ a static/dist/ con el hash de su contenido en
+el nombre (css/style.css -> css/style.3f2a9c1b7e.css), guarda al lado una
+copia comprimida .gz de los que se comprimen bien y escribe
+static/dist/manifest.json con la correspondencia. Las plantillas los
+enlazan con asset_url() (ver assets.py).
+
+Uso (en cada despliegue, antes de arrancar la app; con gunicorn lo hace el
+propio gunicorn.conf.py al cargarse):
+    python construir_assets.py
+
+Los archivos de builds anteriores no se borran: páginas ya cacheadas pueden
+seguir pidiéndolos durante un despliegue.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+CARPETA_STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+CARPETA_DIST = os.path.join(CARPETA_STATIC, 'dist')
+MANIFIESTO = os.path.join(CARPETA_DIST, 'manifest.json')
+
+# Extensiones de texto que vale la pena comprimir (las imágenes ya vienen comprimidas)
+COMPRIMIBLES = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+LONGITUD_HASH = 10
+
+
+def nombre_con_hash(ruta, contenido):
+    """css/style.css -> css/style.<hash>.css"""
+    base, extension = os.path.splitext(ruta)
+    return f"{base}.{hashlib.sha256(contenido).hexdigest()[:LONGITUD_HASH]}{extension}"
+
+
+def listar_archivos():
+    """Rutas relativas (con /) de los archivos de static/, sin la carpeta dist"""
+    for carpeta, subcarpetas, archivos in os.walk(CARPETA_STATIC):
+        if os.path.abspath(carpeta) == CARPETA_STATIC and 'dist' in subcarpetas:
+            subcarpetas.remove('dist')
+        subcarpetas.sort()
+        for archivo in sorted(archivos):
+            if archivo.startswith('.'):
+                continue
+            ruta = os.path.join(carpeta, archivo)
+            yield os.path.relpath(ruta, CARPETA_STATIC).replace(os.sep, '/')
+
+
+def _escribir(destino, contenido):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = destino + '.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, destino)
+
+
+def construir():
+    """Generar static/dist y el manifiesto; devuelve el manifiesto"""
+    manifiesto = {}
+    ahorro = 0
+    for ruta in listar_archivos():
+        with open(os.path.join(CARPETA_STATIC, ruta), 'rb') as archivo:
+            contenido = archivo.read()
+        destino = nombre_con_hash(ruta, contenido)
+        entrada = {'archivo': destino, 'gzip': False}
+        salida = os.path.join(CARPETA_DIST, destino)
+        # El nombre depende del contenido: si ya existe no hay nada que hacer
+        if not os.path.exists(salida):
+            _escribir(salida, contenido)
+
+        if os.path.splitext(ruta)[1].lower() in COMPRIMIBLES:
+            comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+            if len(comprimido) < len(contenido):
+                entrada['gzip'] = True
+                ahorro += len(contenido) - len(comprimido)
+                if not os.path.exists(salida + '.gz'):
+                    _escribir(salida + '.gz', comprimido)
+        manifiesto[ruta] = entrada
+
+    _escribir(MANIFIESTO, json.dumps(manifiesto, indent=2, sort_keys=True).encode('utf-8'))
+    print(f"✅ {len(manifiesto)} archivos en {os.path.relpath(CARPETA_DIST)} "
+          f"({ahorro / 1024:.1f} KB menos con gzip)")
+    return manifiesto
+
+
+def limpiar():
+    """Borrar static/dist por completo"""
+    shutil.rmtree(CARPETA_DIST, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    if '--limpiar' in sys.argv[1:]:
+        limpiar()
+    construir()
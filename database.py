@@ -1,20 +1,466 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+from flask import g, has_app_context
+
+# Configuración de la base de datos (se puede sobrescribir con variables de entorno)
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', 'mainline.proxy.rlwy.net'),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', 'RIhbOcIqREumPdCoPuYuATjbQAHyWxhi'),
+    'database': os.environ.get('DB_NAME', 'tienda_tecnologia'),
+    'port': int(os.environ.get('DB_PORT', 40033))
+}
+
+# Zona horaria en la que MySQL devuelve los TIMESTAMP (la time_zone de la sesión,
+# que por defecto es la del servidor de MySQL; en Railway UTC). Nombre IANA, p. ej. America/Bogota
+DB_TIMEZONE = os.environ.get('DB_TIMEZONE', 'UTC')
+ZONA_BD = timezone.utc if DB_TIMEZONE.upper() == 'UTC' else ZoneInfo(DB_TIMEZONE)
+
+
+def ahora_bd():
+    """Fecha y hora actuales sin zona, en la de MySQL (para escribir en columnas TIMESTAMP)"""
+    return datetime.now(ZONA_BD).replace(tzinfo=None)
+
+# Configuración del pool de conexiones
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', 2))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))            # Espera máxima si el pool está agotado (s)
+POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))  # Vida máxima de una conexión (s)
+POOL_PING_IDLE = float(os.environ.get('DB_POOL_PING_IDLE', 30))        # Validar con ping si lleva más tiempo inactiva (s)
+
+# Errores tras los que MySQL ya deshizo la transacción (deadlock) o al menos la
+# sentencia (espera de bloqueo agotada): la transacción no puede seguir como si nada
+ERRORES_TRANSACCION_ABORTADA = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+# Funciones que se llaman tras cada consulta: observador(sql, params, duracion, error)
+_observadores_consultas = []
+# Funciones que se llaman cada vez que se presta una conexión del pool: observador()
+_observadores_conexiones = []
+
+
+def agregar_observador_consultas(observador):
+    """Registrar una función que recibe cada consulta ejecutada (métricas, perfilado...)"""
+    if observador not in _observadores_consultas:
+        _observadores_consultas.append(observador)
+
+
+def agregar_observador_conexiones(observador):
+    """Registrar una función que se llama al prestar cada conexión del pool"""
+    if observador not in _observadores_conexiones:
+        _observadores_conexiones.append(observador)
+
+
+def _notificar(observadores, *datos):
+    for observador in observadores:
+        try:
+            observador(*datos)
+        except Exception as e:
+            print(f"⚠️  Error en observador de la base de datos: {e}")
+
+
+class CursorMedido:
+    """Envoltorio de un cursor que mide cada execute() y avisa a los observadores"""
+
+    def __init__(self, raw, conexion=None):
+        self._raw = raw
+        self._conexion = conexion
+
+    def __getattr__(self, nombre):
+        return getattr(self._raw, nombre)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    @property
+    def dentro_de_transaccion(self):
+        """Si el cursor se usa dentro de un bloque transaccion()"""
+        return self._conexion is not None and self._conexion._profundidad > 0
+
+    def _medir(self, metodo, sql, params):
+        inicio = time.perf_counter()
+        error = None
+        try:
+            return metodo(sql, params)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if _observadores_consultas:
+                _notificar(_observadores_consultas, sql, params, time.perf_counter() - inicio, error)
+
+    def execute(self, sql, params=None, *args, **kwargs):
+        return self._medir(lambda s, p: self._raw.execute(s, p, *args, **kwargs), sql, params)
+
+    def executemany(self, sql, params):
+        return self._medir(self._raw.executemany, sql, params)
+
+
+class ConexionPooled:
+    """Envoltorio de una conexión MySQL que al cerrarse vuelve al pool
+
+    Si la conexión es compartida por toda la petición, close() no hace nada y
+    la conexión se libera en el teardown. Dentro de transaccion() los commit()
+    y rollback() de cada método se difieren hasta el final del bloque.
+    """
+
+    def __init__(self, pool, raw, creada_en, compartida=False):
+        self._pool = pool
+        self._raw = raw
+        self._creada_en = creada_en
+        self._devuelta = False
+        self._compartida = compartida
+        self._profundidad = 0
+        self._solo_rollback = False
+
+    def __getattr__(self, nombre):
+        return getattr(self._raw, nombre)
+
+    def cursor(self, *args, **kwargs):
+        # Cursores con buffer para poder intercalar varias consultas en la misma conexión
+        if self._compartida:
+            kwargs.setdefault('buffered', True)
+        return CursorMedido(self._raw.cursor(*args, **kwargs), self)
+
+    def commit(self):
+        if self._profundidad == 0:
+            self._raw.commit()
+
+    def rollback(self):
+        if self._profundidad > 0:
+            self._solo_rollback = True
+        else:
+            self._raw.rollback()
+
+    def _finalizar_transaccion(self, confirmar):
+        try:
+            if confirmar and not self._solo_rollback:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        finally:
+            self._solo_rollback = False
+
+    def close(self):
+        """Devolver la conexión al pool en lugar de cerrarla"""
+        if not self._compartida:
+            self.liberar()
+
+    def liberar(self):
+        if not self._devuelta:
+            self._devuelta = True
+            self._pool.devolver(self._raw, self._creada_en)
+
+
+class PoolConexiones:
+    """Pool de conexiones con tamaño mínimo/máximo, validación y métricas"""
+
+    def __init__(self, config, minimo=POOL_MIN, maximo=POOL_MAX, timeout=POOL_TIMEOUT,
+                 max_lifetime=POOL_MAX_LIFETIME, ping_idle=POOL_PING_IDLE):
+        self.config = config
+        self.minimo = minimo
+        self.maximo = max(maximo, 1)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_idle = ping_idle
+
+        self._condicion = threading.Condition()
+        self._libres = []   # Lista de (conexion, creada_en, usada_en)
+        self._total = 0     # Conexiones abiertas (libres + prestadas + en creación)
+        self._prestadas = 0
+        self._esperando = 0
+        self._metricas = {
+            'checkouts': 0,
+            'esperas': 0,
+            'tiempo_espera_total': 0.0,
+            'timeouts': 0,
+            'creadas': 0,
+            'descartadas': 0,
+            'errores': 0
+        }
+
+    def _conectar(self):
+        raw = mysql.connector.connect(**self.config)
+        print("✅ Conexión a MySQL exitosa")
+        return raw
+
+    def _descartar(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._condicion:
+            self._total -= 1
+            self._metricas['descartadas'] += 1
+            self._condicion.notify()
+
+    def _es_valida(self, raw, creada_en, usada_en):
+        """Comprobar vida máxima y hacer ping si la conexión estuvo inactiva"""
+        ahora = time.monotonic()
+        if ahora - creada_en > self.max_lifetime:
+            return False
+        if ahora - usada_en > self.ping_idle:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def llenar(self):
+        """Abrir conexiones hasta alcanzar el tamaño mínimo"""
+        while True:
+            with self._condicion:
+                if self._total >= self.minimo:
+                    return
+                self._total += 1
+            try:
+                raw = self._conectar()
+            except Error as e:
+                print(f"❌ Error conectando a MySQL: {e}")
+                with self._condicion:
+                    self._total -= 1
+                    self._metricas['errores'] += 1
+                    self._condicion.notify()
+                return
+            ahora = time.monotonic()
+            with self._condicion:
+                self._metricas['creadas'] += 1
+                self._libres.append((raw, ahora, ahora))
+                self._condicion.notify()
+
+    def obtener(self, compartida=False):
+        """Obtener una conexión del pool (None si no hay o se agota la espera)"""
+        limite = time.monotonic() + self.timeout
+        espero = False
+        inicio_espera = None
+
+        while True:
+            crear = False
+            with self._condicion:
+                while not self._libres and self._total >= self.maximo:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._metricas['timeouts'] += 1
+                        if espero:
+                            self._esperando -= 1
+                            self._metricas['tiempo_espera_total'] += time.monotonic() - inicio_espera
+                        print("❌ Error conectando a MySQL: pool de conexiones agotado")
+                        return None
+                    if not espero:
+                        espero = True
+                        inicio_espera = time.monotonic()
+                        self._esperando += 1
+                        self._metricas['esperas'] += 1
+                    self._condicion.wait(restante)
+
+                if espero:
+                    espero = False
+                    self._esperando -= 1
+                    self._metricas['tiempo_espera_total'] += time.monotonic() - inicio_espera
+
+                if self._libres:
+                    raw, creada_en, usada_en = self._libres.pop()
+                else:
+                    crear = True
+                    self._total += 1
+
+            if crear:
+                try:
+                    raw = self._conectar()
+                except Error as e:
+                    print(f"❌ Error conectando a MySQL: {e}")
+                    with self._condicion:
+                        self._total -= 1
+                        self._metricas['errores'] += 1
+                        self._condicion.notify()
+                    return None
+                creada_en = time.monotonic()
+                with self._condicion:
+                    self._metricas['creadas'] += 1
+            elif not self._es_valida(raw, creada_en, usada_en):
+                self._descartar(raw)
+                continue
+
+            with self._condicion:
+                self._prestadas += 1
+                self._metricas['checkouts'] += 1
+            _notificar(_observadores_conexiones)
+            return ConexionPooled(self, raw, creada_en, compartida)
+
+    def devolver(self, raw, creada_en):
+        """Devolver una conexión al pool deshaciendo lo que no se confirmó"""
+        with self._condicion:
+            self._prestadas -= 1
+        try:
+            if raw.unread_result:
+                raw.consume_results()
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            self._descartar(raw)
+            return
+
+        if time.monotonic() - creada_en > self.max_lifetime:
+            self._descartar(raw)
+            return
+
+        with self._condicion:
+            self._libres.append((raw, creada_en, time.monotonic()))
+            self._condicion.notify()
+
+    def estadisticas(self):
+        """Métricas del pool para monitoreo"""
+        with self._condicion:
+            stats = dict(self._metricas)
+            stats.update({
+                'tamano': self._total,
+                'activas': self._prestadas,
+                'libres': len(self._libres),
+                'esperando': self._esperando,
+                'minimo': self.minimo,
+                'maximo': self.maximo
+            })
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+_pools_heredados = []  # pools del proceso padre que quedaron en un hijo (ver reiniciar_tras_fork)
+
+
+def get_pool():
+    """Obtener (o crear la primera vez) el pool de conexiones del proceso"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = PoolConexiones(DB_CONFIG)
+                pool.llenar()
+                _pool = pool
+    return _pool
+
+
+def reiniciar_tras_fork():
+    """Empezar con un pool vacío en un proceso hijo (por ejemplo un worker de gunicorn)
+
+    Las conexiones heredadas comparten el socket con el proceso padre: no se
+    cierran (eso cerraría también la del padre), solo se dejan de usar y se
+    guarda una referencia para que el recolector de basura no las cierre.
+    """
+    global _pool, _pool_lock, _local
+    if _pool is not None:
+        _pools_heredados.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+    _local = threading.local()
+
 
 def get_db_connection():
+    """Obtener una conexión a la base de datos
+
+    Dentro de una petición de Flask todas las llamadas comparten la misma
+    conexión, que se confirma (o se deshace si hubo error) y se devuelve al
+    pool en el teardown. Fuera de Flask cada llamada toma su propia conexión
+    del pool y close() la devuelve.
+    """
+    if not has_app_context():
+        # Fuera de Flask, si hay una transaccion() abierta en este hilo se reutiliza su conexión
+        conn = getattr(_local, 'conexion', None)
+        return conn if conn is not None else get_pool().obtener()
+
+    conn = g.get('_db_conexion')
+    if conn is None:
+        conn = get_pool().obtener(compartida=True)
+        if conn is not None:
+            g._db_conexion = conn
+    return conn
+
+
+def get_conexion_independiente():
+    """Conexión propia del pool, aparte de la de la petición
+
+    Para operaciones que deben confirmarse enseguida y no esperar (ni quedar
+    bloqueadas) por la transacción de la petición. close() la devuelve al pool.
+    """
+    return get_pool().obtener()
+
+
+def conectar_aparte():
+    """Conexión a MySQL fuera del pool (la cierra quien la pide)
+
+    Para un componente que necesita su propia conexión de uso breve y no
+    debe esperar al pool ni ocupar un lugar en él. Sus consultas se miden
+    si se ejecutan con CursorMedido.
+    """
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+@contextmanager
+def transaccion(conn):
+    """Agrupar varias operaciones en una única transacción
+
+    Los commit()/rollback() que hagan los métodos llamados dentro del bloque se
+    difieren: al salir se confirma todo junto, o se deshace todo si hubo una
+    excepción o algún método pidió rollback.
+    """
+    propia_del_hilo = not has_app_context() and conn._profundidad == 0
+    if propia_del_hilo:
+        # Compartir la conexión con los métodos llamados dentro del bloque
+        _local.conexion = conn
+        conn._compartida = True
+
+    conn._profundidad += 1
     try:
-        connection = mysql.connector.connect(
-            host='mainline.proxy.rlwy.net',
-            user='root',
-            password='RIhbOcIqREumPdCoPuYuATjbQAHyWxhi',
-            database='tienda_tecnologia',
-            port=40033
-        )
-        print("✅ Conexión a MySQL exitosa")
-        return connection
+        yield conn
+    except BaseException:
+        conn._profundidad -= 1
+        conn._solo_rollback = True
+        if conn._profundidad == 0:
+            conn._finalizar_transaccion(False)
+        raise
+    else:
+        conn._profundidad -= 1
+        if conn._profundidad == 0:
+            conn._finalizar_transaccion(True)
+    finally:
+        if propia_del_hilo:
+            _local.conexion = None
+            conn._compartida = False
+
+
+def cerrar_conexion_request(exc=None):
+    """Teardown: confirmar o deshacer la conexión de la petición y devolverla al pool"""
+    conn = g.pop('_db_conexion', None)
+    if conn is None:
+        return
+    try:
+        if exc is None and conn.in_transaction:
+            conn._raw.commit()
     except Error as e:
-        print(f"❌ Error conectando a MySQL: {e}")
-        return None
+        print(f"❌ Error al confirmar la transacción de la petición: {e}")
+    finally:
+        # devolver() deshace cualquier transacción que haya quedado abierta
+        conn.liberar()
+
+
+def init_app(app):
+    """Registrar el manejo de la conexión por petición en la app de Flask"""
+    app.teardown_appcontext(cerrar_conexion_request)
+
+
+def estadisticas_pool():
+    """Métricas del pool de conexiones (checkouts, esperas, activas...)"""
+    if _pool is None:
+        return {}
+    return _pool.estadisticas()
+
+
 # Función para agregar datos de prueba (opcional)
 def agregar_datos_prueba():
     conn = get_db_connection()
@@ -22,4 +468,4 @@ def agregar_datos_prueba():
         cursor = conn.cursor()
         # Los datos ya los insertamos desde Workbench
         print("✅ Datos de prueba verificados")
-        conn.close()
\ No newline at end of file
+        conn.close()
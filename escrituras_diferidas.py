@@ -0,0 +1,125 @@
+import atexit
+import os
+import threading
+from database import get_conexion_independiente
+
+# Segundos entre volcados a la base de datos
+ESCRITURAS_INTERVALO = float(os.environ.get('ESCRITURAS_INTERVALO', 5))
+# Con tantas escrituras pendientes se vuelca sin esperar al intervalo
+ESCRITURAS_MAXIMO = int(os.environ.get('ESCRITURAS_MAXIMO', 500))
+# Filas por sentencia UPDATE al volcar
+ESCRITURAS_LOTE = 500
+
+# Columnas que admiten escritura diferida: datos de registro cuya pérdida
+# (si el proceso muere antes de volcarlos) no afecta al funcionamiento
+COLUMNAS_DIFERIDAS = {
+    ('usuarios', 'ultimo_login'),
+}
+
+
+class EscriturasDiferidas:
+    """Buffer en memoria para escrituras poco importantes (último login...)
+
+    Las peticiones solo anotan el valor; un hilo en segundo plano lo vuelca
+    cada ESCRITURAS_INTERVALO segundos (o antes si se juntan
+    ESCRITURAS_MAXIMO) con un UPDATE de varias filas por tabla y columna.
+    Si el mismo registro se actualiza varias veces entre volcados solo se
+    escribe el último valor. Al terminar el proceso se vuelca lo pendiente.
+    """
+    _lock = threading.Lock()
+    _pendientes = {}  # (tabla, columna) -> {id: valor}
+    _cantidad = 0
+    _despertar = threading.Event()
+    _hilo = None
+
+    @staticmethod
+    def registrar(tabla, columna, registro_id, valor):
+        """Anotar columna = valor para el registro con ese id"""
+        if (tabla, columna) not in COLUMNAS_DIFERIDAS:
+            raise ValueError(f"{tabla}.{columna} no admite escritura diferida")
+        with EscriturasDiferidas._lock:
+            valores = EscriturasDiferidas._pendientes.setdefault((tabla, columna), {})
+            if registro_id not in valores:
+                EscriturasDiferidas._cantidad += 1
+            valores[registro_id] = valor
+            lleno = EscriturasDiferidas._cantidad >= ESCRITURAS_MAXIMO
+        EscriturasDiferidas._iniciar()
+        if lleno:
+            EscriturasDiferidas._despertar.set()
+
+    @staticmethod
+    def volcar():
+        """Escribir en la base de datos todo lo pendiente (devuelve las filas escritas)"""
+        with EscriturasDiferidas._lock:
+            pendientes = EscriturasDiferidas._pendientes
+            EscriturasDiferidas._pendientes = {}
+            EscriturasDiferidas._cantidad = 0
+        if not pendientes:
+            return 0
+
+        conn = get_conexion_independiente()
+        if not conn:
+            EscriturasDiferidas._reencolar(pendientes)
+            return 0
+        escritas = 0
+        try:
+            cursor = conn.cursor()
+            for (tabla, columna), valores in pendientes.items():
+                filas = sorted(valores.items())
+                for inicio in range(0, len(filas), ESCRITURAS_LOTE):
+                    lote = filas[inicio:inicio + ESCRITURAS_LOTE]
+                    casos = ' '.join(['WHEN %s THEN %s'] * len(lote))
+                    marcadores = ', '.join(['%s'] * len(lote))
+                    params = [dato for fila in lote for dato in fila] + [registro_id for registro_id, _ in lote]
+                    cursor.execute(f'''
+                        UPDATE {tabla} SET {columna} = CASE id {casos} END
+                        WHERE id IN ({marcadores})
+                    ''', params)
+                    escritas += len(lote)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  Error al volcar escrituras diferidas: {e}")
+            EscriturasDiferidas._reencolar(pendientes)
+            return 0
+        finally:
+            conn.close()
+        return escritas
+
+    @staticmethod
+    def _reencolar(pendientes):
+        """Devolver al buffer lo que no se pudo escribir, sin pisar valores más nuevos"""
+        with EscriturasDiferidas._lock:
+            for clave, valores in pendientes.items():
+                actuales = EscriturasDiferidas._pendientes.setdefault(clave, {})
+                for registro_id, valor in valores.items():
+                    if registro_id not in actuales:
+                        actuales[registro_id] = valor
+                        EscriturasDiferidas._cantidad += 1
+
+    @staticmethod
+    def _iniciar():
+        """Arrancar el hilo de volcado la primera vez que hace falta"""
+        hilo = EscriturasDiferidas._hilo
+        if hilo is not None and hilo.is_alive():
+            return
+        with EscriturasDiferidas._lock:
+            hilo = EscriturasDiferidas._hilo
+            if hilo is not None and hilo.is_alive():
+                return
+
+            def volcar_periodicamente():
+                while True:
+                    EscriturasDiferidas._despertar.wait(ESCRITURAS_INTERVALO)
+                    EscriturasDiferidas._despertar.clear()
+                    try:
+                        EscriturasDiferidas.volcar()
+                    except Exception as e:
+                        print(f"⚠️  Error inesperado al volcar escrituras diferidas: {e}")
+
+            EscriturasDiferidas._hilo = threading.Thread(target=volcar_periodicamente, daemon=True)
+            EscriturasDiferidas._hilo.start()
+
+
+# Volcar lo pendiente al apagar el proceso
+atexit.register(EscriturasDiferidas.volcar)
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from mysql.connector import Error
+from database import ERRORES_TRANSACCION_ABORTADA, get_conexion_independiente
+
+# Por debajo de este stock un producto cuenta como "stock bajo"
+STOCK_BAJO = 10
+# Cada cuántos segundos se recalculan los contadores desde las tablas para corregir desvíos
+ESTADISTICAS_RECONCILIAR = float(os.environ.get('ESTADISTICAS_RECONCILIAR', 600))
+# Días que se conservan los contadores diarios
+DIAS_HISTORIAL = 30
+
+CONTADORES_GLOBALES = ('total_usuarios', 'total_admins', 'total_productos', 'stock_bajo', 'pedidos_pendientes')
+CONTADORES_DIARIOS = ('usuarios', 'pedidos', 'ingresos')
+
+
+def clave_dia(nombre, fecha=None):
+    """Clave del contador diario nombre para una fecha (hoy por defecto)"""
+    return f"{nombre}:{(fecha or date.today()).isoformat()}"
+
+
+def es_stock_bajo(stock):
+    return stock is not None and stock < STOCK_BAJO
+
+
+class Estadisticas:
+    """Contadores del dashboard mantenidos al escribir
+
+    Cada escritura suma sus cambios a estadisticas_contadores en la misma
+    transacción, así el dashboard se arma con una sola lectura. Cada
+    ESTADISTICAS_RECONCILIAR segundos se recalculan desde las tablas por si
+    algún camino de escritura se desvió.
+    """
+    _hilo = None
+    _hilo_lock = threading.Lock()
+
+    @staticmethod
+    def incrementar(cursor, cambios):
+        """Sumar los deltas {clave: cantidad} usando el cursor de la escritura
+
+        Un error que solo afecta a esta sentencia no debe tumbar la operación
+        principal: se registra y la reconciliación corrige el contador más
+        tarde. Pero si MySQL abortó la transacción (deadlock, espera de bloqueo)
+        o el cursor está dentro de transaccion(), el error se propaga: seguir
+        confirmaría una escritura a medias (un pedido sin sus filas, por ejemplo).
+        """
+        cambios = sorted((clave, valor) for clave, valor in cambios.items() if valor)
+        if not cambios:
+            return
+        filas = ', '.join(['(%s, %s)'] * len(cambios))
+        params = [dato for cambio in cambios for dato in cambio]
+        try:
+            cursor.execute(f'''
+                INSERT INTO estadisticas_contadores (clave, valor) VALUES {filas}
+                ON DUPLICATE KEY UPDATE valor = valor + VALUES(valor)
+            ''', params)
+        except Error as e:
+            if getattr(cursor, 'dentro_de_transaccion', False) or e.errno in ERRORES_TRANSACCION_ABORTADA:
+                raise
+            print(f"⚠️  Error al actualizar contadores: {e}")
+
+    @staticmethod
+    def obtener():
+        """Estadísticas del dashboard en una sola consulta"""
+        hoy = date.today()
+        claves = list(CONTADORES_GLOBALES) + [clave_dia(nombre, hoy) for nombre in CONTADORES_DIARIOS]
+        valores = Estadisticas._leer(claves)
+        if valores is not None and not valores:
+            # Tabla recién creada: calcular todo una vez
+            Estadisticas.reconciliar()
+            valores = Estadisticas._leer(claves)
+        valores = valores or {}
+
+        stats = {clave: int(valores.get(clave, 0)) for clave in CONTADORES_GLOBALES}
+        stats['usuarios_hoy'] = int(valores.get(clave_dia('usuarios', hoy), 0))
+        stats['pedidos_hoy'] = int(valores.get(clave_dia('pedidos', hoy), 0))
+        stats['ingresos_hoy'] = Decimal(valores.get(clave_dia('ingresos', hoy), 0))
+        return stats
+
+    @staticmethod
+    def _leer(claves):
+        conn = get_conexion_independiente()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor(dictionary=True)
+            marcadores = ', '.join(['%s'] * len(claves))
+            cursor.execute(f'SELECT clave, valor FROM estadisticas_contadores WHERE clave IN ({marcadores})', claves)
+            return {fila['clave']: fila['valor'] for fila in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error al leer estadísticas: {e}")
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def reconciliar():
+        """Recalcular los contadores desde las tablas y guardar los valores exactos"""
+        conn = get_conexion_independiente()
+        if not conn:
+            return False
+        try:
+            cursor = conn.cursor(dictionary=True)
+            # Con varios procesos basta con que uno reconcilie a la vez
+            cursor.execute("SELECT GET_LOCK('estadisticas_reconciliar', 0) AS obtenido")
+            if cursor.fetchone()['obtenido'] != 1:
+                return False
+            try:
+                hoy = date.today()
+                inicio = datetime.combine(hoy, datetime.min.time())
+                fin = inicio + timedelta(days=1)
+
+                cursor.execute('''
+                    SELECT COUNT(*) AS total,
+                           COALESCE(SUM(rol = 'admin'), 0) AS admins,
+                           COALESCE(SUM(created_at >= %s AND created_at < %s), 0) AS hoy
+                    FROM usuarios
+                ''', (inicio, fin))
+                usuarios = cursor.fetchone()
+
+                cursor.execute('''
+                    SELECT COUNT(*) AS total, COALESCE(SUM(stock < %s), 0) AS stock_bajo
+                    FROM productos
+                ''', (STOCK_BAJO,))
+                productos = cursor.fetchone()
+
+                cursor.execute('''
+                    SELECT COUNT(*) AS total,
+                           COALESCE(SUM(CASE WHEN estado <> 'cancelado' THEN total END), 0) AS ingresos
+                    FROM pedidos
+                    WHERE created_at >= %s AND created_at < %s
+                ''', (inicio, fin))
+                pedidos_hoy = cursor.fetchone()
+
+                cursor.execute("SELECT COUNT(*) AS total FROM pedidos WHERE estado = 'pendiente'")
+                pendientes = cursor.fetchone()
+
+                valores = {
+                    'total_usuarios': usuarios['total'],
+                    'total_admins': usuarios['admins'],
+                    'total_productos': productos['total'],
+                    'stock_bajo': productos['stock_bajo'],
+                    'pedidos_pendientes': pendientes['total'],
+                    clave_dia('usuarios', hoy): usuarios['hoy'],
+                    clave_dia('pedidos', hoy): pedidos_hoy['total'],
+                    clave_dia('ingresos', hoy): pedidos_hoy['ingresos']
+                }
+                filas = ', '.join(['(%s, %s)'] * len(valores))
+                params = [dato for cambio in valores.items() for dato in cambio]
+                cursor.execute(f'''
+                    INSERT INTO estadisticas_contadores (clave, valor) VALUES {filas}
+                    ON DUPLICATE KEY UPDATE valor = VALUES(valor)
+                ''', params)
+
+                # Borrar contadores diarios viejos
+                cursor.execute('''
+                    DELETE FROM estadisticas_contadores
+                    WHERE clave LIKE %s AND actualizado_en < %s
+                ''', ('%:%', inicio - timedelta(days=DIAS_HISTORIAL)))
+                conn.commit()
+                return True
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK('estadisticas_reconciliar')")
+                cursor.fetchall()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error al reconciliar estadísticas: {e}")
+            return False
+        finally:
+            conn.close()
+
+    @staticmethod
+    def iniciar_reconciliacion():
+        """Iniciar (una vez por proceso) el hilo que reconcilia periódicamente"""
+        with Estadisticas._hilo_lock:
+            if Estadisticas._hilo is not None and Estadisticas._hilo.is_alive():
+                return
+
+            def reconciliar_periodicamente():
+                while True:
+                    time.sleep(ESTADISTICAS_RECONCILIAR)
+                    try:
+                        Estadisticas.reconciliar()
+                    except Exception as e:
+                        print(f"⚠️  Error inesperado al reconciliar estadísticas: {e}")
+
+            Estadisticas._hilo = threading.Thread(target=reconciliar_periodicamente, daemon=True)
+            Estadisticas._hilo.start()
@@ -0,0 +1,119 @@
+from decimal import Decimal
+
+# Rangos de precio del filtro: clave -> (mínimo incluido, máximo excluido o None)
+RANGOS_PRECIO = {
+    '0-100': (Decimal(0), Decimal(100)),
+    '100-300': (Decimal(100), Decimal(300)),
+    '300-500': (Decimal(300), Decimal(500)),
+    '500+': (Decimal(500), None)
+}
+
+
+def rango_precio(precio):
+    """Clave del rango al que pertenece un precio"""
+    precio = Decimal(precio)
+    for clave, (minimo, maximo) in RANGOS_PRECIO.items():
+        if precio >= minimo and (maximo is None or precio < maximo):
+            return clave
+    return None
+
+
+def construir_facetas(productos):
+    """Conjuntos de ids precalculados por categoría, rango de precio y stock"""
+    facetas = {
+        'categoria': {},
+        'precio': {clave: set() for clave in RANGOS_PRECIO},
+        'en_stock': set()
+    }
+    for producto in productos:
+        agregar_producto(facetas, producto)
+    return facetas
+
+
+def agregar_producto(facetas, producto):
+    producto_id = producto['id']
+    # productos.categoria admite NULL: esos productos no entran en la faceta
+    # (una clave None rompe el orden de las categorías en la plantilla y en jsonify)
+    if producto['categoria']:
+        facetas['categoria'].setdefault(producto['categoria'], set()).add(producto_id)
+    rango = rango_precio(producto['precio'])
+    if rango:
+        facetas['precio'][rango].add(producto_id)
+    actualizar_stock(facetas, producto_id, producto['stock'])
+
+
+def actualizar_stock(facetas, producto_id, stock):
+    if stock and stock > 0:
+        facetas['en_stock'].add(producto_id)
+    else:
+        facetas['en_stock'].discard(producto_id)
+
+
+def _intersectar(conjuntos):
+    """Intersección empezando por el conjunto más chico"""
+    conjuntos = sorted(conjuntos, key=len)
+    if not conjuntos:
+        return None
+    resultado = set(conjuntos[0])
+    for conjunto in conjuntos[1:]:
+        resultado &= conjunto
+        if not resultado:
+            break
+    return resultado
+
+
+def filtrar(facetas, por_id, base, categoria=None, precio=None, en_stock=False):
+    """Aplicar los filtros y contar cada faceta
+
+    base es el conjunto de ids de partida (resultado de la búsqueda) o None
+    para todo el catálogo. Cada faceta se cuenta con el resto de filtros
+    aplicados pero no el suyo, para que el usuario vea cuántos productos
+    obtendría al cambiar esa opción. Devuelve (ids, conteos), con ids None
+    si no hay ningún filtro (todo el catálogo).
+    """
+    filtros = {}
+    if categoria:
+        filtros['categoria'] = facetas['categoria'].get(categoria, set())
+    if precio in RANGOS_PRECIO:
+        filtros['precio'] = facetas['precio'][precio]
+    if en_stock:
+        filtros['en_stock'] = facetas['en_stock']
+
+    def aplicar(excepto=None):
+        """Ids con todos los filtros menos uno (None si no queda ningún filtro)"""
+        conjuntos = [c for nombre, c in filtros.items() if nombre != excepto]
+        if base is not None:
+            conjuntos.append(base)
+        return _intersectar(conjuntos)
+
+    ids = aplicar()
+
+    # Sin otros filtros, los conteos salen directamente del tamaño de cada conjunto
+    sin_categoria = aplicar('categoria')
+    if sin_categoria is None:
+        por_categoria = {nombre: len(c) for nombre, c in facetas['categoria'].items() if c}
+    else:
+        por_categoria = {}
+        for producto_id in sin_categoria:
+            nombre = por_id[producto_id]['categoria']
+            if nombre:
+                por_categoria[nombre] = por_categoria.get(nombre, 0) + 1
+
+    sin_precio = aplicar('precio')
+    if sin_precio is None:
+        por_precio = {clave: len(c) for clave, c in facetas['precio'].items()}
+    else:
+        por_precio = {clave: 0 for clave in RANGOS_PRECIO}
+        for producto_id in sin_precio:
+            rango = rango_precio(por_id[producto_id]['precio'])
+            if rango:
+                por_precio[rango] += 1
+
+    sin_stock = aplicar('en_stock')
+    conteos = {
+        'categoria': por_categoria,
+        'precio': por_precio,
+        'en_stock': len(facetas['en_stock'] if sin_stock is None else sin_stock & facetas['en_stock']),
+        'total': len(por_id) if ids is None else len(ids)
+    }
+    return ids, conteos
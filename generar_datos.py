@@ -0,0 +1,470 @@
+"""Generador de datos sintéticos a gran escala para pruebas de rendimiento
+
+Llena una base local (con el esquema y las migraciones ya aplicados) con
+volúmenes configurables de productos, usuarios con sus direcciones, pedidos
+con sus items y carritos activos. Las distribuciones imitan a una tienda
+real: categorías de tamaños distintos, precios log-normales por categoría,
+pocos productos muy vendidos y muchos que casi no se venden, pocos clientes
+que compran mucho y pedidos de uno o dos productos en su mayoría.
+
+Las filas se generan en streaming y se cargan por lotes con INSERT de varias
+filas o, con --csv, escribiendo archivos CSV temporales y cargándolos con
+LOAD DATA LOCAL INFILE (más rápido; necesita local_infile=ON en el servidor).
+
+Uso (DB_HOST/DB_NAME deben apuntar a un MySQL local):
+    python generar_datos.py --productos 1000000 --usuarios 500000 --pedidos 3000000 --carritos 50000 --csv
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import mysql.connector
+
+HOSTS_LOCALES = ('localhost', '127.0.0.1', '::1')
+
+# Contraseña de todos los usuarios generados (para poder iniciar sesión con ellos)
+PASSWORD_USUARIOS = 'clave123'
+DOMINIO_USUARIOS = 'ejemplo.test'
+# Días hacia atrás en los que se reparten las fechas de alta y de los pedidos
+DIAS_HISTORIA = 3 * 365
+
+# nombre: (peso en el catálogo, precio mediano, dispersión del precio, marcas, tipos)
+CATEGORIAS = {
+    'Periféricos': (24, 45, 0.7, ('Logitech', 'Razer', 'Corsair', 'HyperX', 'SteelSeries'),
+                    ('Teclado mecánico', 'Mouse gamer', 'Auriculares', 'Alfombrilla', 'Webcam')),
+    'Almacenamiento': (16, 90, 0.6, ('Samsung', 'Kingston', 'WD', 'Seagate', 'Crucial'),
+                       ('SSD NVMe', 'SSD SATA', 'Disco duro', 'Memoria USB')),
+    'Memoria RAM': (12, 70, 0.5, ('Corsair', 'Kingston', 'G.Skill', 'Crucial', 'ADATA'),
+                    ('DDR4 8GB', 'DDR4 16GB', 'DDR5 16GB', 'DDR5 32GB')),
+    'Monitores': (10, 250, 0.6, ('Samsung', 'LG', 'ASUS', 'AOC', 'Dell'),
+                  ('Monitor 24"', 'Monitor 27"', 'Monitor curvo 32"', 'Monitor 4K')),
+    'Refrigeración': (9, 60, 0.6, ('Noctua', 'Cooler Master', 'NZXT', 'Arctic', 'Deepcool'),
+                      ('Disipador', 'Refrigeración líquida', 'Ventilador', 'Pasta térmica')),
+    'Tarjetas Gráficas': (8, 480, 0.7, ('NVIDIA', 'AMD', 'ASUS', 'MSI', 'Gigabyte'),
+                          ('RTX 4060', 'RTX 4070', 'RX 7600', 'RX 7800 XT', 'RTX 4090')),
+    'Procesadores': (7, 300, 0.6, ('Intel', 'AMD'),
+                     ('Core i5', 'Core i7', 'Core i9', 'Ryzen 5', 'Ryzen 7', 'Ryzen 9')),
+    'Placas Base': (7, 170, 0.5, ('ASUS', 'MSI', 'Gigabyte', 'ASRock'),
+                    ('B660', 'Z790', 'B650', 'X670')),
+    'Fuentes Alimentación': (7, 95, 0.5, ('Corsair', 'EVGA', 'Seasonic', 'Thermaltake'),
+                             ('Fuente 650W', 'Fuente 750W', 'Fuente 850W', 'Fuente 1000W')),
+}
+ADJETIVOS = ('para gaming', 'de alto rendimiento', 'silencioso', 'con RGB', 'compacto', 'profesional', 'edición 2024')
+
+NOMBRES = ('Ana', 'Carlos', 'María', 'Juan', 'Laura', 'Andrés', 'Camila', 'Santiago', 'Valentina', 'Diego',
+           'Sofía', 'Felipe', 'Daniela', 'Sebastián', 'Paula', 'Mateo', 'Natalia', 'Julián', 'Isabella', 'David')
+APELLIDOS = ('García', 'Rodríguez', 'Martínez', 'López', 'González', 'Pérez', 'Sánchez', 'Ramírez', 'Torres',
+             'Flórez', 'Rivera', 'Gómez', 'Díaz', 'Moreno', 'Vargas', 'Castro', 'Rojas', 'Ortiz', 'Herrera', 'Muñoz')
+CIUDADES = ('Bogotá', 'Medellín', 'Cali', 'Barranquilla', 'Cartagena', 'Bucaramanga', 'Pereira', 'Manizales')
+# Ciudades más grandes, más clientes
+PESOS_CIUDADES = (35, 18, 14, 9, 6, 6, 6, 6)
+METODOS_PAGO = ('tarjeta_credito', 'paypal')
+
+# Distintos productos por pedido (1: 55%, 2: 25%...) y unidades de cada uno
+PRODUCTOS_POR_PEDIDO = ((1, 55), (2, 25), (3, 11), (4, 5), (5, 2), (6, 1), (8, 1))
+UNIDADES_POR_ITEM = ((1, 82), (2, 13), (3, 4), (5, 1))
+# Exponentes de la ley de Zipf: ventas por producto y pedidos por cliente
+ZIPF_PRODUCTOS = 1.05
+ZIPF_CLIENTES = 0.8
+
+
+def comprobar_bd_local(permitir_remota=False):
+    """Evitar cargar o estresar por error la base de datos de producción"""
+    from database import DB_CONFIG
+
+    host = DB_CONFIG['host']
+    if host not in HOSTS_LOCALES and not permitir_remota:
+        print(f"❌ DB_HOST={host} no es local. Configura DB_HOST/DB_NAME hacia un MySQL local "
+              f"(o usa --permitir-remota si de verdad es una base de pruebas)")
+        sys.exit(2)
+
+
+def _acumulados(pesos):
+    total, acumulados = 0, []
+    for peso in pesos:
+        total += peso
+        acumulados.append(total)
+    return acumulados
+
+
+class Sorteo:
+    """Elegir elementos con pesos fijos (pesos acumulados precalculados)"""
+
+    def __init__(self, elementos, pesos):
+        self.elementos = list(elementos)
+        self.acumulados = _acumulados(pesos)
+        self.total = self.acumulados[-1]
+
+    @staticmethod
+    def zipf(elementos, exponente, rng):
+        """El elemento k-ésimo (en un orden al azar) sale con probabilidad ~1/k^exponente"""
+        elementos = list(elementos)
+        rng.shuffle(elementos)
+        return Sorteo(elementos, (1 / k ** exponente for k in range(1, len(elementos) + 1)))
+
+    def elegir(self, rng):
+        return self.elementos[bisect_left(self.acumulados, rng.random() * self.total)]
+
+    def elegir_distintos(self, rng, cantidad):
+        cantidad = min(cantidad, len(self.elementos))
+        elegidos = []
+        while len(elegidos) < cantidad:
+            elemento = self.elegir(rng)
+            if elemento not in elegidos:
+                elegidos.append(elemento)
+        return elegidos
+
+
+def _fecha_reciente(rng, desde, hasta):
+    """Fecha entre desde y hasta, más probable cuanto más reciente (la tienda crece)"""
+    segundos = (hasta - desde).total_seconds()
+    return (hasta - timedelta(seconds=segundos * rng.random() ** 2)).replace(microsecond=0)
+
+
+# =============================================
+# CARGA POR LOTES
+# =============================================
+
+class Cargador:
+    """Acumula filas de una tabla y las carga por lotes
+
+    Por defecto con un INSERT de varias filas por lote; con csv=True cada lote
+    se escribe en un CSV temporal y se carga con LOAD DATA LOCAL INFILE.
+    """
+
+    def __init__(self, conn, tabla, columnas, lote, csv=False, ignorar=False):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.tabla = tabla
+        self.columnas = columnas
+        self.lote = lote
+        self.csv = csv
+        self.ignorar = ignorar
+        self.filas = []
+        self.total = 0
+        self.inicio = time.perf_counter()
+
+    def agregar(self, fila):
+        self.filas.append(fila)
+        if len(self.filas) >= self.lote:
+            self.vaciar()
+
+    def vaciar(self):
+        if not self.filas:
+            return
+        if self.csv:
+            self._cargar_csv()
+        else:
+            self._insertar()
+        self.conn.commit()
+        self.total += len(self.filas)
+        self.filas = []
+
+    def terminar(self):
+        self.vaciar()
+        segundos = time.perf_counter() - self.inicio
+        print(f"✅ {self.tabla}: {self.total:,} filas en {segundos:.1f}s ({self.total / max(segundos, 1e-9):,.0f} filas/s)")
+        return self.total
+
+    def _insertar(self):
+        marcadores = '(' + ', '.join(['%s'] * len(self.columnas)) + ')'
+        self.cursor.execute(
+            f"INSERT {'IGNORE ' if self.ignorar else ''}INTO {self.tabla} ({', '.join(self.columnas)}) "
+            f"VALUES {', '.join([marcadores] * len(self.filas))}",
+            [valor for fila in self.filas for valor in fila]
+        )
+
+    def _cargar_csv(self):
+        descriptor, ruta = tempfile.mkstemp(prefix=f'{self.tabla}_', suffix='.csv')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8', newline='') as archivo:
+                for fila in self.filas:
+                    archivo.write(','.join(_valor_csv(valor) for valor in fila))
+                    archivo.write('\n')
+            self.cursor.execute(f'''
+                LOAD DATA LOCAL INFILE %s {'IGNORE' if self.ignorar else ''} INTO TABLE {self.tabla}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+                LINES TERMINATED BY '\\n'
+                ({', '.join(self.columnas)})
+            ''', (ruta,))
+        finally:
+            os.remove(ruta)
+
+
+def _valor_csv(valor):
+    # Sin carácter de escape: NULL sin comillas es nulo y las comillas se duplican
+    if valor is None:
+        return 'NULL'
+    if isinstance(valor, (int, float, Decimal)):
+        return str(valor)
+    return '"' + str(valor).replace('"', '""') + '"'
+
+
+def _siguiente_id(cursor, tabla):
+    cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {tabla}')
+    return cursor.fetchone()[0]
+
+
+# =============================================
+# GENERADORES POR TABLA
+# =============================================
+
+def generar_categorias(conn):
+    cursor = conn.cursor()
+    cursor.executemany('INSERT IGNORE INTO categorias (nombre) VALUES (%s)', [(nombre,) for nombre in CATEGORIAS])
+    conn.commit()
+
+
+def generar_productos(conn, cantidad, rng, lote, csv=False, stock=None):
+    """Productos repartidos por categoría según su peso; stock=None lo sortea"""
+    ahora = datetime.now()
+    desde = ahora - timedelta(days=DIAS_HISTORIA)
+    categorias = Sorteo(CATEGORIAS, (datos[0] for datos in CATEGORIAS.values()))
+    cargador = Cargador(conn, 'productos',
+                        ('nombre', 'descripcion', 'precio', 'categoria', 'stock', 'imagen', 'created_at', 'updated_at'),
+                        lote, csv)
+    inicio = _siguiente_id(conn.cursor(), 'productos')
+    for numero in range(inicio, inicio + cantidad):
+        categoria = categorias.elegir(rng)
+        _, mediana, dispersion, marcas, tipos = CATEGORIAS[categoria]
+        marca, tipo = rng.choice(marcas), rng.choice(tipos)
+        if stock is not None:
+            unidades = stock
+        elif rng.random() < 0.08:
+            unidades = 0
+        else:
+            unidades = min(500, int(rng.paretovariate(1.3) * 4))
+        creado = _fecha_reciente(rng, desde, ahora)
+        cargador.agregar((
+            f"{tipo} {marca} {rng.choice(ADJETIVOS)} {numero}"[:100],
+            f"{tipo} {marca} {rng.choice(ADJETIVOS)}, modelo {rng.randint(100, 9999)}. "
+            f"Garantía de {rng.choice((6, 12, 24, 36))} meses.",
+            Decimal(max(1.0, mediana * rng.lognormvariate(0, dispersion))).quantize(Decimal('0.01')),
+            categoria,
+            unidades,
+            'default.png',
+            creado,
+            creado
+        ))
+    return cargador.terminar()
+
+
+def generar_usuarios(conn, cantidad, rng, lote, csv=False):
+    """Clientes con 0 a 3 direcciones (la primera es la principal)"""
+    from auth import Auth
+
+    ahora = datetime.now()
+    desde = ahora - timedelta(days=DIAS_HISTORIA)
+    hashed = Auth.hash_password(PASSWORD_USUARIOS)
+    ciudades = Sorteo(CIUDADES, PESOS_CIUDADES)
+    usuarios = Cargador(conn, 'usuarios',
+                        ('id', 'email', 'password', 'nombre', 'apellido', 'telefono', 'rol', 'activo',
+                         'created_at', 'ultimo_login'),
+                        lote, csv)
+    direcciones = Cargador(conn, 'direcciones',
+                           ('usuario_id', 'nombre', 'direccion', 'ciudad', 'codigo_postal', 'telefono_contacto',
+                            'es_principal', 'created_at'),
+                           lote, csv)
+    inicio = _siguiente_id(conn.cursor(), 'usuarios')
+    for usuario_id in range(inicio, inicio + cantidad):
+        creado = _fecha_reciente(rng, desde, ahora)
+        telefono = f"3{rng.randint(0, 999999999):09d}"
+        ultimo_login = None if rng.random() < 0.2 else _fecha_reciente(rng, creado, ahora)
+        usuarios.agregar((
+            usuario_id, f"usuario{usuario_id}@{DOMINIO_USUARIOS}", hashed,
+            rng.choice(NOMBRES), rng.choice(APELLIDOS), telefono, 'cliente',
+            int(rng.random() >= 0.03), creado, ultimo_login
+        ))
+        cantidad_direcciones = rng.choices((0, 1, 2, 3), weights=(20, 55, 20, 5))[0]
+        for orden in range(cantidad_direcciones):
+            direcciones.agregar((
+                usuario_id, ('Casa', 'Oficina', 'Otra')[orden],
+                f"Calle {rng.randint(1, 200)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}",
+                ciudades.elegir(rng), f"{rng.randint(5000, 890000):06d}", telefono,
+                int(orden == 0), creado
+            ))
+    total = usuarios.terminar()
+    direcciones.terminar()
+    return total
+
+
+def _productos_populares(conn, rng):
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, precio FROM productos')
+    productos = cursor.fetchall()
+    if not productos:
+        print("❌ No hay productos: generar productos primero")
+        sys.exit(1)
+    return Sorteo.zipf(productos, ZIPF_PRODUCTOS, rng)
+
+
+def _numeros_usados(cursor):
+    """Último número de pedido usado por día (de la secuencia y de los pedidos existentes)"""
+    usados = {}
+    cursor.execute('SELECT fecha, ultimo FROM secuencia_pedidos')
+    for fecha, ultimo in cursor.fetchall():
+        usados[fecha] = ultimo
+    cursor.execute('''
+        SELECT SUBSTRING(numero_pedido, 4, 8), MAX(CAST(SUBSTRING(numero_pedido, 12) AS UNSIGNED))
+        FROM pedidos WHERE numero_pedido LIKE 'PED%' GROUP BY 1
+    ''')
+    for texto, ultimo in cursor.fetchall():
+        try:
+            fecha = datetime.strptime(texto, '%Y%m%d').date()
+        except ValueError:
+            continue
+        usados[fecha] = max(usados.get(fecha, 0), ultimo or 0)
+    return usados
+
+
+def _estado_pedido(rng, dias):
+    if dias > 10:
+        return rng.choices(('entregado', 'cancelado', 'enviado'), weights=(88, 7, 5))[0]
+    if dias > 3:
+        return rng.choices(('enviado', 'entregado', 'en_proceso', 'cancelado'), weights=(45, 35, 15, 5))[0]
+    return rng.choices(('pendiente', 'confirmado', 'en_proceso', 'cancelado'), weights=(40, 35, 20, 5))[0]
+
+
+def generar_pedidos(conn, cantidad, rng, lote, csv=False):
+    """Pedidos con sus items: productos populares y clientes frecuentes según Zipf"""
+    from numeracion import formatear_numero
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, created_at FROM usuarios WHERE rol = 'cliente'")
+    clientes = cursor.fetchall()
+    if not clientes:
+        print("❌ No hay clientes: generar usuarios primero")
+        sys.exit(1)
+    clientes = Sorteo.zipf(clientes, ZIPF_CLIENTES, rng)
+    productos = _productos_populares(conn, rng)
+    por_pedido = Sorteo(*zip(*PRODUCTOS_POR_PEDIDO))
+    unidades = Sorteo(*zip(*UNIDADES_POR_ITEM))
+    ciudades = Sorteo(CIUDADES, PESOS_CIUDADES)
+    usados = _numeros_usados(cursor)
+    ahora = datetime.now()
+
+    pedidos = Cargador(conn, 'pedidos',
+                       ('id', 'usuario_id', 'numero_pedido', 'estado', 'subtotal', 'envio', 'descuento', 'total',
+                        'direccion_envio', 'metodo_pago', 'created_at', 'updated_at', 'total_items'),
+                       lote, csv)
+    items = Cargador(conn, 'pedido_items',
+                     ('pedido_id', 'producto_id', 'cantidad', 'precio_unitario', 'subtotal'),
+                     lote, csv)
+    inicio = _siguiente_id(cursor, 'pedidos')
+    for pedido_id in range(inicio, inicio + cantidad):
+        usuario_id, registrado = clientes.elegir(rng)
+        creado = _fecha_reciente(rng, registrado or ahora - timedelta(days=DIAS_HISTORIA), ahora)
+        fecha = creado.date()
+        usados[fecha] = usados.get(fecha, 0) + 1
+
+        subtotal = Decimal('0.00')
+        elegidos = productos.elegir_distintos(rng, por_pedido.elegir(rng))
+        for producto_id, precio in elegidos:
+            cantidad_item = unidades.elegir(rng)
+            subtotal_item = precio * cantidad_item
+            subtotal += subtotal_item
+            items.agregar((pedido_id, producto_id, cantidad_item, precio, subtotal_item))
+        envio = Decimal(0 if subtotal > 200 else 15)
+        pedidos.agregar((
+            pedido_id, usuario_id, formatear_numero(fecha, usados[fecha]),
+            _estado_pedido(rng, (ahora - creado).days), subtotal, envio, Decimal(0), subtotal + envio,
+            f"Calle {rng.randint(1, 200)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}, {ciudades.elegir(rng)}",
+            rng.choices(METODOS_PAGO, weights=(75, 25))[0], creado, creado, len(elegidos)
+        ))
+    total = pedidos.terminar()
+    items.terminar()
+
+    # La secuencia debe seguir después de los números generados
+    filas = sorted(usados.items())
+    for desde in range(0, len(filas), lote):
+        parte = filas[desde:desde + lote]
+        cursor.execute(f'''
+            INSERT INTO secuencia_pedidos (fecha, ultimo) VALUES {', '.join(['(%s, %s)'] * len(parte))}
+            ON DUPLICATE KEY UPDATE ultimo = GREATEST(ultimo, VALUES(ultimo))
+        ''', [dato for fila in parte for dato in fila])
+    conn.commit()
+    return total
+
+
+def generar_carritos(conn, cantidad, rng, lote, csv=False):
+    """Carritos activos de cantidad clientes distintos, con 1 a 5 productos"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM usuarios WHERE rol = 'cliente' AND activo = TRUE")
+    clientes = [fila[0] for fila in cursor.fetchall()]
+    productos = _productos_populares(conn, rng)
+    ahora = datetime.now()
+    carritos = Cargador(conn, 'carritos', ('usuario_id', 'producto_id', 'cantidad', 'created_at', 'updated_at'),
+                        lote, csv, ignorar=True)
+    for usuario_id in rng.sample(clientes, min(cantidad, len(clientes))):
+        for producto_id, _ in productos.elegir_distintos(rng, rng.choices((1, 2, 3, 4, 5), weights=(40, 25, 15, 12, 8))[0]):
+            agregado = _fecha_reciente(rng, ahora - timedelta(days=30), ahora)
+            carritos.agregar((usuario_id, producto_id, rng.choices((1, 2, 3), weights=(80, 15, 5))[0], agregado, agregado))
+    return carritos.terminar()
+
+
+def conectar(csv=False):
+    """Conexión propia para la carga, sin comprobar claves únicas ni foráneas por fila"""
+    from database import DB_CONFIG
+
+    conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=csv, autocommit=False)
+    cursor = conn.cursor()
+    # Los generadores ya garantizan la integridad: comprobarla fila a fila solo hace más lenta la carga
+    cursor.execute('SET SESSION unique_checks = 0, foreign_key_checks = 0')
+    return conn
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Generar datos sintéticos a gran escala')
+    parser.add_argument('--productos', type=int, default=10000)
+    parser.add_argument('--usuarios', type=int, default=5000)
+    parser.add_argument('--pedidos', type=int, default=20000)
+    parser.add_argument('--carritos', type=int, default=1000, help='clientes con un carrito activo')
+    parser.add_argument('--csv', action='store_true', help='cargar con LOAD DATA LOCAL INFILE desde CSV temporales')
+    parser.add_argument('--lote', type=int, help='filas por lote (por defecto 1000, o 100000 con --csv)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--permitir-remota', action='store_true')
+    args = parser.parse_args(argumentos)
+
+    comprobar_bd_local(args.permitir_remota)
+    lote = args.lote or (100000 if args.csv else 1000)
+    rng = random.Random(args.semilla)
+    inicio = time.perf_counter()
+    conn = conectar(args.csv)
+    try:
+        generar_categorias(conn)
+        if args.productos:
+            generar_productos(conn, args.productos, rng, lote, args.csv)
+        if args.usuarios:
+            generar_usuarios(conn, args.usuarios, rng, lote, args.csv)
+        if args.pedidos:
+            generar_pedidos(conn, args.pedidos, rng, lote, args.csv)
+        if args.carritos:
+            generar_carritos(conn, args.carritos, rng, lote, args.csv)
+
+        from catalogo import Catalogo
+        cursor = conn.cursor()
+        Catalogo.registrar_cambio(cursor)
+        conn.commit()
+    except mysql.connector.Error as e:
+        conn.rollback()
+        print(f"❌ Error al generar datos: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    # Los contadores del dashboard no se actualizaron al cargar: recalcularlos
+    from estadisticas import Estadisticas
+    Estadisticas.reconciliar()
+    print(f"✅ Datos generados en {time.perf_counter() - inicio:.1f}s (contraseña de los usuarios: {PASSWORD_USUARIOS})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Configuración de gunicorn para producción
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Variables de entorno:
+    PORT                    puerto (8000 por defecto)
+    WEB_CONCURRENCY         workers (por defecto 2 x núcleos + 1)
+    GUNICORN_WORKER_CLASS   'gthread' (por defecto) o 'sync'
+    GUNICORN_THREADS        hilos por worker con gthread (4): mientras un hilo
+                            espera a MySQL los demás siguen atendiendo
+    GUNICORN_MAX_REQUESTS   peticiones tras las que se recicla un worker (1000,
+                            con un margen al azar para que no se reinicien todos a la vez)
+    GUNICORN_MAX_RSS_MB     memoria residente a partir de la que se recicla un
+                            worker al terminar la petición en curso (0: sin límite)
+
+Cada worker abre hasta DB_POOL_MAX conexiones más la del numerador de pedidos:
+el total (workers x (DB_POOL_MAX + 1)) debe caber en el max_connections de MySQL.
+
+Al leer esta configuración, el maestro construye static/dist
+(construir_assets.py), que no está en el repositorio. Tiene que ser aquí y no
+en un hook: con preload_app la app se importa antes de on_starting, y la
+versión del despliegue (cache_http.py) incluye el manifiesto.
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import construir_assets
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Importar la app una vez en el maestro: los workers nacen con todo cargado
+# (arrancan antes y comparten memoria hasta que la modifican)
+preload_app = True
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+MAX_RSS_MB = float(os.environ.get('GUNICORN_MAX_RSS_MB', 0))
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+# Detrás del proxy de la plataforma: confiar en X-Forwarded-Proto/For
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '*')
+
+# Estáticos con hash de este despliegue, antes de que preload_app importe la app
+try:
+    construir_assets.construir()
+except OSError as e:
+    print(f"⚠️  No se pudieron construir los estáticos ({e}): se sirven sin hash desde /static/")
+
+
+def _rss_mb():
+    """Memoria residente actual del proceso en MB"""
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Sin /proc (macOS): el máximo alcanzado, que ahí viene en bytes
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def when_ready(server):
+    server.log.info(f"🚀 {workers} workers {worker_class}"
+                    f"{f' x {threads} hilos' if worker_class == 'gthread' else ''}, "
+                    f"reciclaje cada ~{max_requests} peticiones"
+                    f"{f' o {MAX_RSS_MB:.0f} MB' if MAX_RSS_MB else ''}")
+
+
+def post_fork(server, worker):
+    # El estado por proceso heredado del maestro no se comparte entre workers
+    import wsgi
+    wsgi.reiniciar_proceso()
+
+
+def post_worker_init(worker):
+    # Antes de aceptar la primera petición
+    import wsgi
+    wsgi.iniciar_worker()
+
+
+def post_request(worker, req, environ, resp):
+    if MAX_RSS_MB and _rss_mb() > MAX_RSS_MB:
+        worker.log.warning(f"♻️  Worker {worker.pid} usa {_rss_mb():.0f} MB (límite {MAX_RSS_MB:.0f} MB): se recicla")
+        # Termina la petición en curso y sale; el maestro arranca otro worker
+        worker.alive = False
+
+
+def worker_exit(server, worker):
+    import wsgi
+    wsgi.terminar_worker()
@@ -0,0 +1,277 @@
+"""Imágenes de productos: nombres por contenido y versiones reducidas
+
+Las imágenes subidas se guardan como originales/<hash>.<ext> (el hash es
+del contenido, así que una imagen repetida se guarda una sola vez) y en un
+pool de procesos, fuera del hilo de la petición, se generan versiones de
+cada ancho de TAMANOS en WebP y en el formato original. Las plantillas las
+enlazan con imagen_url() e imagen_srcset(); mientras no estén listas se usa
+el original.
+
+Para pasar las imágenes que ya existen al nuevo esquema:
+    python imagenes.py
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+from flask import send_from_directory, url_for
+from assets import ASSETS_MAX_AGE, asset_url
+
+CARPETA_IMAGENES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images', 'productos')
+ORIGINALES = 'originales'
+DERIVADOS = 'derivados'
+
+# Ancho en píxeles de cada versión reducida
+TAMANOS = {
+    'miniatura': 100,
+    'tarjeta': 400,
+    'detalle': 800,
+}
+CALIDAD_JPEG = 82
+CALIDAD_WEBP = 80
+# Procesos para generar las versiones (0: en el propio proceso, para depurar)
+IMAGENES_PROCESOS = int(os.environ.get('IMAGENES_PROCESOS', 2))
+
+EXTENSIONES = {'jpg': 'jpg', 'jpeg': 'jpg', 'png': 'png', 'gif': 'gif'}
+# Los GIF no están en el patrón: se dejan como están (pueden ser animados)
+_PATRON_ORIGINAL = re.compile(rf'^{ORIGINALES}/([0-9a-f]{{16}})\.(jpg|png)$')
+
+
+def nombre_por_contenido(contenido, extension):
+    """originales/<hash>.<ext> para un contenido dado"""
+    extension = EXTENSIONES[extension.lower()]
+    return f"{ORIGINALES}/{hashlib.sha256(contenido).hexdigest()[:16]}.{extension}"
+
+
+def nombre_derivado(imagen, ancho, formato):
+    """derivados/<hash>-<ancho>.<formato> de una imagen originales/<hash>.<ext> (None si no aplica)"""
+    coincidencia = _PATRON_ORIGINAL.match(imagen or '')
+    if not coincidencia:
+        return None
+    return f"{DERIVADOS}/{coincidencia.group(1)}-{ancho}.{formato}"
+
+
+def _escribir(ruta, contenido):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def generar_derivados(imagen):
+    """Generar las versiones reducidas de una imagen (se ejecuta en el pool)
+
+    Solo se generan los anchos menores que el original; devuelve las
+    versiones nuevas.
+    """
+    from io import BytesIO
+    from PIL import Image
+
+    coincidencia = _PATRON_ORIGINAL.match(imagen)
+    if not coincidencia:
+        return []
+    extension = coincidencia.group(2)
+    generados = []
+    with Image.open(os.path.join(CARPETA_IMAGENES, imagen)) as original:
+        original.load()
+        for ancho in sorted(TAMANOS.values()):
+            if original.width <= ancho:
+                break
+            alto = max(1, round(original.height * ancho / original.width))
+            reducida = original.resize((ancho, alto), Image.LANCZOS)
+            for formato in ('webp', extension):
+                nombre = nombre_derivado(imagen, ancho, formato)
+                ruta = os.path.join(CARPETA_IMAGENES, nombre)
+                if os.path.exists(ruta):
+                    continue
+                salida = BytesIO()
+                if formato == 'webp':
+                    reducida.save(salida, 'WEBP', quality=CALIDAD_WEBP, method=4)
+                elif formato == 'png':
+                    reducida.save(salida, 'PNG', optimize=True)
+                else:
+                    reducida.convert('RGB').save(salida, 'JPEG', quality=CALIDAD_JPEG, optimize=True, progressive=True)
+                _escribir(ruta, salida.getvalue())
+                generados.append(nombre)
+    return generados
+
+
+class Imagenes:
+    """Guardado de subidas y URLs de las versiones reducidas"""
+    _lock = threading.Lock()
+    _pool = None
+    _existentes = set()  # derivados que ya se vieron en disco (no cambian nunca)
+
+    @staticmethod
+    def guardar_subida(archivo, extension):
+        """Guardar un archivo subido con su nombre por contenido y encargar sus versiones"""
+        contenido = archivo.read()
+        imagen = nombre_por_contenido(contenido, extension)
+        ruta = os.path.join(CARPETA_IMAGENES, imagen)
+        if not os.path.exists(ruta):
+            _escribir(ruta, contenido)
+        Imagenes.encargar(imagen)
+        return imagen
+
+    @staticmethod
+    def _obtener_pool():
+        with Imagenes._lock:
+            if Imagenes._pool is None:
+                # Solo se importan al subir la primera imagen: no retrasan el arranque
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn: no heredar hilos ni conexiones del proceso de la app
+                # (cada proceso importa de nuevo el módulo principal, sin su bloque __main__)
+                Imagenes._pool = ProcessPoolExecutor(
+                    max_workers=IMAGENES_PROCESOS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return Imagenes._pool
+
+    @staticmethod
+    def encargar(imagen):
+        """Generar en segundo plano las versiones de una imagen"""
+        if not _PATRON_ORIGINAL.match(imagen):
+            return None
+        if IMAGENES_PROCESOS <= 0:
+            try:
+                generar_derivados(imagen)
+            except Exception as e:
+                print(f"⚠️  Error al generar versiones de {imagen}: {e}")
+            return None
+        try:
+            futuro = Imagenes._obtener_pool().submit(generar_derivados, imagen)
+        except Exception as e:
+            print(f"⚠️  No se pudo encargar la imagen {imagen}: {e}")
+            return None
+
+        def informar(futuro):
+            error = futuro.exception()
+            if error is not None:
+                print(f"⚠️  Error al generar versiones de {imagen}: {error}")
+
+        futuro.add_done_callback(informar)
+        return futuro
+
+    @staticmethod
+    def cerrar():
+        """Terminar el pool (los encargos pendientes se completan)"""
+        with Imagenes._lock:
+            pool, Imagenes._pool = Imagenes._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    @staticmethod
+    def _existe(nombre):
+        if nombre in Imagenes._existentes:
+            return True
+        if os.path.exists(os.path.join(CARPETA_IMAGENES, nombre)):
+            Imagenes._existentes.add(nombre)
+            return True
+        return False
+
+
+def _url(nombre):
+    # Los nombres por contenido no cambian nunca: se sirven con caché inmutable
+    if _PATRON_ORIGINAL.match(nombre) or nombre.startswith(DERIVADOS + '/'):
+        return url_for('imagenes', filename=nombre)
+    return asset_url('images/productos/' + nombre)
+
+
+def imagen_url(imagen, tamano='tarjeta'):
+    """URL de la versión de ese tamaño (formato original), o del original si no existe"""
+    if not imagen:
+        return asset_url('images/productos/default.png')
+    coincidencia = _PATRON_ORIGINAL.match(imagen)
+    if coincidencia:
+        derivado = nombre_derivado(imagen, TAMANOS[tamano], coincidencia.group(2))
+        if Imagenes._existe(derivado):
+            return _url(derivado)
+    return _url(imagen)
+
+
+def imagen_srcset(imagen, formato=None):
+    """srcset con las versiones disponibles ('' si todavía no hay ninguna)
+
+    Sin formato se usa el del original; con formato='webp' las versiones WebP.
+    """
+    coincidencia = _PATRON_ORIGINAL.match(imagen or '')
+    if not coincidencia:
+        return ''
+    formato = formato or coincidencia.group(2)
+    candidatos = []
+    for ancho in sorted(TAMANOS.values()):
+        derivado = nombre_derivado(imagen, ancho, formato)
+        if not Imagenes._existe(derivado):
+            break
+        candidatos.append(f"{_url(derivado)} {ancho}w")
+    return ', '.join(candidatos)
+
+
+def servir_imagen(filename):
+    """Originales y versiones por contenido con caché inmutable"""
+    respuesta = send_from_directory(CARPETA_IMAGENES, filename, max_age=ASSETS_MAX_AGE)
+    respuesta.headers['Cache-Control'] = f'public, max-age={ASSETS_MAX_AGE}, immutable'
+    return respuesta
+
+
+def init_app(app):
+    """Registrar /imagenes/ y las funciones de las plantillas"""
+    app.add_url_rule('/imagenes/<path:filename>', 'imagenes', servir_imagen)
+    app.add_template_global(imagen_url)
+    app.add_template_global(imagen_srcset)
+
+
+def migrar_existentes():
+    """Pasar las imágenes actuales a nombres por contenido y generar sus versiones
+
+    Las imágenes iguales (aunque estén en carpetas distintas) quedan en un
+    solo archivo y los productos pasan a apuntar a él.
+    """
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ No se pudo conectar a la base de datos")
+        return False
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT DISTINCT imagen FROM productos WHERE imagen IS NOT NULL')
+        cambios = {}
+        for (imagen,) in cursor.fetchall():
+            extension = os.path.splitext(imagen)[1].lstrip('.').lower()
+            ruta = os.path.join(CARPETA_IMAGENES, imagen)
+            if _PATRON_ORIGINAL.match(imagen) or extension not in EXTENSIONES or not os.path.isfile(ruta):
+                continue
+            with open(ruta, 'rb') as archivo:
+                contenido = archivo.read()
+            nuevo = nombre_por_contenido(contenido, extension)
+            if not os.path.exists(os.path.join(CARPETA_IMAGENES, nuevo)):
+                _escribir(os.path.join(CARPETA_IMAGENES, nuevo), contenido)
+            cambios[imagen] = nuevo
+
+        if cambios:
+            cursor.executemany('UPDATE productos SET imagen = %s WHERE imagen = %s',
+                               [(nuevo, anterior) for anterior, nuevo in cambios.items()])
+            from catalogo import Catalogo
+            Catalogo.registrar_cambio(cursor)
+        conn.commit()
+
+        distintas = sorted(set(cambios.values()))
+        print(f"✅ {len(cambios)} imágenes renombradas ({len(distintas)} distintas)")
+        for imagen in distintas:
+            generar_derivados(imagen)
+        print(f"✅ Versiones reducidas generadas para {len(distintas)} imágenes")
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error al migrar imágenes: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(0 if migrar_existentes() else 1)
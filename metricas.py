@@ -0,0 +1,193 @@
+"""Métricas de la aplicación en formato de texto de Prometheus
+
+Por endpoint se registran un histograma de latencia, los códigos de estado
+y, sumando lo que miden los cursores de database.py, las consultas, el
+tiempo en la base de datos y las conexiones tomadas del pool. Las cachés
+cuentan aciertos y fallos con Metricas.contar_cache(). Cada respuesta lleva
+un encabezado Server-Timing con el tiempo total y el de la base de datos.
+
+Las métricas son de cada proceso: con varios workers cada uno expone las
+suyas (la etiqueta pid permite distinguirlos al agregarlas).
+
+/metrics no es público: lo ve un administrador con sesión iniciada o quien
+envíe Authorization: Bearer <METRICAS_TOKEN> (Prometheus con bearer_token).
+"""
+import hmac
+import os
+import threading
+import time
+from flask import g, has_request_context, request, session
+import database
+
+# Token para leer /metrics sin sesión (sin definir, solo los administradores)
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
+# Límites superiores (s) de los buckets del histograma de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Endpoint con el que se agrupan las rutas que no existen (evita una serie por URL)
+SIN_ENDPOINT = 'sin_ruta'
+
+
+class Metricas:
+    """Contadores e histogramas del proceso (protegidos por un lock)"""
+    _lock = threading.Lock()
+    _inicio = time.time()
+    _latencia = {}      # endpoint -> [conteos por bucket..., +Inf], suma
+    _respuestas = {}    # (endpoint, metodo, estado) -> cantidad
+    _db = {}            # endpoint -> {'consultas', 'segundos', 'conexiones', 'errores'}
+    _db_fuera = {'consultas': 0, 'segundos': 0.0, 'conexiones': 0, 'errores': 0}  # hilos de fondo, scripts
+    _caches = {}        # (cache, resultado) -> cantidad
+
+    @staticmethod
+    def contar_cache(cache, acierto):
+        """Anotar un acierto o un fallo de la caché indicada"""
+        clave = (cache, 'acierto' if acierto else 'fallo')
+        with Metricas._lock:
+            Metricas._caches[clave] = Metricas._caches.get(clave, 0) + 1
+
+    @staticmethod
+    def _al_consultar(sql, params, duracion, error):
+        if has_request_context():
+            peticion = g.get('_metricas')
+            if peticion is not None:
+                peticion['consultas'] += 1
+                peticion['segundos'] += duracion
+                peticion['errores'] += error is not None
+                return
+        with Metricas._lock:
+            Metricas._db_fuera['consultas'] += 1
+            Metricas._db_fuera['segundos'] += duracion
+            Metricas._db_fuera['errores'] += error is not None
+
+    @staticmethod
+    def _al_conectar():
+        if has_request_context() and g.get('_metricas') is not None:
+            g._metricas['conexiones'] += 1
+            return
+        with Metricas._lock:
+            Metricas._db_fuera['conexiones'] += 1
+
+    @staticmethod
+    def iniciar_peticion():
+        g._metricas = {'inicio': time.perf_counter(), 'consultas': 0, 'segundos': 0.0, 'conexiones': 0, 'errores': 0}
+
+    @staticmethod
+    def terminar_peticion(respuesta):
+        peticion = g.pop('_metricas', None)
+        if peticion is None:
+            return respuesta
+        duracion = time.perf_counter() - peticion['inicio']
+        endpoint = request.endpoint or SIN_ENDPOINT
+
+        with Metricas._lock:
+            histograma = Metricas._latencia.get(endpoint)
+            if histograma is None:
+                histograma = Metricas._latencia[endpoint] = [[0] * (len(BUCKETS_LATENCIA) + 1), 0.0]
+            for i, limite in enumerate(BUCKETS_LATENCIA):
+                if duracion <= limite:
+                    histograma[0][i] += 1
+                    break
+            else:
+                histograma[0][-1] += 1
+            histograma[1] += duracion
+
+            clave = (endpoint, request.method, respuesta.status_code)
+            Metricas._respuestas[clave] = Metricas._respuestas.get(clave, 0) + 1
+
+            db = Metricas._db.setdefault(endpoint, {'consultas': 0, 'segundos': 0.0, 'conexiones': 0, 'errores': 0})
+            for campo in db:
+                db[campo] += peticion[campo]
+
+        respuesta.headers.add(
+            'Server-Timing',
+            f'app;dur={duracion * 1000:.1f}, db;dur={peticion["segundos"] * 1000:.1f};desc="{peticion["consultas"]} consultas"'
+        )
+        return respuesta
+
+    @staticmethod
+    def exportar():
+        """Todas las métricas en formato de texto de Prometheus"""
+        lineas = []
+        pid = os.getpid()
+
+        def metrica(nombre, tipo, ayuda):
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+
+        def etiquetas(**valores):
+            valores['pid'] = pid
+            texto = ','.join(f'{k}="{_escapar(v)}"' for k, v in valores.items())
+            return '{' + texto + '}'
+
+        with Metricas._lock:
+            latencia = {k: ([*v[0]], v[1]) for k, v in Metricas._latencia.items()}
+            respuestas = dict(Metricas._respuestas)
+            db = {k: dict(v) for k, v in Metricas._db.items()}
+            db[''] = dict(Metricas._db_fuera)
+            caches = dict(Metricas._caches)
+
+        metrica('tienda_peticion_segundos', 'histogram', 'Duración de las peticiones por endpoint')
+        for endpoint, (conteos, suma) in sorted(latencia.items()):
+            acumulado = 0
+            for limite, cantidad in zip(BUCKETS_LATENCIA, conteos):
+                acumulado += cantidad
+                lineas.append(f'tienda_peticion_segundos_bucket{etiquetas(endpoint=endpoint, le=limite)} {acumulado}')
+            acumulado += conteos[-1]
+            lineas.append(f'tienda_peticion_segundos_bucket{etiquetas(endpoint=endpoint, le="+Inf")} {acumulado}')
+            lineas.append(f'tienda_peticion_segundos_sum{etiquetas(endpoint=endpoint)} {suma:.6f}')
+            lineas.append(f'tienda_peticion_segundos_count{etiquetas(endpoint=endpoint)} {acumulado}')
+
+        metrica('tienda_respuestas_total', 'counter', 'Respuestas por endpoint, método y código de estado')
+        for (endpoint, metodo, estado), cantidad in sorted(respuestas.items()):
+            lineas.append(f'tienda_respuestas_total{etiquetas(endpoint=endpoint, metodo=metodo, estado=estado)} {cantidad}')
+
+        for campo, tipo, ayuda in (
+            ('consultas', 'counter', 'Consultas SQL ejecutadas (endpoint vacío: fuera de peticiones)'),
+            ('segundos', 'counter', 'Tiempo total en consultas SQL'),
+            ('conexiones', 'counter', 'Conexiones tomadas del pool'),
+            ('errores', 'counter', 'Consultas SQL que fallaron'),
+        ):
+            nombre = f'tienda_db_{campo}_total'
+            metrica(nombre, tipo, ayuda)
+            for endpoint, valores in sorted(db.items()):
+                valor = valores[campo]
+                lineas.append(f'{nombre}{etiquetas(endpoint=endpoint)} {valor:.6f}' if campo == 'segundos'
+                              else f'{nombre}{etiquetas(endpoint=endpoint)} {valor}')
+
+        metrica('tienda_cache_total', 'counter', 'Aciertos y fallos de las cachés en memoria y HTTP')
+        for (cache, resultado), cantidad in sorted(caches.items()):
+            lineas.append(f'tienda_cache_total{etiquetas(cache=cache, resultado=resultado)} {cantidad}')
+
+        metrica('tienda_pool_conexiones', 'gauge', 'Estado del pool de conexiones a MySQL')
+        for clave, valor in sorted(database.estadisticas_pool().items()):
+            lineas.append(f'tienda_pool_conexiones{etiquetas(dato=clave)} {valor}')
+
+        metrica('tienda_proceso_inicio_segundos', 'gauge', 'Momento (epoch) en que arrancó el proceso')
+        lineas.append(f'tienda_proceso_inicio_segundos{etiquetas()} {Metricas._inicio:.0f}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _autorizado():
+    """Administrador con sesión o token de METRICAS_TOKEN en el encabezado Authorization"""
+    if session.get('user_rol') == 'admin':
+        return True
+    tipo, _, token = request.headers.get('Authorization', '').partition(' ')
+    return bool(METRICAS_TOKEN) and tipo.lower() == 'bearer' and hmac.compare_digest(token.strip(), METRICAS_TOKEN)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def init_app(app):
+    """Medir todas las peticiones de la app y exponer /metrics"""
+    database.agregar_observador_consultas(Metricas._al_consultar)
+    database.agregar_observador_conexiones(Metricas._al_conectar)
+    app.before_request(Metricas.iniciar_peticion)
+    app.after_request(Metricas.terminar_peticion)
+
+    @app.route('/metrics')
+    def metricas_prometheus():
+        if not _autorizado():
+            return "Acceso denegado", 403
+        return Metricas.exportar(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -0,0 +1,210 @@
+"""Migraciones versionadas del esquema
+
+Cada migración es un par de archivos en "base de datos/migraciones":
+NNNN_nombre.up.sql (aplicar) y NNNN_nombre.down.sql (revertir). Las
+aplicadas se registran en la tabla schema_migrations.
+
+Uso:
+    python migrar.py estado          # aplicadas y pendientes
+    python migrar.py subir [version] # aplicar pendientes (hasta version)
+    python migrar.py bajar [pasos]   # revertir las últimas (1 por defecto)
+    python migrar.py verificar       # EXPLAIN de las consultas frecuentes
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import date
+from decimal import Decimal
+from auth import SQL_DIRECCIONES_USUARIO, SQL_LOGIN
+from carrito_db import SQL_AGREGAR_AL_CARRITO, SQL_CARRITO_USUARIO, SQL_RESUMEN_CARRITO
+from database import get_db_connection
+from numeracion import SQL_RESERVAR, SQL_SEMBRAR, parametros_semilla
+from paginacion import consulta_keyset
+from pedidos import SQL_DETALLE_PEDIDO, SQL_ITEMS_PEDIDO, condiciones_pedidos, consulta_pedidos
+
+CARPETA_MIGRACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base de datos', 'migraciones')
+
+_PATRON_ARCHIVO = re.compile(r'^(\d{4})_(\w+)\.(up|down)\.sql$')
+
+# Consultas frecuentes que deben resolverse con índices: (descripción, sql, parámetros).
+# Son las mismas cadenas que ejecutan los módulos, con parámetros de ejemplo.
+CONSULTAS_VERIFICADAS = [
+    ('carrito del usuario', SQL_CARRITO_USUARIO, (1,)),
+    ('resumen del carrito', SQL_RESUMEN_CARRITO, (1,)),
+    ('agregar al carrito', SQL_AGREGAR_AL_CARRITO, (1, 1, 1, 1, 1, 1)),
+    ('pedidos del usuario', *consulta_pedidos(*condiciones_pedidos({'usuario_id': 1}), None, 'siguiente', 25)),
+    ('pedidos por estado (admin)',
+     *consulta_pedidos(*condiciones_pedidos({'estado': 'pendiente'}), None, 'siguiente', 25)),
+    ('pedidos de un cliente por email (admin)',
+     *consulta_pedidos(*condiciones_pedidos({'email': 'admin@techstore.com'}), None, 'siguiente', 25)),
+    ('detalle de un pedido', SQL_DETALLE_PEDIDO, (1,)),
+    ('items de un pedido', SQL_ITEMS_PEDIDO, (1,)),
+    ('direcciones del usuario', SQL_DIRECCIONES_USUARIO, (1,)),
+    ('login', SQL_LOGIN, ('admin@techstore.com',)),
+    ('página del catálogo', *consulta_keyset('precio_asc', (Decimal('100'), 1), 'siguiente', 24)),
+    ('número de pedido del día', SQL_RESERVAR, (1, date.today())),
+    ('secuencia de un día nuevo', SQL_SEMBRAR, parametros_semilla(date.today())),
+]
+
+# Recorridos completos aceptados a propósito: (descripción, tabla) -> motivo.
+# Solo para tablas que no crecen con el uso; cualquier otro recorrido falla.
+RECORRIDOS_PERMITIDOS = {}
+
+
+def listar_migraciones():
+    """Migraciones disponibles ordenadas: [(version, nombre, archivo_up, archivo_down)]"""
+    encontradas = {}
+    for archivo in os.listdir(CARPETA_MIGRACIONES):
+        coincidencia = _PATRON_ARCHIVO.match(archivo)
+        if not coincidencia:
+            continue
+        version, nombre, sentido = coincidencia.groups()
+        datos = encontradas.setdefault(int(version), {'nombre': nombre})
+        datos[sentido] = os.path.join(CARPETA_MIGRACIONES, archivo)
+    return [
+        (version, datos['nombre'], datos.get('up'), datos.get('down'))
+        for version, datos in sorted(encontradas.items())
+    ]
+
+
+def leer_sentencias(ruta):
+    """Sentencias de un archivo .sql (separadas por ';' al final de línea, sin comentarios)"""
+    with open(ruta, encoding='utf-8') as archivo:
+        lineas = [l for l in archivo.read().splitlines() if not l.strip().startswith('--')]
+    return [s.strip() for s in re.split(r';\s*$', '\n'.join(lineas), flags=re.MULTILINE) if s.strip()]
+
+
+def _preparar(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            nombre VARCHAR(255) NOT NULL,
+            aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Evitar que dos despliegues apliquen migraciones a la vez
+    cursor.execute("SELECT GET_LOCK('schema_migrations', 30)")
+    if cursor.fetchone()[0] != 1:
+        raise RuntimeError("Otro proceso está aplicando migraciones")
+
+
+def _aplicadas(cursor):
+    cursor.execute('SELECT version FROM schema_migrations ORDER BY version')
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def _ejecutar_archivo(cursor, ruta):
+    for sentencia in leer_sentencias(ruta):
+        cursor.execute(sentencia)
+
+
+def subir(conn, hasta=None):
+    cursor = conn.cursor()
+    aplicadas = set(_aplicadas(cursor))
+    pendientes = [m for m in listar_migraciones() if m[0] not in aplicadas and (hasta is None or m[0] <= hasta)]
+    if not pendientes:
+        print("✅ El esquema está al día")
+    for version, nombre, archivo_up, _ in pendientes:
+        print(f"⬆️  Aplicando {version:04d}_{nombre}")
+        _ejecutar_archivo(cursor, archivo_up)
+        cursor.execute('INSERT INTO schema_migrations (version, nombre) VALUES (%s, %s)', (version, nombre))
+        conn.commit()
+    return len(pendientes)
+
+
+def bajar(conn, pasos=1):
+    cursor = conn.cursor()
+    por_version = {m[0]: m for m in listar_migraciones()}
+    aplicadas = _aplicadas(cursor)
+    for version in reversed(aplicadas[-pasos:] if pasos > 0 else []):
+        migracion = por_version.get(version)
+        if migracion is None or migracion[3] is None:
+            raise RuntimeError(f"La migración {version:04d} no tiene archivo .down.sql")
+        print(f"⬇️  Revirtiendo {version:04d}_{migracion[1]}")
+        _ejecutar_archivo(cursor, migracion[3])
+        cursor.execute('DELETE FROM schema_migrations WHERE version = %s', (version,))
+        conn.commit()
+
+
+def estado(cursor):
+    aplicadas = set(_aplicadas(cursor))
+    for version, nombre, _, _ in listar_migraciones():
+        marca = '✅' if version in aplicadas else '⏳'
+        print(f"{marca} {version:04d}_{nombre}")
+
+
+def verificar(cursor):
+    """EXPLAIN de CONSULTAS_VERIFICADAS: falla si alguna recorre una tabla completa
+
+    Falla si una tabla se recorre entera, por filas (type ALL) o por un índice
+    completo (type index), aunque el optimizador lo haya elegido por tener
+    pocas filas. Las excepciones se declaran una a una en RECORRIDOS_PERMITIDOS.
+    """
+    fallos = 0
+    for descripcion, sql, params in CONSULTAS_VERIFICADAS:
+        cursor.execute('EXPLAIN ' + sql, params)
+        columnas = [c[0] for c in cursor.description]
+        for fila in cursor.fetchall():
+            # Según la versión del conector algunas columnas llegan como bytes
+            fila = {columna: valor.decode() if isinstance(valor, (bytes, bytearray)) else valor
+                    for columna, valor in zip(columnas, fila)}
+            tabla = fila.get('table') or ''
+            tipo = (fila.get('type') or '').upper()
+            # Las tablas derivadas (<derived2>) son el resultado de una subconsulta ya acotada
+            if tipo not in ('ALL', 'INDEX') or tabla.startswith('<'):
+                continue
+            recorrido = 'por índice' if tipo == 'INDEX' else 'por filas'
+            motivo = RECORRIDOS_PERMITIDOS.get((descripcion, tabla))
+            if motivo:
+                print(f"ℹ️  {descripcion}: recorrido completo {recorrido} de {tabla} permitido ({motivo})")
+                continue
+            fallos += 1
+            print(f"❌ {descripcion}: recorrido completo {recorrido} de {tabla} "
+                  f"({fila.get('rows')} filas, índices posibles: {fila.get('possible_keys') or 'ninguno'})")
+    if not fallos:
+        print(f"✅ {len(CONSULTAS_VERIFICADAS)} consultas verificadas con índices")
+    return fallos == 0
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description='Migraciones del esquema de la tienda')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    comandos.add_parser('estado')
+    comando_subir = comandos.add_parser('subir')
+    comando_subir.add_argument('version', nargs='?', type=int)
+    comando_bajar = comandos.add_parser('bajar')
+    comando_bajar.add_argument('pasos', nargs='?', type=int, default=1)
+    comandos.add_parser('verificar')
+    args = parser.parse_args(argumentos)
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ No se pudo conectar a la base de datos")
+        return 1
+    try:
+        cursor = conn.cursor()
+        if args.comando == 'verificar':
+            return 0 if verificar(cursor) else 1
+        _preparar(cursor)
+        try:
+            if args.comando == 'estado':
+                estado(cursor)
+            elif args.comando == 'subir':
+                subir(conn, args.version)
+            elif args.comando == 'bajar':
+                bajar(conn, args.pasos)
+        finally:
+            # La conexión vuelve al pool sin cerrarse: el bloqueo hay que soltarlo a mano
+            cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+            cursor.fetchall()
+        return 0
+    except Exception as e:
+        print(f"❌ Error en la migración: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
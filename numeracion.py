@@ -0,0 +1,113 @@
+import os
+import threading
+from datetime import date
+import database
+
+# Números que reserva cada proceso de una vez. Con 1 los números salen
+# seguidos; con más se ahorran viajes a la base de datos, pero los que no se
+# usen antes de reiniciar el proceso se pierden.
+PEDIDOS_BLOQUE = max(1, int(os.environ.get('PEDIDOS_BLOQUE', 1)))
+
+PREFIJO = 'PED'
+
+
+# Reservar números del día: (cantidad, fecha)
+SQL_RESERVAR = '''
+    UPDATE secuencia_pedidos
+    SET ultimo = LAST_INSERT_ID(ultimo + %s)
+    WHERE fecha = %s
+'''
+# Crear la fila del día partiendo de los números que ya existan: parametros_semilla(fecha)
+SQL_SEMBRAR = '''
+    INSERT IGNORE INTO secuencia_pedidos (fecha, ultimo)
+    SELECT %s, COALESCE(MAX(CAST(SUBSTRING(numero_pedido, %s) AS UNSIGNED)), 0)
+    FROM pedidos
+    WHERE numero_pedido LIKE %s
+'''
+
+
+def formatear_numero(fecha, secuencia):
+    """PEDYYYYMMDDNNNN (con más de 9999 pedidos en un día crece en dígitos)"""
+    return f"{PREFIJO}{fecha:%Y%m%d}{secuencia:04d}"
+
+
+def parametros_semilla(fecha):
+    """Parámetros de SQL_SEMBRAR: la secuencia empieza tras PEDYYYYMMDD"""
+    return (fecha, len(PREFIJO) + 9, formatear_numero(fecha, 0)[:-4] + '%')
+
+
+class NumeradorPedidos:
+    """Genera números de pedido únicos con una secuencia por día
+
+    Cada día tiene una fila en secuencia_pedidos que se incrementa de forma
+    atómica con LAST_INSERT_ID(), así que el costo no depende de cuántos
+    pedidos haya y dos pedidos simultáneos nunca reciben el mismo número.
+
+    Los números se reservan en una conexión propia del numerador, fuera del
+    pool, que confirma enseguida: el bloqueo de la fila del día dura lo que
+    un UPDATE y no todo el pedido, y un pico de pedidos no agota el pool
+    esperando una segunda conexión. Si un pedido se deshace, su número queda
+    sin usar (puede haber huecos).
+    """
+    _lock = threading.Lock()
+    _conexion = None
+    _fecha = None
+    _siguiente = 0
+    _fin = 0  # último número del bloque reservado (incluido)
+
+    @staticmethod
+    def _reservar(cursor, fecha, cantidad):
+        """Reservar cantidad números del día y devolver el último"""
+        cursor.execute(SQL_RESERVAR, (cantidad, fecha))
+        if cursor.rowcount == 0:
+            # Primer pedido del día: crear la fila partiendo de los números
+            # que ya existan (por ejemplo pedidos de antes de usar la secuencia)
+            cursor.execute(SQL_SEMBRAR, parametros_semilla(fecha))
+            cursor.execute(SQL_RESERVAR, (cantidad, fecha))
+        cursor.execute('SELECT LAST_INSERT_ID()')
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def siguiente_numero():
+        """Siguiente número de pedido (None si no hay conexión)"""
+        hoy = date.today()
+        with NumeradorPedidos._lock:
+            # Al cambiar de día el bloque que quede del anterior se descarta
+            if NumeradorPedidos._fecha != hoy or NumeradorPedidos._siguiente > NumeradorPedidos._fin:
+                fin = NumeradorPedidos._reservar_bloque(hoy)
+                if fin is None:
+                    return None
+                NumeradorPedidos._fecha = hoy
+                NumeradorPedidos._siguiente = fin - PEDIDOS_BLOQUE + 1
+                NumeradorPedidos._fin = fin
+
+            secuencia = NumeradorPedidos._siguiente
+            NumeradorPedidos._siguiente += 1
+        return formatear_numero(hoy, secuencia)
+
+    @staticmethod
+    def _reservar_bloque(fecha):
+        """Reservar PEDIDOS_BLOQUE números en la conexión del numerador (con _lock tomado)"""
+        for _ in range(2):
+            try:
+                if NumeradorPedidos._conexion is None:
+                    NumeradorPedidos._conexion = database.conectar_aparte()
+                conn = NumeradorPedidos._conexion
+                cursor = database.CursorMedido(conn.cursor(buffered=True))
+                fin = NumeradorPedidos._reservar(cursor, fecha, PEDIDOS_BLOQUE)
+                conn.commit()
+                return fin
+            except Exception as e:
+                # Conexión caída (por ejemplo por wait_timeout): descartarla y reintentar una vez
+                print(f"Error al reservar números de pedido: {e}")
+                NumeradorPedidos._descartar_conexion()
+        return None
+
+    @staticmethod
+    def _descartar_conexion():
+        conn, NumeradorPedidos._conexion = NumeradorPedidos._conexion, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -0,0 +1,191 @@
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from decimal import Decimal
+
+# Órdenes disponibles: nombre -> (columna, descendente)
+ORDENES = {
+    'recientes': ('created_at', True),
+    'precio_asc': ('precio', False),
+    'precio_desc': ('precio', True),
+    'nombre_asc': ('nombre', False),
+    'nombre_desc': ('nombre', True)
+}
+ORDEN_POR_DEFECTO = 'recientes'
+
+LIMITE_POR_DEFECTO = 24
+LIMITE_MAXIMO = 100
+
+
+def _valor_a_json(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _valor_desde_json(columna, valor):
+    if valor is None:
+        return None
+    if columna == 'created_at':
+        return datetime.fromisoformat(valor)
+    if columna == 'precio':
+        return Decimal(valor)
+    return valor
+
+
+def codificar_cursor(valor, producto_id):
+    """Cursor opaco con la clave (valor, id) de la última fila de una página"""
+    datos = json.dumps([_valor_a_json(valor), producto_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, columna):
+    """Devuelve (valor, id) o None si el cursor no es válido"""
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor, producto_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return _valor_desde_json(columna, valor), int(producto_id)
+    except (ValueError, TypeError, ArithmeticError):
+        return None
+
+
+def leer_limite(args):
+    """Tamaño de página de request.args, acotado a LIMITE_MAXIMO"""
+    try:
+        limite = int(args.get('limite', LIMITE_POR_DEFECTO))
+    except ValueError:
+        limite = LIMITE_POR_DEFECTO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def leer_cursor(args, columna):
+    """Leer el cursor y la dirección ('antes' o 'despues') de request.args"""
+    if args.get('antes'):
+        return decodificar_cursor(args.get('antes'), columna), 'anterior'
+    return decodificar_cursor(args.get('despues'), columna), 'siguiente'
+
+
+def leer_parametros(args, orden_por_defecto=ORDEN_POR_DEFECTO):
+    """Leer orden, cursor, dirección y límite de request.args"""
+    orden = args.get('orden', orden_por_defecto)
+    if orden not in ORDENES:
+        orden = orden_por_defecto
+    cursor, direccion = leer_cursor(args, ORDENES[orden][0])
+    return orden, cursor, direccion, leer_limite(args)
+
+
+def _clave_memoria(producto, columna):
+    valor = producto[columna]
+    if columna == 'nombre':
+        valor = valor.casefold()
+    return valor, producto['id']
+
+
+def _resultado(filas, columna, orden, limite, hay_anterior, hay_siguiente, clave='productos'):
+    anterior = siguiente = None
+    if filas and hay_anterior:
+        anterior = codificar_cursor(filas[0][columna], filas[0]['id'])
+    if filas and hay_siguiente:
+        siguiente = codificar_cursor(filas[-1][columna], filas[-1]['id'])
+    return {
+        clave: filas,
+        'orden': orden,
+        'limite': limite,
+        'anterior': anterior,
+        'siguiente': siguiente
+    }
+
+
+def ordenar_claves(productos, orden):
+    """Claves (valor, id) en orden ascendente para paginar en memoria"""
+    columna = ORDENES[orden][0]
+    return sorted(_clave_memoria(p, columna) for p in productos)
+
+
+def paginar_en_memoria(claves, por_id, orden, cursor, direccion, limite):
+    """Paginación por cursor sobre una lista de claves ya ordenada (búsqueda binaria)"""
+    columna, descendente = ORDENES[orden]
+    if cursor is not None and columna == 'nombre':
+        cursor = (cursor[0].casefold(), cursor[1])
+
+    total = len(claves)
+    # Para órdenes descendentes la "siguiente" página tiene claves menores
+    hacia_menores = descendente == (direccion == 'siguiente')
+    if cursor is None:
+        inicio, fin = (max(0, total - limite), total) if descendente else (0, min(limite, total))
+    elif hacia_menores:
+        fin = bisect_left(claves, cursor)
+        inicio = max(0, fin - limite)
+    else:
+        inicio = bisect_right(claves, cursor)
+        fin = min(total, inicio + limite)
+
+    tramo = claves[inicio:fin]
+    if descendente:
+        tramo = tramo[::-1]
+        hay_anterior, hay_siguiente = fin < total, inicio > 0
+    else:
+        hay_anterior, hay_siguiente = inicio > 0, fin < total
+
+    filas = [por_id[producto_id] for _, producto_id in tramo]
+    return _resultado(filas, columna, orden, limite, hay_anterior, hay_siguiente)
+
+
+def condicion_keyset(columna, cursor, direccion, descendente=True, alias=''):
+    """WHERE y ORDER BY de una consulta por cursor sobre (columna, id)
+
+    Devuelve (condicion o None, params, orden_sql). Al ir hacia atrás el orden
+    se invierte; resultado_keyset vuelve a dar vuelta las filas.
+    """
+    ascendente = descendente == (direccion == 'anterior')
+    comparador = '>' if ascendente else '<'
+    sentido = 'ASC' if ascendente else 'DESC'
+    orden_sql = f'{alias}{columna} {sentido}, {alias}id {sentido}'
+    if cursor is None:
+        return None, [], orden_sql
+    condicion = f'({alias}{columna} {comparador} %s OR ({alias}{columna} = %s AND {alias}id {comparador} %s))'
+    return condicion, [cursor[0], cursor[0], cursor[1]], orden_sql
+
+
+def consulta_keyset(orden, cursor, direccion, limite, columnas='p.*'):
+    """SQL de una página de productos por cursor (pide limite + 1 filas)
+
+    Primero se recorren solo los ids en el índice (columna, id) y luego se unen
+    con la tabla, para que el orden y el salto de páginas no lean filas completas.
+    """
+    columna, descendente = ORDENES[orden]
+    condicion, params, orden_sql = condicion_keyset(columna, cursor, direccion, descendente)
+    orden_exterior = condicion_keyset(columna, None, direccion, descendente, 'p.')[2]
+    where = f'WHERE {condicion}' if condicion else ''
+
+    sql = f'''
+        SELECT {columnas} FROM (
+            SELECT id FROM productos
+            {where}
+            ORDER BY {orden_sql}
+            LIMIT %s
+        ) AS pagina
+        JOIN productos p ON p.id = pagina.id
+        ORDER BY {orden_exterior}
+    '''
+    params.append(limite + 1)
+    return sql, params
+
+
+def resultado_keyset(filas, orden, cursor, direccion, limite, columna=None, clave='productos'):
+    """Armar la página a partir de las filas de consulta_keyset (pedidas con limite + 1)
+
+    Para otras tablas se indica la columna del cursor y la clave de la lista.
+    """
+    columna = columna or ORDENES[orden][0]
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if direccion == 'anterior':
+        filas = filas[::-1]
+        return _resultado(filas, columna, orden, limite, hay_mas, True, clave)
+    return _resultado(filas, columna, orden, limite, cursor is not None, hay_mas, clave)
@@ -1,5 +1,76 @@
-from database import get_db_connection
-from carrito_db import CarritoDB
+from datetime import timedelta
+from database import get_db_connection, transaccion
+from paginacion import LIMITE_POR_DEFECTO, condicion_keyset, resultado_keyset
+from carrito_db import CarritoDB, ResumenCarrito
+from catalogo import Catalogo
+from numeracion import NumeradorPedidos
+from estadisticas import Estadisticas, clave_dia, es_stock_bajo
+
+ESTADOS_PEDIDO = ('pendiente', 'confirmado', 'en_proceso', 'enviado', 'entregado', 'cancelado')
+
+# Consultas del detalle de un pedido (migrar.py verificar hace EXPLAIN de estas mismas)
+SQL_DETALLE_PEDIDO = '''
+    SELECT p.*, u.nombre as usuario_nombre, u.email as usuario_email
+    FROM pedidos p
+    JOIN usuarios u ON p.usuario_id = u.id
+    WHERE p.id = %s
+'''
+SQL_ITEMS_PEDIDO = '''
+    SELECT pi.*, pr.nombre, pr.imagen, pr.categoria
+    FROM pedido_items pi
+    JOIN productos pr ON pi.producto_id = pr.id
+    WHERE pi.pedido_id = %s
+'''
+
+
+def condiciones_pedidos(filtros):
+    """Condiciones WHERE y parámetros de un listado de pedidos
+
+    filtros admite usuario_id, estado, desde y hasta (fechas, ambas incluidas)
+    y el email del cliente.
+    """
+    condiciones = []
+    params = []
+    if filtros.get('usuario_id'):
+        condiciones.append('p.usuario_id = %s')
+        params.append(filtros['usuario_id'])
+    if filtros.get('estado') in ESTADOS_PEDIDO:
+        condiciones.append('p.estado = %s')
+        params.append(filtros['estado'])
+    if filtros.get('desde'):
+        condiciones.append('p.created_at >= %s')
+        params.append(filtros['desde'])
+    if filtros.get('hasta'):
+        condiciones.append('p.created_at < %s')
+        params.append(filtros['hasta'] + timedelta(days=1))
+    if filtros.get('email'):
+        condiciones.append('u.email = %s')
+        params.append(filtros['email'])
+    return condiciones, params
+
+
+def consulta_pedidos(condiciones, params, cursor, direccion, limite):
+    """SQL de una página de pedidos (los más nuevos primero) por cursor (created_at, id)
+
+    Pide limite + 1 filas, como consulta_keyset. total_items se guarda al
+    crear el pedido, así el listado no agrupa pedido_items.
+    """
+    condicion, params_cursor, orden_sql = condicion_keyset('created_at', cursor, direccion, alias='p.')
+    if condicion:
+        condiciones = condiciones + [condicion]
+        params = params + params_cursor
+    where = ' AND '.join(condiciones) or 'TRUE'
+    sql = f'''
+        SELECT p.id, p.numero_pedido, p.estado, p.total, p.total_items, p.created_at,
+               u.nombre as usuario_nombre, u.email
+        FROM pedidos p
+        JOIN usuarios u ON p.usuario_id = u.id
+        WHERE {where}
+        ORDER BY {orden_sql}
+        LIMIT %s
+    '''
+    return sql, params + [limite + 1]
+
 
 class Pedidos:
     @staticmethod
@@ -8,80 +79,118 @@ class Pedidos:
         conn = get_db_connection()
         if conn:
             try:
-                cursor = conn.cursor(dictionary=True)
-                
-                # Generar número de pedido
-                cursor.execute('SELECT generar_numero_pedido() as numero_pedido')
-                numero_pedido = cursor.fetchone()['numero_pedido']
-                
-                # Obtener items del carrito ANTES de crear el pedido
-                carrito = CarritoDB.obtener_carrito_usuario(usuario_id)
-                
-                # VERIFICAR STOCK ANTES DE PROCEDER
-                for item in carrito:
-                    cursor.execute('SELECT stock FROM productos WHERE id = %s', (item['producto_id'],))
-                    producto = cursor.fetchone()
-                    if not producto or producto['stock'] < item['cantidad']:
-                        return False, None, f"Stock insuficiente para {item['nombre']}"
-
-                # Crear pedido
-                cursor.execute('''
-                    INSERT INTO pedidos (usuario_id, numero_pedido, direccion_envio, metodo_pago, subtotal, envio, descuento, total)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (usuario_id, numero_pedido, direccion_envio, metodo_pago, subtotal, envio, descuento, total))
-                
-                pedido_id = cursor.lastrowid
-                
-                # Crear items del pedido y ACTUALIZAR STOCK
-                for item in carrito:
-                    # Insertar item del pedido
+                # Pedido, items, stock y vaciado del carrito en una sola transacción
+                with transaccion(conn):
+                    cursor = conn.cursor(dictionary=True)
+                    
+                    # Obtener items del carrito ANTES de crear el pedido (misma conexión)
+                    carrito = CarritoDB.obtener_carrito_usuario(usuario_id)
+                    if not carrito:
+                        return False, None, "El carrito está vacío"
+
+                    # Número de pedido (se confirma aparte y enseguida; antes de bloquear
+                    # productos para retener esos bloqueos lo menos posible)
+                    numero_pedido = NumeradorPedidos.siguiente_numero()
+                    if not numero_pedido:
+                        raise Exception("No se pudo generar el número de pedido")
+
+                    # BLOQUEAR Y VERIFICAR STOCK de todos los productos en una consulta.
+                    # Siempre en orden de id para que dos pedidos no se bloqueen mutuamente
+                    producto_ids = sorted({item['producto_id'] for item in carrito})
+                    marcadores = ', '.join(['%s'] * len(producto_ids))
+                    cursor.execute(f'''
+                        SELECT id, stock FROM productos
+                        WHERE id IN ({marcadores})
+                        ORDER BY id
+                        FOR UPDATE
+                    ''', producto_ids)
+                    stock = {fila['id']: fila['stock'] for fila in cursor.fetchall()}
+                    for item in carrito:
+                        if stock.get(item['producto_id'], 0) < item['cantidad']:
+                            return False, None, f"Stock insuficiente para {item['nombre']}"
+
+                    # Crear pedido
                     cursor.execute('''
+                        INSERT INTO pedidos (usuario_id, numero_pedido, direccion_envio, metodo_pago, subtotal, envio, descuento, total, total_items)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ''', (usuario_id, numero_pedido, direccion_envio, metodo_pago, subtotal, envio, descuento, total, len(carrito)))
+                    
+                    pedido_id = cursor.lastrowid
+                    
+                    # Crear todos los items del pedido en un solo INSERT de varias filas
+                    cursor.executemany('''
                         INSERT INTO pedido_items (pedido_id, producto_id, cantidad, precio_unitario, subtotal)
                         VALUES (%s, %s, %s, %s, %s)
-                    ''', (pedido_id, item['producto_id'], item['cantidad'], item['precio'], item['precio'] * item['cantidad']))
+                    ''', [
+                        (pedido_id, item['producto_id'], item['cantidad'], item['precio'], item['precio'] * item['cantidad'])
+                        for item in carrito
+                    ])
                     
-                    # ACTUALIZAR STOCK del producto
-                    cursor.execute('''
-                        UPDATE productos 
-                        SET stock = stock - %s 
-                        WHERE id = %s
-                    ''', (item['cantidad'], item['producto_id']))
+                    # ACTUALIZAR STOCK de todos los productos en un UPDATE, solo si alcanza
+                    casos = ' '.join(['WHEN %s THEN %s'] * len(carrito))
+                    cantidades = [valor for item in carrito for valor in (item['producto_id'], item['cantidad'])]
+                    cursor.execute(f'''
+                        UPDATE productos
+                        SET stock = stock - CASE id {casos} END
+                        WHERE id IN ({marcadores})
+                          AND stock >= CASE id {casos} END
+                    ''', cantidades + producto_ids + cantidades)
+                    if cursor.rowcount != len(producto_ids):
+                        raise Exception("Stock insuficiente al descontar el pedido")
+
+                    # Contadores del dashboard (al final, para retener poco el bloqueo de sus filas)
+                    Estadisticas.incrementar(cursor, {
+                        clave_dia('pedidos'): 1,
+                        clave_dia('ingresos'): total,
+                        'pedidos_pendientes': 1,
+                        'stock_bajo': sum(
+                            1 for item in carrito
+                            if not es_stock_bajo(stock[item['producto_id']])
+                            and es_stock_bajo(stock[item['producto_id']] - item['cantidad'])
+                        )
+                    })
+                    
+                    # Vaciar carrito después de crear pedido (su commit se difiere al final del bloque)
+                    vaciado, mensaje = CarritoDB.vaciar_carrito(usuario_id)
+                    if not vaciado:
+                        raise Exception(mensaje)
                 
-                # Vaciar carrito después de crear pedido
-                CarritoDB.vaciar_carrito(usuario_id)
+                # El carrito quedó vacío (el vaciado se confirmó recién al cerrar el bloque)
+                ResumenCarrito.actualizar(usuario_id, [])
+                
+                # Stock del catálogo en memoria al día tras el pedido
+                Catalogo.refrescar_stock([item['producto_id'] for item in carrito])
                 
-                conn.commit()
                 return True, numero_pedido, "Pedido creado exitosamente"
                 
             except Exception as e:
-                conn.rollback()
                 return False, None, f"Error al crear pedido: {e}"
             finally:
                 conn.close()
         return False, None, "Error de conexión a la base de datos"
 
     @staticmethod
-    def obtener_pedidos_usuario(usuario_id):
-        """Obtener todos los pedidos de un usuario"""
+    def _pagina(condiciones, params, cursor_pagina, direccion, limite):
+        """Una página de pedidos (los más nuevos primero) por cursor (created_at, id)"""
         conn = get_db_connection()
-        pedidos = []
+        filas = []
         if conn:
             try:
                 cursor = conn.cursor(dictionary=True)
-                cursor.execute('''
-                    SELECT p.*, COUNT(pi.id) as total_items
-                    FROM pedidos p
-                    LEFT JOIN pedido_items pi ON p.id = pi.pedido_id
-                    WHERE p.usuario_id = %s
-                    GROUP BY p.id
-                    ORDER BY p.created_at DESC
-                ''', (usuario_id,))
-                pedidos = cursor.fetchall()
+                cursor.execute(*consulta_pedidos(condiciones, params, cursor_pagina, direccion, limite))
+                filas = cursor.fetchall()
             except Exception as e:
                 print(f"Error al obtener pedidos: {e}")
             finally:
                 conn.close()
-        return pedidos
+        return resultado_keyset(filas, 'recientes', cursor_pagina, direccion, limite,
+                                columna='created_at', clave='pedidos')
+
+    @staticmethod
+    def obtener_pedidos_usuario(usuario_id, cursor_pagina=None, direccion='siguiente', limite=LIMITE_POR_DEFECTO):
+        """Una página de los pedidos de un usuario"""
+        condiciones, params = condiciones_pedidos({'usuario_id': usuario_id})
+        return Pedidos._pagina(condiciones, params, cursor_pagina, direccion, limite)
 
     @staticmethod
     def obtener_detalle_pedido(pedido_id, usuario_id=None):
@@ -93,12 +202,7 @@ class Pedidos:
                 cursor = conn.cursor(dictionary=True)
                 
                 # Obtener información del pedido
-                query = '''
-                    SELECT p.*, u.nombre as usuario_nombre, u.email as usuario_email
-                    FROM pedidos p
-                    JOIN usuarios u ON p.usuario_id = u.id
-                    WHERE p.id = %s
-                '''
+                query = SQL_DETALLE_PEDIDO
                 params = [pedido_id]
                 
                 if usuario_id:
@@ -110,12 +214,7 @@ class Pedidos:
                 
                 if pedido:
                     # Obtener items del pedido - CAMBIA EL NOMBRE DE LA CLAVE
-                    cursor.execute('''
-                        SELECT pi.*, pr.nombre, pr.imagen, pr.categoria
-                        FROM pedido_items pi
-                        JOIN productos pr ON pi.producto_id = pr.id
-                        WHERE pi.pedido_id = %s
-                    ''', (pedido_id,))
+                    cursor.execute(SQL_ITEMS_PEDIDO, (pedido_id,))
                     items_data = cursor.fetchall()  # Cambia el nombre
                     pedido['productos'] = items_data  # Usa 'productos' en lugar de 'items'
                     
@@ -126,27 +225,14 @@ class Pedidos:
         return pedido
 
     @staticmethod
-    def obtener_todos_pedidos():
-        """Obtener todos los pedidos (para admin)"""
-        conn = get_db_connection()
-        pedidos = []
-        if conn:
-            try:
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute('''
-                    SELECT p.*, u.nombre as usuario_nombre, u.email, COUNT(pi.id) as total_items
-                    FROM pedidos p
-                    JOIN usuarios u ON p.usuario_id = u.id
-                    LEFT JOIN pedido_items pi ON p.id = pi.pedido_id
-                    GROUP BY p.id
-                    ORDER BY p.created_at DESC
-                ''')
-                pedidos = cursor.fetchall()
-            except Exception as e:
-                print(f"Error al obtener todos los pedidos: {e}")
-            finally:
-                conn.close()
-        return pedidos
+    def obtener_todos_pedidos(filtros=None, cursor_pagina=None, direccion='siguiente', limite=LIMITE_POR_DEFECTO):
+        """Una página de todos los pedidos (para admin)
+
+        filtros admite estado, desde y hasta (fechas, ambas incluidas) y el
+        email del cliente.
+        """
+        condiciones, params = condiciones_pedidos(filtros or {})
+        return Pedidos._pagina(condiciones, params, cursor_pagina, direccion, limite)
 
     @staticmethod
     def actualizar_estado_pedido(pedido_id, nuevo_estado):
@@ -154,11 +240,20 @@ class Pedidos:
         conn = get_db_connection()
         if conn:
             try:
-                cursor = conn.cursor()
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute('SELECT estado, total, created_at FROM pedidos WHERE id = %s FOR UPDATE', (pedido_id,))
+                pedido = cursor.fetchone()
                 cursor.execute('''
                     UPDATE pedidos SET estado = %s 
                     WHERE id = %s
                 ''', (nuevo_estado, pedido_id))
+                if pedido and pedido['estado'] != nuevo_estado:
+                    # Pendientes y, si se cancela o se reactiva, los ingresos del día del pedido
+                    cambios = {'pedidos_pendientes': (nuevo_estado == 'pendiente') - (pedido['estado'] == 'pendiente')}
+                    cancelado = (nuevo_estado == 'cancelado') - (pedido['estado'] == 'cancelado')
+                    if cancelado:
+                        cambios[clave_dia('ingresos', pedido['created_at'].date())] = -cancelado * pedido['total']
+                    Estadisticas.incrementar(cursor, cambios)
                 conn.commit()
                 return True, "Estado actualizado"
             except Exception as e:
@@ -0,0 +1,150 @@
+"""Perfilado de consultas SQL: consultas lentas, N+1 y presupuestos en tests
+
+Se engancha a los cursores de database.py, así que cubre todas las
+consultas sin tocar los módulos de datos:
+
+- Las consultas que tardan más de CONSULTA_LENTA_MS se registran con sus
+  parámetros y, con CONSULTA_LENTA_EXPLAIN=1, con el EXPLAIN.
+- Cada consulta se reduce a una huella (el SQL sin valores) y si en una
+  petición la misma huella se repite más de N_MAS_1_UMBRAL veces se avisa
+  de un posible N+1.
+- Con app.testing, superar PRESUPUESTOS_CONSULTAS o el umbral de N+1 hace
+  fallar la petición con PresupuestoExcedido.
+"""
+import os
+import re
+import threading
+from flask import current_app, g, has_request_context, request
+import database
+
+CONSULTA_LENTA_MS = float(os.environ.get('CONSULTA_LENTA_MS', 200))
+CONSULTA_LENTA_EXPLAIN = os.environ.get('CONSULTA_LENTA_EXPLAIN', '0') in ('1', 'true', 'True')
+# Repeticiones de la misma huella en una petición a partir de las que se avisa
+N_MAS_1_UMBRAL = int(os.environ.get('N_MAS_1_UMBRAL', 5))
+
+# Consultas máximas por petición en los tests, por endpoint. Incluyen las de
+# cargar las cachés en frío (catálogo, resumen del carrito, versión).
+PRESUPUESTOS_CONSULTAS = {
+    'index': 4,
+    'productos': 4,
+    'api_productos': 4,
+    'api_producto_individual': 4,
+    'api_buscar_productos': 4,
+    'detalle_producto': 5,
+    'carrito': 2,
+    'api_agregar_carrito_db': 6,
+    'api_actualizar_carrito_db': 6,
+    'api_eliminar_carrito_db': 5,
+    'api_batch_carrito_db': 10,
+    'api_contador_carrito_db': 1,
+    'api_detalle_carrito_db': 2,
+    'checkout': 5,
+    'procesar_pedido': 18,
+    'mis_pedidos': 3,
+    'admin_dashboard': 3,
+    'admin_pedidos': 4,
+}
+
+_PATRON_LITERALES = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b|%s|%\(\w+\)s")
+_PATRON_LISTAS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_PATRON_FILAS = re.compile(r'\(\?\+\)(?:\s*,\s*\(\?\+\))+')
+_PATRON_COMENTARIOS = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+
+_local = threading.local()
+
+
+class PresupuestoExcedido(AssertionError):
+    """Una petición hizo más consultas de las permitidas (solo en tests)"""
+
+
+def huella(sql):
+    """SQL normalizado sin valores: misma huella = misma consulta con otros parámetros
+
+    'SELECT * FROM p WHERE id IN (%s, %s)' y '... IN (%s)' dan la misma.
+    """
+    sql = _PATRON_COMENTARIOS.sub(' ', sql)
+    sql = _PATRON_LITERALES.sub('?', sql)
+    sql = ' '.join(sql.split())
+    sql = _PATRON_LISTAS.sub('(?+)', sql)
+    return _PATRON_FILAS.sub('(?+)', sql)
+
+
+def _resumir(valor, limite=200):
+    texto = repr(valor)
+    return texto if len(texto) <= limite else texto[:limite] + '...'
+
+
+def _explicar(sql, params):
+    """EXPLAIN de una consulta lenta en una conexión aparte (None si no se puede)"""
+    if not re.match(r'\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE)\b', sql, re.IGNORECASE):
+        return None
+    conn = database.get_conexion_independiente()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute('EXPLAIN ' + sql, params)
+        return cursor.fetchall()
+    except Exception as e:
+        return f"no disponible: {e}"
+    finally:
+        conn.close()
+
+
+def _al_consultar(sql, params, duracion, error):
+    if getattr(_local, 'explicando', False):
+        return
+    if has_request_context():
+        perfil = g.get('_perfil')
+        if perfil is not None:
+            clave = huella(sql)
+            perfil[clave] = perfil.get(clave, 0) + 1
+
+    if duracion * 1000 >= CONSULTA_LENTA_MS:
+        donde = request.endpoint if has_request_context() else 'fuera de petición'
+        print(f"🐢 Consulta lenta ({duracion * 1000:.1f} ms) en {donde}: "
+              f"{' '.join(sql.split())} | params={_resumir(params)}")
+        if CONSULTA_LENTA_EXPLAIN:
+            _local.explicando = True
+            try:
+                plan = _explicar(sql, params)
+            finally:
+                _local.explicando = False
+            if plan is not None:
+                print(f"   EXPLAIN: {_resumir(plan, 1000)}")
+
+
+def iniciar_peticion():
+    g._perfil = {}
+
+
+def revisar_peticion(respuesta):
+    """Avisar de N+1 y, en tests, hacer cumplir los presupuestos de consultas"""
+    perfil = g.pop('_perfil', None)
+    if not perfil:
+        return respuesta
+    endpoint = request.endpoint
+    problemas = []
+
+    for clave, veces in sorted(perfil.items(), key=lambda item: -item[1]):
+        if veces > N_MAS_1_UMBRAL:
+            problemas.append(f"{veces} veces la misma consulta (posible N+1): {clave}")
+
+    total = sum(perfil.values())
+    presupuesto = PRESUPUESTOS_CONSULTAS.get(endpoint)
+    if presupuesto is not None and total > presupuesto:
+        problemas.append(f"{total} consultas, presupuesto {presupuesto}")
+
+    if problemas:
+        mensaje = f"{request.method} {request.path} ({endpoint}): " + '; '.join(problemas)
+        if current_app.testing:
+            raise PresupuestoExcedido(mensaje)
+        print(f"⚠️  {mensaje}")
+    return respuesta
+
+
+def init_app(app):
+    """Perfilar las consultas de todas las peticiones de la app"""
+    database.agregar_observador_consultas(_al_consultar)
+    app.before_request(iniciar_peticion)
+    app.after_request(revisar_peticion)
@@ -1,192 +1,172 @@
-// Cargar carrito desde base de datos al iniciar
-async function cargarCarritoDesdeBD() {
-    if (!usuarioLogueado()) return;
-    
+// Cargar y mostrar el carrito desde BD
+async function cargarCarritoBD() {
+    if (!usuarioLogueado()) {
+        mostrarCarritoNoLogueado();
+        return;
+    }
+
     try {
-        const response = await fetch('/api/carrito/contador');
-        const data = await response.json();
-        actualizarContadorCarrito(data.contador);
-        
-        // Si estamos en la página del carrito, cargar los productos
-        if (window.location.pathname === '/carrito') {
-            await cargarCarritoBD();
-        }
+        const response = await fetch('/api/carrito/detalle');
+        const carrito = await response.json();
+        renderizarCarrito(carrito);
     } catch (error) {
         console.error('Error al cargar carrito:', error);
+        mostrarNotificacion('❌ Error al cargar el carrito');
     }
 }
 
-// Cargar y mostrar el carrito desde BD
-async function cargarCarritoBD() {
+// Dibujar los productos del carrito y el resumen
+function renderizarCarrito(carrito) {
     const listaCarrito = document.getElementById('lista-carrito');
     const carritoVacio = document.getElementById('carrito-vacio');
     
-    if (!usuarioLogueado()) {
-        mostrarCarritoNoLogueado();
+    if (carrito.length === 0) {
+        if (listaCarrito) listaCarrito.innerHTML = '';
+        if (carritoVacio) carritoVacio.style.display = 'block';
+        actualizarResumen({subtotal: 0, envio: 0, descuento: 0, total: 0});
         return;
     }
-
-    try {
-        const response = await fetch('/api/carrito/detalle');
-        const carrito = await response.json();
-        
-        if (carrito.length === 0) {
-            if (listaCarrito) listaCarrito.innerHTML = '';
-            if (carritoVacio) carritoVacio.style.display = 'block';
-            actualizarResumen({subtotal: 0, envio: 0, descuento: 0, total: 0});
-            return;
-        }
-        
-        if (carritoVacio) carritoVacio.style.display = 'none';
-        
-        // Generar HTML para los productos del carrito
-        let html = '';
-        let subtotal = 0;
+    
+    if (carritoVacio) carritoVacio.style.display = 'none';
+    
+    // Generar HTML para los productos del carrito
+    let html = '';
+    let subtotal = 0;
+    
+    carrito.forEach((item) => {
+        const itemSubtotal = item.precio * item.cantidad;
+        subtotal += itemSubtotal;
         
-        carrito.forEach((item) => {
-            const itemSubtotal = item.precio * item.cantidad;
-            subtotal += itemSubtotal;
-            
-            html += `
-                <div class="card mb-3">
-                    <div class="card-body">
-                        <div class="row align-items-center">
-                            <div class="col-md-2">
-                                <div class="image-container" style="height: 80px; padding: 5px;">
-                                    <img src="/static/images/productos/${item.imagen}" 
-                                         class="product-image" 
-                                         alt="${item.nombre}"
-                                         onerror="this.src='https://via.placeholder.com/70x50/ffffff/007bff?text=P${item.producto_id}'">
-                                </div>
-                            </div>
-                            <div class="col-md-3">
-                                <h6 class="mb-1">${item.nombre}</h6>
-                                <small class="text-muted">${item.categoria}</small>
-                            </div>
-                            <div class="col-md-2">
-                                <span class="price">$${item.precio}</span>
-                            </div>
-                            <div class="col-md-2">
-                                <div class="input-group input-group-sm">
-                                    <button class="btn btn-outline-secondary" onclick="cambiarCantidadBD(${item.producto_id}, -1)">-</button>
-                                    <input type="number" class="form-control text-center" value="${item.cantidad}" min="1" 
-                                           onchange="actualizarCantidadBD(${item.producto_id}, this.value)">
-                                    <button class="btn btn-outline-secondary" onclick="cambiarCantidadBD(${item.producto_id}, 1)">+</button>
-                                </div>
+        html += `
+            <div class="card mb-3">
+                <div class="card-body">
+                    <div class="row align-items-center">
+                        <div class="col-md-2">
+                            <div class="image-container" style="height: 80px; padding: 5px;">
+                                <img src="/static/images/productos/${item.imagen}" 
+                                     class="product-image" 
+                                     alt="${item.nombre}"
+                                     onerror="this.src='https://via.placeholder.com/70x50/ffffff/007bff?text=P${item.producto_id}'">
                             </div>
-                            <div class="col-md-2">
-                                <strong>$${itemSubtotal.toFixed(2)}</strong>
-                            </div>
-                            <div class="col-md-1">
-                                <button class="btn btn-danger btn-sm" onclick="eliminarDelCarritoBD(${item.producto_id})">
-                                    <i class="fas fa-trash"></i>
-                                </button>
+                        </div>
+                        <div class="col-md-3">
+                            <h6 class="mb-1">${item.nombre}</h6>
+                            <small class="text-muted">${item.categoria}</small>
+                        </div>
+                        <div class="col-md-2">
+                            <span class="price">$${item.precio}</span>
+                        </div>
+                        <div class="col-md-2">
+                            <div class="input-group input-group-sm">
+                                <button class="btn btn-outline-secondary" onclick="cambiarCantidadBD(${item.producto_id}, -1)">-</button>
+                                <input type="number" class="form-control text-center" value="${item.cantidad}" min="1" 
+                                       onchange="actualizarCantidadBD(${item.producto_id}, this.value)">
+                                <button class="btn btn-outline-secondary" onclick="cambiarCantidadBD(${item.producto_id}, 1)">+</button>
                             </div>
                         </div>
+                        <div class="col-md-2">
+                            <strong>$${itemSubtotal.toFixed(2)}</strong>
+                        </div>
+                        <div class="col-md-1">
+                            <button class="btn btn-danger btn-sm" onclick="eliminarDelCarritoBD(${item.producto_id})">
+                                <i class="fas fa-trash"></i>
+                            </button>
+                        </div>
                     </div>
                 </div>
-            `;
-        });
-        
-        if (listaCarrito) {
-            listaCarrito.innerHTML = html;
-        }
-        
-        const envio = subtotal > 200 ? 0 : 15;
-        const descuento = 0;
-        const total = subtotal + envio - descuento;
-        
-        actualizarResumen({subtotal, envio, descuento, total});
-        
-    } catch (error) {
-        console.error('Error al cargar carrito:', error);
-        mostrarNotificacion('❌ Error al cargar el carrito');
+            </div>
+        `;
+    });
+    
+    if (listaCarrito) {
+        listaCarrito.innerHTML = html;
     }
+    
+    const envio = subtotal > 200 ? 0 : 15;
+    const descuento = 0;
+    const total = subtotal + envio - descuento;
+    
+    actualizarResumen({subtotal, envio, descuento, total});
 }
 
 // Funciones para manipular el carrito en BD
-async function cambiarCantidadBD(productoId, cambio) {
+
+// Los cambios de cantidad se acumulan y se envían juntos en un solo lote
+const ESPERA_LOTE_CARRITO_MS = 400;
+const cambiosPendientes = new Map();  // productoId -> cantidad deseada
+let temporizadorLote = null;
+
+// Enviar varias operaciones al carrito en una sola petición
+async function enviarOperacionesCarrito(operaciones) {
+    const response = await fetch('/api/carrito/batch', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({operaciones})
+    });
+    const data = await response.json();
+    
+    if (data.success) {
+        renderizarCarrito(data.carrito);
+        actualizarContadorCarrito(data.contador);
+    } else {
+        mostrarNotificacion('❌ ' + data.error);
+        // Volver a mostrar las cantidades reales
+        await cargarCarritoBD();
+    }
+    return data;
+}
+
+function programarCambioCantidad(productoId, nuevaCantidad) {
+    cambiosPendientes.set(productoId, nuevaCantidad);
+    clearTimeout(temporizadorLote);
+    temporizadorLote = setTimeout(enviarCambiosPendientes, ESPERA_LOTE_CARRITO_MS);
+}
+
+async function enviarCambiosPendientes() {
+    if (cambiosPendientes.size === 0) return;
+    
+    const operaciones = Array.from(cambiosPendientes, ([productoId, cantidad]) => (
+        {op: 'fijar', producto_id: productoId, cantidad: cantidad}
+    ));
+    cambiosPendientes.clear();
+    
     try {
-        // Obtener cantidad actual del input
-        const input = document.querySelector(`input[onchange*="${productoId}"]`);
-        let cantidadActual = parseInt(input.value);
-        let nuevaCantidad = cantidadActual + cambio;
-        
-        // Validar que no sea menor a 1
-        if (nuevaCantidad < 1) {
-            nuevaCantidad = 1;
-        }
-        
-        // Actualizar en el servidor
-        const response = await fetch(`/api/carrito/actualizar/${productoId}/${nuevaCantidad}`);
-        const data = await response.json();
-        
+        const data = await enviarOperacionesCarrito(operaciones);
         if (data.success) {
-            // Actualizar la interfaz
-            input.value = nuevaCantidad;
-            await cargarCarritoBD(); // Recargar todo el carrito para actualizar precios
-            await actualizarContadorCarritoBD();
             mostrarNotificacion('✅ Cantidad actualizada');
-        } else {
-            mostrarNotificacion('❌ ' + data.error);
-            // Revertir el valor en caso de error
-            input.value = cantidadActual;
         }
     } catch (error) {
         console.error('Error:', error);
         mostrarNotificacion('❌ Error al actualizar cantidad');
+        await cargarCarritoBD();
     }
 }
 
-async function actualizarCantidadBD(productoId, nuevaCantidad) {
+function cambiarCantidadBD(productoId, cambio) {
+    // Obtener cantidad actual del input (ya incluye los clics aún no enviados)
+    const input = document.querySelector(`input[onchange*="${productoId}"]`);
+    let nuevaCantidad = parseInt(input.value) + cambio;
+    
+    // Validar que no sea menor a 1
+    if (nuevaCantidad < 1) {
+        nuevaCantidad = 1;
+    }
+    
+    input.value = nuevaCantidad;
+    programarCambioCantidad(productoId, nuevaCantidad);
+}
+
+function actualizarCantidadBD(productoId, nuevaCantidad) {
     nuevaCantidad = parseInt(nuevaCantidad);
     
-    if (nuevaCantidad >= 1) {
-        try {
-            const response = await fetch(`/api/carrito/actualizar/${productoId}/${nuevaCantidad}`);
-            const data = await response.json();
-            
-            if (data.success) {
-                await cargarCarritoBD();
-                await actualizarContadorCarritoBD();
-                mostrarNotificacion('✅ Cantidad actualizada');
-            } else {
-                // SI HAY ERROR DE STOCK, OBTENER STOCK DISPONIBLE Y AJUSTAR
-                mostrarNotificacion('❌ ' + data.error);
-                
-                // Obtener el stock disponible del mensaje de error
-                const stockMatch = data.error.match(/Solo quedan (\d+) unidades/);
-                if (stockMatch) {
-                    const stockDisponible = parseInt(stockMatch[1]);
-                    
-                    // Actualizar el input con el stock disponible
-                    const input = document.querySelector(`input[onchange*="${productoId}"]`);
-                    input.value = stockDisponible;
-                    
-                    // Actualizar en el servidor con la cantidad correcta
-                    await fetch(`/api/carrito/actualizar/${productoId}/${stockDisponible}`);
-                    await cargarCarritoBD();
-                    await actualizarContadorCarritoBD();
-                    mostrarNotificacion(`✅ Cantidad ajustada al stock disponible: ${stockDisponible}`);
-                } else {
-                    // Si no podemos obtener el stock, revertir al valor anterior
-                    const input = document.querySelector(`input[onchange*="${productoId}"]`);
-                    // Recargar el carrito para obtener el valor actual
-                    await cargarCarritoBD();
-                }
-            }
-        } catch (error) {
-            console.error('Error:', error);
-            mostrarNotificacion('❌ Error al actualizar cantidad');
-            // Recargar el carrito para restaurar valores
-            await cargarCarritoBD();
-        }
-    } else {
-        // Si es menor a 1, poner 1
+    // Si es menor a 1, poner 1
+    if (!(nuevaCantidad >= 1)) {
+        nuevaCantidad = 1;
         const input = document.querySelector(`input[onchange*="${productoId}"]`);
         input.value = 1;
-        await cambiarCantidadBD(productoId, 0); // Actualizar a 1
     }
+    
+    programarCambioCantidad(productoId, nuevaCantidad);
 }
 
 async function eliminarDelCarritoBD(productoId) {
@@ -212,17 +192,13 @@ async function eliminarDelCarritoBD(productoId) {
 async function vaciarCarritoBD() {
     if (confirm('¿Estás seguro de que quieres vaciar todo el carrito?')) {
         try {
-            // Vaciar uno por uno (podríamos optimizar esto con una ruta específica)
-            const response = await fetch('/api/carrito/detalle');
-            const carrito = await response.json();
-            
-            for (const item of carrito) {
-                await fetch(`/api/carrito/eliminar/${item.producto_id}`);
+            // Una sola petición en lugar de una por producto
+            cambiosPendientes.clear();
+            clearTimeout(temporizadorLote);
+            const data = await enviarOperacionesCarrito([{op: 'vaciar'}]);
+            if (data.success) {
+                mostrarNotificacion('✅ Carrito vaciado');
             }
-            
-            await cargarCarritoBD();
-            await actualizarContadorCarritoBD();
-            mostrarNotificacion('✅ Carrito vaciado');
         } catch (error) {
             console.error('Error:', error);
             mostrarNotificacion('❌ Error al vaciar carrito');
@@ -234,7 +210,8 @@ async function actualizarContadorCarritoBD() {
     if (!usuarioLogueado()) return;
     
     try {
-        const response = await fetch('/api/carrito/contador');
+        // El navegador revalida con el ETag: si no cambió el servidor responde 304
+        const response = await fetch('/api/carrito/contador', {cache: 'no-cache'});
         const data = await response.json();
         actualizarContadorCarrito(data.contador);
     } catch (error) {
@@ -339,9 +316,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // Determinar si el usuario está logueado
     window.userLoggedIn = document.body.classList.contains('user-logged-in');
     
-    if (userLoggedIn) {
-        cargarCarritoDesdeBD();
-    } else {
+    // El contador del carrito ya viene renderizado en la página: no se pide al servidor
+    if (!userLoggedIn) {
         actualizarContadorCarrito(0);
     }
     
@@ -381,51 +357,40 @@ function procederPago() {
     procederAlPago();
 }
 
-// Funciones para filtros y búsqueda (mantenemos las anteriores)
+// Funciones para filtros y búsqueda: se filtra y pagina en el servidor
 function filtrarProductos() {
-    const categoria = document.getElementById('filtro-categoria').value;
-    const precio = document.getElementById('filtro-precio').value;
-    const buscar = document.getElementById('buscador').value.toLowerCase();
-    
-    const productos = document.querySelectorAll('.producto-item');
-    let productosVisibles = 0;
-    
-    productos.forEach(producto => {
-        const prodCategoria = producto.getAttribute('data-categoria');
-        const prodPrecio = parseFloat(producto.getAttribute('data-precio'));
-        const prodNombre = producto.getAttribute('data-nombre');
-        
-        let visible = true;
-        
-        if (categoria && prodCategoria !== categoria) visible = false;
-        if (precio) {
-            const [min, max] = precio.split('-').map(Number);
-            if (max && (prodPrecio < min || prodPrecio > max)) visible = false;
-            else if (!max && prodPrecio < min) visible = false;
-        }
-        if (buscar && !prodNombre.includes(buscar.toLowerCase())) visible = false;
-        
-        producto.style.display = visible ? 'block' : 'none';
-        if (visible) productosVisibles++;
-    });
+    const params = new URLSearchParams(window.location.search);
+    const filtros = {
+        q: document.getElementById('buscador').value.trim(),
+        categoria: document.getElementById('filtro-categoria').value,
+        precio: document.getElementById('filtro-precio').value,
+        en_stock: document.getElementById('filtro-stock').checked ? '1' : ''
+    };
     
-    const sinResultados = document.getElementById('sin-resultados');
-    if (sinResultados) {
-        sinResultados.style.display = productosVisibles === 0 ? 'block' : 'none';
+    for (const [clave, valor] of Object.entries(filtros)) {
+        if (valor) params.set(clave, valor);
+        else params.delete(clave);
     }
+    // Al cambiar los filtros se vuelve a la primera página
+    params.delete('antes');
+    params.delete('despues');
+    window.location.search = params.toString();
+}
+
+// Cambiar el orden del listado (se ordena y pagina en el servidor)
+function cambiarOrden(orden) {
+    const params = new URLSearchParams(window.location.search);
+    params.set('orden', orden);
+    params.delete('antes');
+    params.delete('despues');
+    window.location.search = params.toString();
 }
 
 function buscarProductos() { filtrarProductos(); }
 function limpiarFiltros() {
     document.getElementById('filtro-categoria').value = '';
     document.getElementById('filtro-precio').value = '';
+    document.getElementById('filtro-stock').checked = false;
     document.getElementById('buscador').value = '';
     filtrarProductos();
 }
-
-// Inicializar
-document.addEventListener('DOMContentLoaded', function() {
-    actualizarContadorCarrito();
-    if (window.location.pathname === '/carrito') cargarCarrito();
-    if (window.location.pathname === '/productos') filtrarProductos();
-});
\ No newline at end of file
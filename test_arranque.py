@@ -0,0 +1,24 @@
+import os
+import pytest
+from arranque import MODULOS_DIFERIDOS, medir
+
+# Milisegundos máximos desde que se lanza el intérprete hasta la primera respuesta
+PRESUPUESTO_MS = float(os.environ.get('ARRANQUE_PRESUPUESTO_MS', 2000))
+
+
+@pytest.fixture(scope='module')
+def informe():
+    return medir()
+
+
+def test_primera_respuesta_dentro_del_presupuesto(informe):
+    assert informe['estado'] == 200
+    assert informe['primera_respuesta_ms'] <= PRESUPUESTO_MS, (
+        f"Arranque en frío de {informe['primera_respuesta_ms']:.0f} ms "
+        f"(presupuesto {PRESUPUESTO_MS:.0f} ms): revisar con python arranque.py"
+    )
+
+
+def test_modulos_diferidos_no_se_cargan_al_arrancar(informe):
+    cargados = [modulo for modulo in MODULOS_DIFERIDOS if modulo in informe['modulos']]
+    assert not cargados, f"Se importan al arrancar: {', '.join(cargados)}"
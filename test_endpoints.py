@@ -0,0 +1,184 @@
+import re
+from datetime import datetime
+from decimal import Decimal
+import pytest
+import database
+from app import app
+from carrito_db import ResumenCarrito
+from catalogo import Catalogo
+from numeracion import NumeradorPedidos
+
+USUARIO_ID = 1
+
+
+class BaseDeDatosFalsa:
+    """Tablas en memoria con las respuestas que la app espera de MySQL"""
+
+    def __init__(self):
+        self.productos = [
+            {'id': i, 'nombre': f'Producto {i}', 'descripcion': 'Producto de prueba',
+             'precio': Decimal(50 * i), 'categoria': ('Procesadores', 'Monitores')[i % 2],
+             'stock': 10, 'imagen': 'producto.png', 'created_at': datetime(2024, 1, 1, i)}
+            for i in range(1, 9)
+        ]
+        self.carrito = {}  # producto_id -> cantidad (del usuario USUARIO_ID)
+        self.direcciones = [{'id': 1, 'usuario_id': USUARIO_ID, 'nombre': 'Casa', 'direccion': 'Calle 1',
+                             'ciudad': 'Lima', 'codigo_postal': '15001', 'telefono_contacto': None,
+                             'es_principal': True, 'created_at': datetime(2024, 1, 1)}]
+        self.ultimo_numero = 0
+        self.pedidos = 0
+
+    def filas_carrito(self):
+        return [dict(self.productos[producto_id - 1], producto_id=producto_id, cantidad=cantidad,
+                     usuario_id=USUARIO_ID) for producto_id, cantidad in self.carrito.items()]
+
+    def responder(self, sql, params):
+        """(filas, rowcount) de una consulta"""
+        params = list(params or [])
+        if sql.startswith('SELECT * FROM productos ORDER BY id'):
+            return [dict(p) for p in self.productos], len(self.productos)
+        if sql.startswith('SELECT SUM(c.cantidad), SUM(c.cantidad * p.precio)'):
+            filas = self.filas_carrito()
+            return [{'contador': sum(f['cantidad'] for f in filas) or None,
+                     'subtotal': sum(f['precio'] * f['cantidad'] for f in filas) or None}], 1
+        if sql.startswith('SELECT c.*, p.nombre'):
+            return self.filas_carrito(), len(self.carrito)
+        if sql.startswith('INSERT INTO carritos (usuario_id, producto_id, cantidad) SELECT'):
+            self.carrito[params[2]] = self.carrito.get(params[2], 0) + params[1]
+            return [], 1
+        if sql.startswith('UPDATE carritos c JOIN productos'):
+            self.carrito[params[2]] = params[0]
+            return [], 1
+        if sql.startswith('SELECT producto_id, cantidad FROM carritos'):
+            return [{'producto_id': p, 'cantidad': c} for p, c in self.carrito.items()], len(self.carrito)
+        if sql.startswith('SELECT id, stock FROM productos WHERE id IN'):
+            return [{'id': p['id'], 'stock': p['stock']} for p in self.productos if p['id'] in params], len(params)
+        if sql.startswith('DELETE FROM carritos'):
+            for producto_id in params[1:] or list(self.carrito):
+                self.carrito.pop(producto_id, None)
+            return [], 1
+        if sql.startswith('SELECT * FROM direcciones'):
+            return [dict(d) for d in self.direcciones], len(self.direcciones)
+        if sql.startswith('UPDATE secuencia_pedidos'):
+            self.ultimo_numero += params[0]
+            return [], 1
+        if sql.startswith('SELECT LAST_INSERT_ID()'):
+            return [{'id': self.ultimo_numero}], 1
+        if sql.startswith('INSERT INTO pedidos'):
+            self.pedidos += 1
+            return [], 1
+        if sql.startswith('UPDATE productos SET stock = stock - CASE'):
+            return [], len(self.carrito)
+        return [], 0
+
+    def executemany(self, sql, filas):
+        if sql.startswith('INSERT INTO carritos'):
+            for _, producto_id, cantidad in filas:
+                self.carrito[producto_id] = cantidad
+
+
+class CursorFalso:
+    def __init__(self, base, diccionario):
+        self._base = base
+        self._diccionario = diccionario
+        self._filas = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, sql, params=None):
+        self._filas, self.rowcount = self._base.responder(' '.join(sql.split()), params)
+        self.lastrowid = self._base.pedidos
+
+    def executemany(self, sql, filas):
+        self._base.executemany(' '.join(sql.split()), filas)
+        self.rowcount = len(filas)
+
+    def fetchall(self):
+        return self._filas if self._diccionario else [tuple(f.values()) for f in self._filas]
+
+    def fetchone(self):
+        filas = self.fetchall()
+        return filas[0] if filas else None
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    unread_result = False
+    in_transaction = False
+
+    def __init__(self, base):
+        self._base = base
+
+    def cursor(self, dictionary=False, buffered=False):
+        return CursorFalso(self._base, dictionary)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """Cliente de la app real con el perfilado estricto sobre una base de datos en memoria"""
+    base = BaseDeDatosFalsa()
+    monkeypatch.setattr(database.PoolConexiones, '_conectar', lambda self: ConexionFalsa(base))
+    monkeypatch.setattr(database, 'conectar_aparte', lambda: ConexionFalsa(base))
+    monkeypatch.setattr(database, '_pool', None)
+    monkeypatch.setattr(Catalogo, '_snapshot', None)
+    monkeypatch.setattr(ResumenCarrito, '_resumenes', {})
+    monkeypatch.setattr(NumeradorPedidos, '_conexion', None)
+    monkeypatch.setattr(NumeradorPedidos, '_fecha', None)
+    monkeypatch.setattr(app, 'testing', True)
+    cliente = app.test_client()
+    cliente.base = base
+    return cliente
+
+
+def _iniciar_sesion(cliente):
+    with cliente.session_transaction() as sesion:
+        sesion.update(user_id=USUARIO_ID, user_email='cliente@techstore.com', user_nombre='Cliente', user_rol='cliente')
+
+
+@pytest.mark.parametrize('ruta', ['/', '/productos', '/productos?orden=precio_asc&limite=4',
+                                  '/api/buscar-productos?q=producto&categoria=Monitores'])
+def test_paginas_del_catalogo_dentro_del_presupuesto(cliente, ruta):
+    # Dos veces: en frío (carga el catálogo) y con la caché ya cargada
+    for _ in range(2):
+        assert cliente.get(ruta).status_code == 200
+
+
+def test_rutas_del_carrito_dentro_del_presupuesto(cliente):
+    _iniciar_sesion(cliente)
+    assert cliente.get('/api/carrito/agregar/1').status_code == 200
+    assert cliente.get('/api/carrito/agregar/2').status_code == 200
+    assert cliente.get('/api/carrito/actualizar/1/3').status_code == 200
+    assert cliente.get('/api/carrito/eliminar/2').status_code == 200
+    respuesta = cliente.post('/api/carrito/batch', json={'operaciones': [
+        {'op': 'agregar', 'producto_id': 3, 'cantidad': 2},
+        {'op': 'fijar', 'producto_id': 1, 'cantidad': 1},
+    ]})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['contador'] == 3
+    assert cliente.get('/api/carrito/contador').get_json()['contador'] == 3
+    assert cliente.get('/carrito').status_code == 200
+
+
+def test_procesar_pedido_dentro_del_presupuesto(cliente):
+    _iniciar_sesion(cliente)
+    cliente.base.carrito = {1: 2, 4: 1}
+    assert cliente.get('/checkout').status_code == 200
+    respuesta = cliente.post('/procesar-pedido', data={'direccion_id': '1', 'metodo_pago': 'tarjeta'})
+    assert respuesta.status_code == 302
+    assert re.search(r'/pedido-confirmado/PED\d{8}0001$', respuesta.headers['Location'])
+    assert cliente.base.pedidos == 1
+    assert not cliente.base.carrito
@@ -0,0 +1,79 @@
+import pytest
+from flask import Flask
+import database
+import perfilado
+from perfilado import N_MAS_1_UMBRAL, PRESUPUESTOS_CONSULTAS, PresupuestoExcedido, huella
+
+
+class CursorFalso:
+    """Cursor sin base de datos: solo acepta las consultas"""
+
+    def execute(self, sql, params=None):
+        pass
+
+
+def _app_de_prueba(testing=True):
+    app = Flask(__name__)
+    app.testing = testing
+    perfilado.init_app(app)
+
+    def consultar(veces, sql):
+        # Pasar por el cursor de database.py, como las consultas reales
+        cursor = database.CursorMedido(CursorFalso())
+        for i in range(veces):
+            cursor.execute(sql, (i,))
+
+    @app.route('/carrito')
+    def carrito():
+        consultar(PRESUPUESTOS_CONSULTAS['carrito'], 'SELECT * FROM carritos WHERE usuario_id = %s')
+        return 'ok'
+
+    @app.route('/checkout')
+    def checkout():
+        # Una consulta distinta más de las permitidas (ninguna se repite: no es un N+1)
+        for i in range(PRESUPUESTOS_CONSULTAS['checkout'] + 1):
+            consultar(1, f'SELECT * FROM tabla{chr(97 + i)} WHERE id = %s')
+        return 'ok'
+
+    @app.route('/sin-presupuesto')
+    def sin_presupuesto():
+        consultar(N_MAS_1_UMBRAL + 1, 'SELECT * FROM productos WHERE id = %s')
+        return 'ok'
+
+    return app
+
+
+def test_huella_ignora_valores_y_largo_de_listas():
+    assert huella("SELECT * FROM p WHERE id = 5 AND nombre = 'ssd'") == 'SELECT * FROM p WHERE id = ? AND nombre = ?'
+    assert huella('SELECT * FROM p WHERE id IN (%s, %s, %s)') == huella('SELECT *  FROM p\nWHERE id IN (%s)')
+    assert huella('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)') == huella('INSERT INTO t (a, b) VALUES (1, 2)')
+    assert huella('SELECT 1 -- comentario\nFROM dual /* otro */') == 'SELECT ? FROM dual'
+
+
+def test_peticion_dentro_del_presupuesto():
+    respuesta = _app_de_prueba().test_client().get('/carrito')
+    assert respuesta.status_code == 200
+
+
+def test_superar_el_presupuesto_falla_en_tests():
+    presupuesto = PRESUPUESTOS_CONSULTAS['checkout']
+    with pytest.raises(PresupuestoExcedido, match=f'{presupuesto + 1} consultas, presupuesto {presupuesto}'):
+        _app_de_prueba().test_client().get('/checkout')
+
+
+def test_n_mas_1_falla_en_tests():
+    with pytest.raises(PresupuestoExcedido, match='posible N\\+1'):
+        _app_de_prueba().test_client().get('/sin-presupuesto')
+
+
+def test_fuera_de_tests_solo_avisa(capsys):
+    respuesta = _app_de_prueba(testing=False).test_client().get('/checkout')
+    assert respuesta.status_code == 200
+    assert f"presupuesto {PRESUPUESTOS_CONSULTAS['checkout']}" in capsys.readouterr().out
+
+
+def test_presupuestos_corresponden_a_endpoints_de_la_app():
+    from app import app
+    endpoints = {regla.endpoint for regla in app.url_map.iter_rules()}
+    desconocidos = sorted(set(PRESUPUESTOS_CONSULTAS) - endpoints)
+    assert not desconocidos, f"Presupuestos de endpoints que no existen: {', '.join(desconocidos)}"
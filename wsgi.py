@@ -0,0 +1,85 @@
+"""Punto de entrada de producción
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+(es lo que ejecuta el Procfile). gunicorn.conf.py importa la app una sola vez
+en el proceso maestro (preload_app) y luego crea los workers con fork. Cada
+worker llama a reiniciar_proceso() al nacer, porque nada con estado por
+proceso puede compartirse entre workers: el pool de MySQL (los sockets serían
+los mismos), los locks, los hilos de fondo (no sobreviven al fork), el pool
+de procesos de las imágenes, las cachés en memoria y el bloque de números de
+pedido reservado. Después iniciar_worker() arranca los hilos y calienta el
+worker antes de que acepte tráfico.
+
+python app.py sigue sirviendo con el servidor de desarrollo de Flask.
+"""
+import threading
+import time
+import database
+from app import app
+from calentamiento import Calentamiento
+from carrito_db import ResumenCarrito
+from catalogo import Catalogo
+from escrituras_diferidas import EscriturasDiferidas
+from estadisticas import Estadisticas
+from imagenes import Imagenes
+from metricas import Metricas
+from numeracion import NumeradorPedidos
+
+
+def reiniciar_proceso():
+    """Descartar todo el estado heredado del proceso maestro (en el worker, tras el fork)"""
+    database.reiniciar_tras_fork()
+
+    Catalogo._lock = threading.Lock()
+    Catalogo._snapshot = None
+    Catalogo._hilo_lock = threading.Lock()
+    Catalogo._hilo = None
+    ResumenCarrito._lock = threading.Lock()
+    ResumenCarrito._resumenes = {}
+
+    # Un bloque reservado en el maestro no puede repartirse entre varios workers
+    NumeradorPedidos._lock = threading.Lock()
+    NumeradorPedidos._conexion = None
+    NumeradorPedidos._fecha = None
+    NumeradorPedidos._siguiente = 0
+    NumeradorPedidos._fin = 0
+
+    EscriturasDiferidas._lock = threading.Lock()
+    EscriturasDiferidas._pendientes = {}
+    EscriturasDiferidas._cantidad = 0
+    EscriturasDiferidas._despertar = threading.Event()
+    EscriturasDiferidas._hilo = None
+
+    Estadisticas._hilo_lock = threading.Lock()
+    Estadisticas._hilo = None
+    Calentamiento._hilo_lock = threading.Lock()
+    Calentamiento._hilo = None
+    Calentamiento.informe = None
+
+    # Un ProcessPoolExecutor no sobrevive al fork: cada worker crea el suyo al necesitarlo
+    Imagenes._lock = threading.Lock()
+    Imagenes._pool = None
+
+    # Las métricas son de cada worker (llevan su pid)
+    Metricas._lock = threading.Lock()
+    Metricas._inicio = time.time()
+    Metricas._latencia = {}
+    Metricas._respuestas = {}
+    Metricas._db = {}
+    Metricas._db_fuera = {'consultas': 0, 'segundos': 0.0, 'conexiones': 0, 'errores': 0}
+    Metricas._caches = {}
+
+
+def iniciar_worker():
+    """Arrancar los hilos de fondo del worker y calentarlo antes de aceptar tráfico"""
+    Estadisticas.iniciar_reconciliacion()
+    Catalogo.iniciar_refresco_stock()
+    Calentamiento.iniciar(app)
+
+
+def terminar_worker():
+    """Volcar lo pendiente y cerrar el pool de imágenes y la conexión del numerador al apagar un worker"""
+    EscriturasDiferidas.volcar()
+    Imagenes.cerrar()
+    NumeradorPedidos._descartar_conexion()